@@ -1,33 +1,84 @@
+import json
+
 from django.contrib import admin
-from .models import UserProfile, Project, Objective, DailyCheckIn, Tip, Hobby
+from django.db.models import Case, IntegerField, Q, When
+from django.db.models.expressions import RawSQL
+from django.utils.html import format_html
+from . import search
+from .admin_pagination import LargeTableAdminMixin
+from .models import (
+    UserProfile, Project, Objective, DailyCheckIn, Tip, Hobby, RequestProfile, LLMLedgerEntry,
+    ArchivedObjective, ArchivedCheckIn, ArchiveRun, WeeklyPlan, HobbySuggestion, WorkoutTemplate, CohortSnapshot, UserTrend
+)
+
+
+class FullTextSearchAdminMixin:
+    """Answers the changelist search box from the full-text index instead of icontains scans."""
+    search_kind = None
+    # Matches are never capped; only the best search_limit are ranked first.
+    search_limit = 1000
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        matching = Q(user__username=search_term)
+        subquery = search.match_subquery(self.search_kind, search_term)
+        if subquery is not None:
+            matching |= Q(pk__in=RawSQL(*subquery))
+        matches = queryset.filter(matching)
+
+        ids = search.search_ids(self.search_kind, search_term, limit=self.search_limit)
+        ranking = Case(
+            *[When(pk=pk, then=position) for position, pk in enumerate(ids)],
+            default=len(ids),
+            output_field=IntegerField()
+        )
+        if ids and not request.GET.get('o'):
+            matches = matches.annotate(search_rank=ranking).order_by('search_rank')
+        return matches, False
 
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
-    list_display = ['user', 'goal', 'scheduling_method', 'created_at']
+    list_display = ['user', 'goal', 'scheduling_method', 'planning_mode', 'created_at']
+    list_select_related = ['user']
+    autocomplete_fields = ['user']
     search_fields = ['user__username', 'goal']
-    list_filter = ['scheduling_method']
+    list_filter = ['scheduling_method', 'planning_mode']
 
 
 @admin.register(Project)
-class ProjectAdmin(admin.ModelAdmin):
+class ProjectAdmin(FullTextSearchAdminMixin, admin.ModelAdmin):
+    search_kind = 'project'
     list_display = ['name', 'user', 'is_active', 'start_date', 'due_date']
+    list_select_related = ['user']
+    autocomplete_fields = ['user']
     search_fields = ['name', 'user__username']
     list_filter = ['is_active', 'start_date']
 
 
 @admin.register(Objective)
-class ObjectiveAdmin(admin.ModelAdmin):
+class ObjectiveAdmin(LargeTableAdminMixin, FullTextSearchAdminMixin, admin.ModelAdmin):
+    search_kind = 'objective'
     list_display = ['description', 'user', 'date', 'is_completed', 'project']
+    list_select_related = ['user', 'project']
+    autocomplete_fields = ['user', 'project']
     search_fields = ['description', 'user__username']
-    list_filter = ['is_completed', 'date']
+    list_filter = ['is_completed']
+    date_hierarchy = 'date'
+    ordering = ['-date', '-id']
 
 
 @admin.register(DailyCheckIn)
-class DailyCheckInAdmin(admin.ModelAdmin):
+class DailyCheckInAdmin(LargeTableAdminMixin, FullTextSearchAdminMixin, admin.ModelAdmin):
+    search_kind = 'checkin'
     list_display = ['user', 'date', 'mood', 'created_at']
+    list_select_related = ['user']
+    autocomplete_fields = ['user']
     search_fields = ['user__username']
-    list_filter = ['mood', 'date']
+    list_filter = ['mood']
+    date_hierarchy = 'date'
+    ordering = ['-date', '-id']
 
 
 @admin.register(Tip)
@@ -38,6 +89,131 @@ class TipAdmin(admin.ModelAdmin):
 
 
 @admin.register(Hobby)
-class HobbyAdmin(admin.ModelAdmin):
+class HobbyAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ['name', 'user', 'frequency', 'created_at']
+    list_select_related = ['user']
+    autocomplete_fields = ['user']
     search_fields = ['name', 'user__username']
+    ordering = ['-id']
+
+
+@admin.register(WeeklyPlan)
+class WeeklyPlanAdmin(admin.ModelAdmin):
+    list_display = ['user', 'week_start', 'created_at']
+    list_select_related = ['user']
+    search_fields = ['user__username']
+
+
+@admin.register(HobbySuggestion)
+class HobbySuggestionAdmin(admin.ModelAdmin):
+    list_display = ['hobby_name', 'mood', 'goal', 'source_user', 'created_at']
+    list_filter = ['mood']
+    list_select_related = ['source_user']
+    search_fields = ['hobby_name', 'goal']
+    exclude = ['features']
+
+
+@admin.register(WorkoutTemplate)
+class WorkoutTemplateAdmin(admin.ModelAdmin):
+    list_display = ['mood', 'body_bucket', 'goal_category', 'created_at']
+    list_filter = ['mood', 'body_bucket', 'goal_category']
+
+
+@admin.register(CohortSnapshot)
+class CohortSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'window_start', 'window_end', 'users', 'objectives', 'checkins', 'duration_ms']
+
+
+@admin.register(UserTrend)
+class UserTrendAdmin(admin.ModelAdmin):
+    list_display = [
+        'user', 'completion_rate_7d', 'completion_rate_30d', 'completion_trend',
+        'current_streak', 'longest_streak', 'top_mood'
+    ]
+    list_filter = ['top_mood']
+    list_select_related = ['user']
+    search_fields = ['user__username']
+
+
+@admin.register(ArchivedObjective)
+class ArchivedObjectiveAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ['description', 'user', 'date', 'is_completed']
+    list_select_related = ['user']
+    autocomplete_fields = ['user']
+    ordering = ['-date', '-id']
+    search_fields = ['user__username']
+    list_filter = ['is_completed']
+
+
+@admin.register(ArchivedCheckIn)
+class ArchivedCheckInAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ['user', 'date', 'mood']
+    list_select_related = ['user']
+    autocomplete_fields = ['user']
+    ordering = ['-date', '-id']
+    search_fields = ['user__username']
+    list_filter = ['mood']
+
+
+@admin.register(ArchiveRun)
+class ArchiveRunAdmin(admin.ModelAdmin):
+    list_display = ['started_at', 'cutoff', 'objectives', 'checkins', 'finished_at']
+    readonly_fields = ['started_at', 'cutoff', 'objectives', 'checkins', 'finished_at']
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = [
+        'created_at', 'method', 'path', 'status_code', 'user', 'trigger',
+        'duration_ms', 'query_count', 'query_time_ms', 'llm_time_ms'
+    ]
+    list_filter = ['trigger', 'method', 'route']
+    list_select_related = ['user']
+    search_fields = ['path', 'user__username']
+    readonly_fields = [
+        'created_at', 'user', 'method', 'path', 'route', 'status_code', 'trigger',
+        'duration_ms', 'query_count', 'query_time_ms', 'llm_time_ms',
+        'formatted_sql_trace', 'formatted_llm_spans', 'formatted_profile_stats'
+    ]
+    exclude = ['sql_trace', 'llm_spans', 'profile_stats']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='SQL trace')
+    def formatted_sql_trace(self, obj):
+        lines = [
+            f"{entry['ms']:>9.3f} ms  [{entry['alias']}]  {entry['sql']}"
+            for entry in obj.sql_trace
+        ]
+        return format_html('<pre>{}</pre>', '\n'.join(lines) or 'No queries')
+
+    @admin.display(description='LLM spans')
+    def formatted_llm_spans(self, obj):
+        return format_html('<pre>{}</pre>', json.dumps(obj.llm_spans, indent=2))
+
+    @admin.display(description='cProfile')
+    def formatted_profile_stats(self, obj):
+        return format_html('<pre>{}</pre>', obj.profile_stats)
+
+
+@admin.register(LLMLedgerEntry)
+class LLMLedgerEntryAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = [
+        'created_at', 'endpoint', 'user', 'model', 'prompt_tokens',
+        'output_tokens', 'latency_ms', 'cache_hit', 'fallback', 'calls'
+    ]
+    list_filter = ['endpoint', 'cache_hit', 'fallback', 'model']
+    list_select_related = ['user']
+    date_hierarchy = 'created_at'
+    ordering = ['-created_at', '-id']
+    search_fields = ['user__username']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,163 @@
+from django.conf import settings
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ALL_VAR, ORDER_VAR, PAGE_VAR, ChangeList
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+CURSOR_VAR = 'after'
+
+
+def estimated_row_count(model, using='default'):
+    """Row count from the database's table statistics, or None if it keeps none."""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [table])
+        elif connection.vendor == 'mysql':
+            cursor.execute(
+                'SELECT table_rows FROM information_schema.tables '
+                'WHERE table_schema = DATABASE() AND table_name = %s', [table]
+            )
+        elif connection.vendor == 'sqlite':
+            # Populated by ANALYZE; each row's stat starts with the table's row count.
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None or row[0] is None:
+        return None
+    estimate = float(str(row[0]).split()[0])
+    # PostgreSQL reports -1 for tables that have never been analysed.
+    return int(estimate) if estimate >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Counts without scanning large tables: an unfiltered changelist uses the
+    table statistics once they exceed ADMIN_ESTIMATED_COUNT_THRESHOLD rows,
+    and a filtered one counts at most ADMIN_COUNT_LIMIT rows.
+    """
+
+    estimated = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                self.estimated = True
+                return estimate
+
+        limit = settings.ADMIN_COUNT_LIMIT
+        count = queryset.order_by()[:limit + 1].count()
+        if count > limit:
+            self.estimated = True
+            return limit
+        return count
+
+
+class KeysetChangeList(ChangeList):
+    """
+    Pages the admin's default ordering with a cursor (?after=<values of the
+    last row>) so every page costs the same as the first. Sorting by a
+    column, searching, "Show all" and ?p= fall back to numbered pages.
+    """
+
+    def __init__(self, request, *args, **kwargs):
+        self.cursor = request.GET.get(CURSOR_VAR)
+        self.keyset = False
+        self.next_cursor = None
+        super().__init__(request, *args, **kwargs)
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        # Filter, sort and search links always start again from the first page.
+        if not new_params or CURSOR_VAR not in new_params:
+            remove = [*(remove or []), CURSOR_VAR]
+        return super().get_query_string(new_params, remove)
+
+    def keyset_ordering(self):
+        ordering = list(self.model_admin.ordering or ['-pk'])
+        if ordering[-1].lstrip('-') not in ('pk', self.opts.pk.name):
+            ordering.append('-pk')
+        return ordering
+
+    def _field(self, name):
+        return self.opts.pk if name == 'pk' else self.opts.get_field(name)
+
+    def _cursor_filter(self, ordering):
+        values = self.cursor.split(',')
+        if len(values) != len(ordering):
+            raise ValueError('Malformed cursor')
+        after = Q()
+        equal = {}
+        for name, raw in zip(ordering, values):
+            field_name = name.lstrip('-')
+            value = self._field(field_name).to_python(raw)
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            after |= Q(**equal, **{f'{field_name}__{lookup}': value})
+            equal[field_name] = value
+        return after
+
+    def _cursor_for(self, obj, ordering):
+        return ','.join(self._field(name.lstrip('-')).value_to_string(obj) for name in ordering)
+
+    def get_results(self, request):
+        self.keyset = not (
+            self.list_editable or self.query
+            or {ORDER_VAR, ALL_VAR, PAGE_VAR} & set(request.GET)
+        )
+        if not self.keyset:
+            return super().get_results(request)
+
+        ordering = self.keyset_ordering()
+        queryset = self.queryset.order_by(*ordering)
+        if self.cursor:
+            try:
+                queryset = queryset.filter(self._cursor_filter(ordering))
+            except (ValueError, ValidationError) as e:
+                raise IncorrectLookupParameters(e)
+        rows = list(queryset[:self.list_per_page + 1])
+
+        paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        self.result_count = paginator.count
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.result_list = rows[:self.list_per_page]
+        self.can_show_all = False
+        self.multi_page = bool(self.cursor) or len(rows) > self.list_per_page
+        self.paginator = paginator
+        if len(rows) > self.list_per_page:
+            self.next_cursor = self._cursor_for(self.result_list[-1], ordering)
+
+    @property
+    def next_page_url(self):
+        return self.get_query_string({CURSOR_VAR: self.next_cursor})
+
+    @property
+    def first_page_url(self):
+        return self.get_query_string()
+
+
+class LargeTableAdminMixin:
+    """Changelist for tables too large to COUNT(*) or to page with OFFSET."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    change_list_template = 'admin/api/large_change_list.html'
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
@@ -0,0 +1,300 @@
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from .models import (
+    ArchivedCheckIn, ArchivedObjective, CohortSnapshot, DailyCheckIn, Objective, UserTrend
+)
+
+
+MOODS = [mood for mood, _ in DailyCheckIn.MOOD_CHOICES]
+MOOD_CODES = {mood: code for code, mood in enumerate(MOODS)}
+# Lower bounds of the next-day completion buckets after the first (none).
+COMPLETION_EDGES = [1e-9, 0.5, 1.0]
+COMPLETION_LABELS = ['0%', '1-49%', '50-99%', '100%']
+RATE_EDGES = np.linspace(0, 1, 11)
+STREAK_EDGES = [1, 2, 3, 4, 7, 14, 30, np.inf]
+STREAK_LABELS = ['1', '2', '3', '4-6', '7-13', '14-29', '30+']
+DAILY_SERIES_DAYS = 90
+USER_WRITE_BATCH = 2000
+
+# Users and days are packed into one int64 key (user_id << 32 | day ordinal),
+# so sorting by key sorts by user then day, and key + 1 is the same user's
+# next day.
+DAY_BITS = 32
+DAY_MASK = (1 << DAY_BITS) - 1
+
+
+def _pack(users, days):
+    return (users.astype(np.int64) << DAY_BITS) | days.astype(np.int64)
+
+
+def _users(keys):
+    return keys >> DAY_BITS
+
+
+def _days(keys):
+    return keys & DAY_MASK
+
+
+def _column(field, values):
+    count = len(values)
+    if field == 'date':
+        return np.fromiter((value.toordinal() for value in values), dtype=np.int32, count=count)
+    if field == 'mood':
+        return np.fromiter((MOOD_CODES.get(value, -1) for value in values), dtype=np.int8, count=count)
+    if field == 'is_completed':
+        return np.fromiter(values, dtype=bool, count=count)
+    return np.fromiter(values, dtype=np.int64, count=count)
+
+
+def load_columns(querysets, fields, chunk_size=50000):
+    """
+    Read fields from each queryset in id order, chunk_size rows per query,
+    into one NumPy array per field. A row whose id was already read from an
+    earlier queryset is skipped: archived rows keep their id, so with hot
+    tables passed before their archives a row archived mid-run is counted
+    exactly once.
+    """
+    chunks = {field: [] for field in fields}
+    id_chunks = []
+    for queryset in querysets:
+        last_id = None
+        while True:
+            page = queryset.order_by('id')
+            if last_id is not None:
+                page = page.filter(id__gt=last_id)
+            rows = list(page.values_list('id', *fields)[:chunk_size])
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            ids, *columns = zip(*rows)
+            id_chunks.append(_column('id', ids))
+            for field, values in zip(fields, columns):
+                chunks[field].append(_column(field, values))
+            if len(rows) < chunk_size:
+                break
+    loaded = {
+        field: np.concatenate(parts) if parts else _column(field, ())
+        for field, parts in chunks.items()
+    }
+    if id_chunks:
+        ids = np.concatenate(id_chunks)
+        _, first = np.unique(ids, return_index=True)
+        if len(first) < len(ids):
+            keep = np.sort(first)
+            loaded = {field: values[keep] for field, values in loaded.items()}
+    return loaded
+
+
+def objective_days(objectives):
+    """Per (user, day): sorted keys, objective counts and completed counts."""
+    keys, inverse = np.unique(_pack(objectives['user_id'], objectives['date']), return_inverse=True)
+    totals = np.bincount(inverse, minlength=len(keys))
+    completed = np.bincount(inverse, weights=objectives['is_completed'], minlength=len(keys)).astype(np.int64)
+    return keys, totals, completed
+
+
+def checkin_days(checkins):
+    """Sorted (user, day) keys and moods; a day archived mid-run is counted once."""
+    valid = checkins['mood'] >= 0
+    keys, first = np.unique(_pack(checkins['user_id'][valid], checkins['date'][valid]), return_index=True)
+    return keys, checkins['mood'][valid][first].astype(np.int64)
+
+
+def _lookup(sorted_keys, keys):
+    """Positions of keys in sorted_keys and a mask of which were found."""
+    positions = np.searchsorted(sorted_keys, keys)
+    positions = np.minimum(positions, max(len(sorted_keys) - 1, 0))
+    found = (sorted_keys[positions] == keys) if len(sorted_keys) else np.zeros(len(keys), dtype=bool)
+    return positions, found
+
+
+def mood_completion_matrix(checkin_keys, moods, day_keys, totals, completed):
+    """Counts of next-day completion bucket per mood, and the mean next-day rate per mood."""
+    positions, found = _lookup(day_keys, checkin_keys + 1)
+    rates = completed[positions[found]] / totals[positions[found]]
+    buckets = np.digitize(rates, COMPLETION_EDGES)
+    cells = np.bincount(
+        moods[found] * len(COMPLETION_LABELS) + buckets,
+        minlength=len(MOODS) * len(COMPLETION_LABELS)
+    ).reshape(len(MOODS), len(COMPLETION_LABELS))
+    rate_sums = np.bincount(moods[found], weights=rates, minlength=len(MOODS))
+    samples = np.bincount(moods[found], minlength=len(MOODS))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_rates = rate_sums / samples
+    return cells, mean_rates, samples
+
+
+def mood_transition_matrix(checkin_keys, moods):
+    """Counts of mood on day d+1 given mood on day d, for the same user."""
+    positions, found = _lookup(checkin_keys, checkin_keys + 1)
+    return np.bincount(
+        moods[found] * len(MOODS) + moods[positions[found]],
+        minlength=len(MOODS) ** 2
+    ).reshape(len(MOODS), len(MOODS))
+
+
+def window_sums(day_keys, values, users, end_day, days):
+    """Sum of values per user over the days (end_day - days, end_day]."""
+    prefix = np.concatenate([[0], np.cumsum(values)])
+    last = np.searchsorted(day_keys, _pack(users, np.full(len(users), end_day)), side='right')
+    first = np.searchsorted(day_keys, _pack(users, np.full(len(users), end_day - days + 1)), side='left')
+    return prefix[last] - prefix[first]
+
+
+def _rates(completed, totals):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(totals > 0, completed / np.maximum(totals, 1), np.nan)
+
+
+def daily_series(day_keys, totals, completed, end_day, days=DAILY_SERIES_DAYS):
+    """Cohort-wide objectives, completions and trailing 7-day rate per day."""
+    start_day = end_day - days - 6 + 1
+    offsets = _days(day_keys) - start_day
+    in_range = (offsets >= 0) & (offsets <= end_day - start_day)
+    length = end_day - start_day + 1
+    day_totals = np.bincount(offsets[in_range], weights=totals[in_range], minlength=length)
+    day_completed = np.bincount(offsets[in_range], weights=completed[in_range], minlength=length)
+    kernel = np.ones(7)
+    rolling_totals = np.convolve(day_totals, kernel)[:length]
+    rolling_completed = np.convolve(day_completed, kernel)[:length]
+    rolling = _rates(rolling_completed, rolling_totals)
+    return [
+        {
+            'date': date.fromordinal(int(start_day + i)).isoformat(),
+            'objectives': int(day_totals[i]),
+            'completed': int(day_completed[i]),
+            'rolling_7d_rate': None if np.isnan(rolling[i]) else round(float(rolling[i]), 4),
+        }
+        for i in range(6, length)
+    ]
+
+
+def streak_runs(day_keys, completed):
+    """Runs of consecutive days with at least one completed objective: (users, lengths, end days)."""
+    active = day_keys[completed > 0]
+    if not len(active):
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+    starts = np.flatnonzero(np.concatenate([[True], np.diff(active) != 1]))
+    lengths = np.diff(np.concatenate([starts, [len(active)]]))
+    return _users(active[starts]), lengths, _days(active[starts]) + lengths - 1
+
+
+def user_streaks(users, run_users, run_lengths, run_ends, end_day):
+    """Longest streak and the streak still running at end_day (or the day before) per user."""
+    longest = np.zeros(len(users), dtype=np.int64)
+    current = np.zeros(len(users), dtype=np.int64)
+    if not len(run_users):
+        return longest, current
+    index = np.searchsorted(users, run_users)
+    np.maximum.at(longest, index, run_lengths)
+    live = run_ends >= end_day - 1
+    current[index[live]] = run_lengths[live]
+    return longest, current
+
+
+def top_moods(users, checkin_keys, moods, end_day, days=30):
+    recent = _days(checkin_keys) > end_day - days
+    index = np.searchsorted(users, _users(checkin_keys[recent]))
+    counts = np.bincount(
+        index * len(MOODS) + moods[recent], minlength=len(users) * len(MOODS)
+    ).reshape(len(users), len(MOODS))
+    return np.where(counts.max(axis=1) > 0, counts.argmax(axis=1), -1)
+
+
+def _histogram(values, edges, labels):
+    counts, _ = np.histogram(values, bins=edges)
+    return [{'bucket': label, 'count': int(count)} for label, count in zip(labels, counts)]
+
+
+def _optional(value):
+    return None if np.isnan(value) else round(float(value), 4)
+
+
+def compute(days=None, chunk_size=50000, end=None):
+    """Run the analytics over hot and archived history and store a CohortSnapshot and UserTrends."""
+    started = time.perf_counter()
+    end = end or timezone.now().date()
+    start = end - timedelta(days=days - 1) if days else None
+    end_day = end.toordinal()
+
+    querysets = []
+    for models in ((Objective, ArchivedObjective), (DailyCheckIn, ArchivedCheckIn)):
+        qs = [model.objects.filter(date__lte=end) for model in models]
+        if start is not None:
+            qs = [q.filter(date__gte=start) for q in qs]
+        querysets.append(qs)
+    objectives = load_columns(querysets[0], ['user_id', 'date', 'is_completed'], chunk_size)
+    checkins = load_columns(querysets[1], ['user_id', 'date', 'mood'], chunk_size)
+
+    day_keys, totals, completed = objective_days(objectives)
+    checkin_keys, moods = checkin_days(checkins)
+    users = np.union1d(np.unique(_users(day_keys)), np.unique(_users(checkin_keys)))
+
+    completion_cells, next_day_rates, next_day_samples = mood_completion_matrix(
+        checkin_keys, moods, day_keys, totals, completed
+    )
+    transitions = mood_transition_matrix(checkin_keys, moods)
+
+    rate_7d = _rates(window_sums(day_keys, completed, users, end_day, 7),
+                     window_sums(day_keys, totals, users, end_day, 7))
+    rate_30d = _rates(window_sums(day_keys, completed, users, end_day, 30),
+                      window_sums(day_keys, totals, users, end_day, 30))
+    rate_prior_30d = _rates(window_sums(day_keys, completed, users, end_day - 30, 30),
+                            window_sums(day_keys, totals, users, end_day - 30, 30))
+    trend = rate_30d - rate_prior_30d
+
+    run_users, run_lengths, run_ends = streak_runs(day_keys, completed)
+    longest, current = user_streaks(users, run_users, run_lengths, run_ends, end_day)
+    user_moods = top_moods(users, checkin_keys, moods, end_day)
+    active_days = np.bincount(np.searchsorted(users, _users(day_keys)), minlength=len(users))
+    objective_counts = np.bincount(np.searchsorted(users, _users(day_keys)), weights=totals, minlength=len(users))
+
+    results = {
+        'moods': MOODS,
+        'completion_buckets': COMPLETION_LABELS,
+        'next_day_completion': completion_cells.tolist(),
+        'next_day_completion_rate': [_optional(rate) for rate in next_day_rates],
+        'next_day_samples': next_day_samples.tolist(),
+        'mood_transitions': transitions.tolist(),
+        'user_completion_7d': _histogram(rate_7d[~np.isnan(rate_7d)], RATE_EDGES,
+                                         [f'{int(edge * 100)}%' for edge in RATE_EDGES[:-1]]),
+        'streak_lengths': _histogram(run_lengths, STREAK_EDGES, STREAK_LABELS),
+        'current_streaks': _histogram(current[current > 0], STREAK_EDGES, STREAK_LABELS),
+        'daily': daily_series(day_keys, totals, completed, end_day),
+    }
+
+    computed_at = timezone.now()
+    trends = [
+        UserTrend(
+            user_id=int(user_id),
+            computed_at=computed_at,
+            active_days=int(active_days[i]),
+            objectives=int(objective_counts[i]),
+            completion_rate_7d=_optional(rate_7d[i]),
+            completion_rate_30d=_optional(rate_30d[i]),
+            completion_trend=_optional(trend[i]),
+            current_streak=int(current[i]),
+            longest_streak=int(longest[i]),
+            top_mood=MOODS[user_moods[i]] if user_moods[i] >= 0 else '',
+        )
+        for i, user_id in enumerate(users)
+    ]
+    with transaction.atomic():
+        UserTrend.objects.all().delete()
+        for offset in range(0, len(trends), USER_WRITE_BATCH):
+            UserTrend.objects.bulk_create(trends[offset:offset + USER_WRITE_BATCH])
+        return CohortSnapshot.objects.create(
+            window_start=start,
+            window_end=end,
+            users=len(users),
+            objectives=len(objectives['user_id']),
+            checkins=len(checkin_keys),
+            duration_ms=(time.perf_counter() - started) * 1000,
+            results=results,
+        )
@@ -0,0 +1,205 @@
+import json
+from datetime import date
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from . import search
+from .models import (
+    Project, Objective, DailyCheckIn, Hobby,
+    ArchivedObjective, ArchivedCheckIn
+)
+from .serializers import (
+    CheckInImportSerializer, HobbyImportSerializer, ObjectiveImportSerializer, ProjectImportSerializer
+)
+
+
+EXPORT_CHUNK_SIZE = 2000
+
+IMPORT_SERIALIZERS = {
+    'project': ProjectImportSerializer,
+    'hobby': HobbyImportSerializer,
+    'objective': ObjectiveImportSerializer,
+    'checkin': CheckInImportSerializer,
+}
+
+PROJECT_FIELDS = ['id', 'name', 'description', 'start_date', 'due_date', 'is_active', 'created_at']
+HOBBY_FIELDS = ['name', 'description', 'frequency', 'created_at']
+OBJECTIVE_FIELDS = ['project_id', 'description', 'date', 'is_completed', 'completed_at']
+CHECKIN_FIELDS = ['date', 'mood', 'notes']
+
+# Export order matters: projects come first so imported objectives can be
+# re-linked to the new project ids.
+EXPORT_SOURCES = [
+    ('project', Project, PROJECT_FIELDS),
+    ('hobby', Hobby, HOBBY_FIELDS),
+    ('objective', ArchivedObjective, OBJECTIVE_FIELDS),
+    ('objective', Objective, OBJECTIVE_FIELDS),
+    ('checkin', ArchivedCheckIn, CHECKIN_FIELDS),
+    ('checkin', DailyCheckIn, CHECKIN_FIELDS),
+]
+
+
+def iter_user_records(user):
+    """Yield one dict per row, streaming each table with a server-side cursor where supported."""
+    for record_type, model, fields in EXPORT_SOURCES:
+        rows = model.objects.filter(user=user).order_by('id').values(*fields)
+        for row in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            yield {'type': record_type, **row}
+
+
+def iter_ndjson(user):
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    for record in iter_user_records(user):
+        yield encoder.encode(record) + '\n'
+
+
+async def aiter_ndjson(user):
+    """
+    iter_ndjson for ASGI, where a sync iterator would be buffered whole. Lines
+    are produced a chunk at a time on the request's sync thread, which keeps
+    the database cursor on one connection.
+    """
+    lines = iter_ndjson(user)
+    next_chunk = sync_to_async(lambda: ''.join(islice(lines, EXPORT_CHUNK_SIZE)))
+    while chunk := await next_chunk():
+        yield chunk
+
+
+class TooManyImportErrors(Exception):
+    pass
+
+
+def validation_message(errors):
+    """One line from a serializer's errors, for reporting against a line of input."""
+    return '; '.join(
+        f"{field}: {' '.join(str(message) for message in messages)}"
+        for field, messages in errors.items()
+    )
+
+
+class NDJSONImporter:
+    """
+    Bulk-imports NDJSON produced by iter_ndjson for one user. Rows are buffered
+    per type and written with bulk_create, one transaction per batch. Counts
+    are of rows inserted; a check-in for a day the user already has updates
+    that row, in cold storage if the day is archived. Each record is checked
+    by its IMPORT_SERIALIZERS entry and a bad one is reported by line number.
+    """
+
+    def __init__(self, user, batch_size=1000, max_errors=100):
+        self.user = user
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.project_ids = {}
+        self.pending = {'project': [], 'hobby': [], 'objective': [], 'checkin': []}
+        self.counts = {'project': 0, 'hobby': 0, 'objective': 0, 'checkin': 0}
+        self.updated = {'checkin': 0}
+        self.errors = []
+
+    def run(self, lines):
+        for line_number, line in enumerate(lines, start=1):
+            if isinstance(line, bytes):
+                line = line.decode('utf-8')
+            if not line.strip():
+                continue
+            try:
+                self.add(json.loads(line))
+            except (ValueError, KeyError, TypeError) as e:
+                self.errors.append({'line': line_number, 'error': str(e)})
+                if len(self.errors) >= self.max_errors:
+                    raise TooManyImportErrors(f"Stopped after {len(self.errors)} errors")
+        self.flush_all()
+        return {'imported': self.counts, 'updated': self.updated, 'errors': self.errors}
+
+    def add(self, record):
+        if not isinstance(record, dict):
+            raise TypeError("Each record must be an object")
+        record_type = record.get('type')
+        if record_type not in IMPORT_SERIALIZERS:
+            raise ValueError(f"Unknown record type: {record_type!r}")
+        serializer = IMPORT_SERIALIZERS[record_type](data=record)
+        if not serializer.is_valid():
+            raise ValueError(validation_message(serializer.errors))
+        data = serializer.validated_data
+
+        if record_type == 'project':
+            # Pending projects must exist before anything can reference them.
+            self.pending['project'].append((data['id'], Project(
+                user=self.user,
+                name=data['name'],
+                description=data['description'],
+                start_date=data['start_date'] or date.today(),
+                due_date=data['due_date'],
+                is_active=data['is_active'],
+            )))
+        elif record_type == 'hobby':
+            self.pending['hobby'].append(Hobby(user=self.user, **data))
+        elif record_type == 'objective':
+            if self.pending['project']:
+                self.flush('project')
+            self.pending['objective'].append(Objective(
+                user=self.user,
+                project_id=self.project_ids.get(data['project_id']),
+                description=data['description'],
+                date=data['date'],
+                is_completed=data['is_completed'],
+                completed_at=data['completed_at'],
+            ))
+        else:
+            self.pending['checkin'].append(DailyCheckIn(user=self.user, **data))
+
+        if len(self.pending[record_type]) >= self.batch_size:
+            self.flush(record_type)
+
+    def flush(self, record_type):
+        batch, self.pending[record_type] = self.pending[record_type], []
+        if not batch:
+            return
+        with transaction.atomic():
+            if record_type == 'project':
+                old_ids = [old_id for old_id, _ in batch]
+                created = Project.objects.bulk_create([project for _, project in batch])
+                self.project_ids.update(zip(old_ids, [project.pk for project in created]))
+            elif record_type == 'hobby':
+                created = Hobby.objects.bulk_create(batch)
+            elif record_type == 'objective':
+                created = Objective.objects.bulk_create(batch)
+            elif record_type == 'checkin':
+                created = self.write_checkins(batch)
+            if record_type in ('project', 'objective'):
+                # bulk_create skips post_save, so keep the search index in step here.
+                search.index_instances([obj for obj in created if obj.pk is not None])
+        self.counts[record_type] += len(created)
+
+    def write_checkins(self, batch):
+        """Upsert check-ins by day; returns only the rows that were inserted."""
+        # The last check-in for a day wins, as it would have through the API.
+        latest = {checkin.date: checkin for checkin in batch}
+        archived = list(ArchivedCheckIn.objects.filter(user=self.user, date__in=list(latest)))
+        for archived_checkin in archived:
+            checkin = latest.pop(archived_checkin.date)
+            archived_checkin.mood, archived_checkin.notes = checkin.mood, checkin.notes
+        if archived:
+            ArchivedCheckIn.objects.bulk_update(archived, ['mood', 'notes'])
+            search.index_instances(archived)
+
+        existing = set(
+            DailyCheckIn.objects.filter(user=self.user, date__in=list(latest)).values_list('date', flat=True)
+        )
+        # An upsert may touch each (user, date) only once per statement.
+        written = DailyCheckIn.objects.bulk_create(
+            list(latest.values()),
+            update_conflicts=True,
+            unique_fields=['user', 'date'],
+            update_fields=['mood', 'notes'],
+        )
+        search.index_instances([checkin for checkin in written if checkin.pk is not None])
+        self.updated['checkin'] += len(archived) + len(existing)
+        return [checkin for checkin in written if checkin.date not in existing]
+
+    def flush_all(self):
+        for record_type in self.pending:
+            self.flush(record_type)
@@ -0,0 +1,81 @@
+import contextvars
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+
+REPLICA_ALIAS = 'replica'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_use_replica = contextvars.ContextVar('momentum_use_replica', default=False)
+
+
+def _pin_key(user_id):
+    return f'db-primary-pin:{user_id}'
+
+
+def pin_to_primary(user):
+    """Keep this user's reads on the primary until the replica has caught up."""
+    if user is not None and user.is_authenticated:
+        cache.set(_pin_key(user.pk), True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned_to_primary(user):
+    return user is not None and user.is_authenticated and bool(cache.get(_pin_key(user.pk)))
+
+
+@contextmanager
+def replica_reads(user=None):
+    """Route reads inside the block to the replica unless the user wrote recently."""
+    if REPLICA_ALIAS not in connections.databases or is_pinned_to_primary(user):
+        yield
+        return
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def use_read_replica(view):
+    """For read-only function views; apply beneath @api_view so request.user is set."""
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        with replica_reads(request.user):
+            return view(request, *args, **kwargs)
+    return wrapped
+
+
+class ReadReplicaListMixin:
+    def list(self, request, *args, **kwargs):
+        with replica_reads(request.user):
+            return super().list(request, *args, **kwargs)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _use_replica.get():
+            return REPLICA_ALIAS
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+
+class ReplicaPinMiddleware:
+    """Pins a user to the primary after any successful write request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            pin_to_primary(getattr(request, 'user', None))
+        return response
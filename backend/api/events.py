@@ -0,0 +1,184 @@
+import asyncio
+import json
+import logging
+import threading
+
+from django.conf import settings
+from django.core import signing
+from django.core.serializers.json import DjangoJSONEncoder
+
+from . import metrics
+
+
+logger = logging.getLogger(__name__)
+
+REDIS_CHANNEL = 'momentum:events'
+TICKET_SALT = 'api.events.ticket'
+
+
+def issue_ticket(user):
+    """
+    A short-lived signed ticket naming the user. EventSource cannot send an
+    Authorization header, and a ticket in the URL is harmless once expired,
+    unlike an API token.
+    """
+    return signing.TimestampSigner(salt=TICKET_SALT).sign(str(user.pk))
+
+
+def ticket_user_id(ticket):
+    """The user id a ticket was issued to, or None if it is forged or older than EVENTS_TICKET_MAX_AGE."""
+    try:
+        value = signing.TimestampSigner(salt=TICKET_SALT).unsign(ticket, max_age=settings.EVENTS_TICKET_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    return int(value)
+
+
+class Subscription:
+    """One open event stream; events are handed over to the stream's event loop."""
+
+    def __init__(self, user_id, loop, maxsize):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def deliver(self, event):
+        # Runs on self.loop. A client that falls behind gets one resync event
+        # instead of an unbounded backlog.
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({'type': 'resync'})
+
+
+class EventBroker:
+    """
+    Fans events out to the open streams of one user within this process. With
+    a Redis relay configured, publish goes through Redis so every worker
+    process receives it.
+    """
+
+    def __init__(self):
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+        self._relay = None
+
+    def subscribe(self, user_id):
+        subscription = Subscription(
+            user_id, asyncio.get_running_loop(), getattr(settings, 'EVENTS_QUEUE_SIZE', 100)
+        )
+        with self._lock:
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+        self._ensure_relay()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(subscription.user_id, None)
+
+    def has_subscribers(self, user_id):
+        # With a relay the listeners may live in another process.
+        return self._use_redis() or user_id in self._subscriptions
+
+    def publish(self, user_id, event):
+        if self._use_redis():
+            try:
+                _redis_client().publish(REDIS_CHANNEL, json.dumps(
+                    {'user_id': user_id, 'event': event}, cls=DjangoJSONEncoder
+                ))
+                return
+            except Exception:
+                logger.exception("Redis publish failed; delivering locally only")
+        self.deliver_local(user_id, event)
+
+    def deliver_local(self, user_id, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # The stream's event loop has shut down.
+                self.unsubscribe(subscription)
+                continue
+            metrics.EVENTS_DELIVERED.inc(type=event['type'])
+
+    def _use_redis(self):
+        return getattr(settings, 'EVENTS_BROKER', 'local') == 'redis'
+
+    def _ensure_relay(self):
+        if not self._use_redis() or (self._relay is not None and self._relay.is_alive()):
+            return
+        with self._lock:
+            if self._relay is not None and self._relay.is_alive():
+                return
+            self._relay = threading.Thread(target=self._run_relay, name='event-relay', daemon=True)
+            self._relay.start()
+
+    def _run_relay(self):
+        while True:
+            try:
+                pubsub = _redis_client().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(REDIS_CHANNEL)
+                for message in pubsub.listen():
+                    payload = json.loads(message['data'])
+                    self.deliver_local(payload['user_id'], payload['event'])
+            except Exception:
+                logger.exception("Event relay disconnected; reconnecting")
+                threading.Event().wait(1.0)
+
+
+def _redis_client():
+    import redis
+
+    return redis.Redis.from_url(settings.REDIS_URL)
+
+
+broker = EventBroker()
+
+
+def event_for(instance, action):
+    from .models import DailyCheckIn, Objective, Project
+    from .serializers import DailyCheckInSerializer, ObjectiveSerializer, ProjectSerializer
+
+    kind, serializer_class = {
+        Objective: ('objective', ObjectiveSerializer),
+        Project: ('project', ProjectSerializer),
+        DailyCheckIn: ('checkin', DailyCheckInSerializer),
+    }[type(instance)]
+    if action == 'deleted':
+        return {'type': f'{kind}.deleted', 'id': instance.pk}
+    return {'type': f'{kind}.{action}', 'id': instance.pk, 'data': serializer_class(instance).data}
+
+
+def encode_sse(event, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f"event: {event['type']}")
+    lines.append(f'data: {json.dumps(event, cls=DjangoJSONEncoder)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+async def stream(user_id):
+    """Server-sent events for one user, with a comment line as heartbeat."""
+    subscription = broker.subscribe(user_id)
+    heartbeat = getattr(settings, 'EVENTS_HEARTBEAT_SECONDS', 15)
+    event_id = 0
+    try:
+        yield encode_sse({'type': 'ready'})
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+            event_id += 1
+            yield encode_sse(event, event_id)
+    finally:
+        broker.unsubscribe(subscription)
@@ -0,0 +1,49 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+
+
+# Workers unpickle functions from this module, so it must not import models:
+# the app registry is never set up in them, only settings.
+
+
+def hash_passwords(passwords):
+    """make_password for each entry; a blank or None password gives an unusable one."""
+    return [make_password(password or None) for password in passwords]
+
+
+class PasswordHashPool:
+    """
+    Spreads password hashing over worker processes. Workers are spawned rather
+    than forked so they inherit neither the server's threads nor its database
+    connections.
+    """
+
+    def __init__(self, workers=0):
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = None
+
+    def hash(self, passwords):
+        if self.workers <= 1 or len(passwords) < 2 * self.workers:
+            return hash_passwords(passwords)
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
+            )
+        # A few batches per worker keeps them all busy without per-password IPC.
+        size = -(-len(passwords) // (self.workers * 4))
+        batches = [passwords[i:i + size] for i in range(0, len(passwords), size)]
+        return [hashed for batch in self._executor.map(hash_passwords, batches) for hashed in batch]
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,189 @@
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from . import search
+from .models import ArchiveRun, ArchivedCheckIn, ArchivedObjective, DailyCheckIn, Objective, Project
+
+
+def archive_cutoff(horizon_days=None):
+    """Rows dated before this day are eligible for cold storage."""
+    if horizon_days is None:
+        horizon_days = settings.ARCHIVE_HORIZON_DAYS
+    return timezone.now().date() - timedelta(days=horizon_days)
+
+
+WATERMARK_CACHE_KEY = 'archive-watermark'
+_UNSET = object()
+
+
+def archive_watermark():
+    """The latest cutoff any archive run has used, or None if nothing was archived."""
+    watermark = cache.get(WATERMARK_CACHE_KEY, _UNSET)
+    if watermark is _UNSET:
+        watermark = ArchiveRun.objects.aggregate(cutoff=Max('cutoff'))['cutoff']
+        cache.set(WATERMARK_CACHE_KEY, watermark, settings.ARCHIVE_WATERMARK_CACHE_SECONDS)
+    return watermark
+
+
+def forget_archive_watermark():
+    cache.delete(WATERMARK_CACHE_KEY)
+
+
+def touches_archive(start_date):
+    # A run may use a shorter horizon than ARCHIVE_HORIZON_DAYS, so go by the
+    # cutoffs actually used; rows dated on or after the latest one are hot.
+    watermark = archive_watermark()
+    return watermark is not None and start_date < watermark
+
+
+def objectives_between(user, start_date, end_date):
+    """Objectives in [start_date, end_date] from hot and cold storage, oldest first."""
+    hot = list(
+        Objective.objects.filter(user=user, date__range=(start_date, end_date))
+        .select_related('project')
+    )
+    if not touches_archive(start_date):
+        return hot
+    cold = list(ArchivedObjective.objects.filter(user=user, date__range=(start_date, end_date)))
+    # Archived rows keep only the project id; look the names up once for the serializer.
+    names = dict(
+        Project.objects.filter(id__in={obj.project_id for obj in cold if obj.project_id})
+        .values_list('id', 'name')
+    )
+    for obj in cold:
+        obj.project_name = names.get(obj.project_id)
+    return sorted(cold + hot, key=lambda obj: (obj.date, obj.id))
+
+
+def checkins_between(user, start_date, end_date):
+    hot = list(DailyCheckIn.objects.filter(user=user, date__range=(start_date, end_date)))
+    if not touches_archive(start_date):
+        return hot
+    cold = list(ArchivedCheckIn.objects.filter(user=user, date__range=(start_date, end_date)))
+    return sorted(cold + hot, key=lambda checkin: checkin.date, reverse=True)
+
+
+def completion_stats(user, start_date, end_date):
+    per_day = defaultdict(lambda: {'total': 0, 'completed': 0})
+    models = [Objective]
+    if touches_archive(start_date):
+        models.append(ArchivedObjective)
+    for model in models:
+        rows = (
+            model.objects.filter(user=user, date__range=(start_date, end_date))
+            .values('date')
+            .annotate(total=Count('id'), completed=Count('id', filter=Q(is_completed=True)))
+            .order_by()
+        )
+        for row in rows:
+            per_day[row['date']]['total'] += row['total']
+            per_day[row['date']]['completed'] += row['completed']
+
+    moods = Counter(checkin.mood for checkin in checkins_between(user, start_date, end_date))
+    total = sum(day['total'] for day in per_day.values())
+    completed = sum(day['completed'] for day in per_day.values())
+    return {
+        'start_date': start_date,
+        'end_date': end_date,
+        'total_objectives': total,
+        'completed_objectives': completed,
+        'completion_rate': round(completed / total, 3) if total else None,
+        'moods': dict(moods),
+        'days': [
+            {'date': day, **counts}
+            for day, counts in sorted(per_day.items())
+        ],
+    }
+
+
+OBJECTIVE_ARCHIVE_FIELDS = [
+    'user', 'project_id', 'description', 'date', 'is_completed', 'completed_at', 'created_at', 'updated_at',
+]
+CHECKIN_ARCHIVE_FIELDS = ['user', 'date', 'mood', 'notes', 'created_at']
+
+
+def archive_history(cutoff, batch_size=2000):
+    """Archive everything dated before cutoff and record the run's watermark."""
+    # Recorded first, so reads consult cold storage while rows are moving.
+    run = ArchiveRun.objects.create(cutoff=cutoff)
+    forget_archive_watermark()
+    run.objectives = archive_objectives(cutoff, batch_size)
+    run.checkins = archive_checkins(cutoff, batch_size)
+    run.finished_at = timezone.now()
+    run.save(update_fields=['objectives', 'checkins', 'finished_at'])
+    # Again, in case a read cached the old watermark while the run was starting.
+    forget_archive_watermark()
+    return run
+
+
+def _move(model, archive_model, fields, batch):
+    """
+    Upsert the batch into the archive by id, then delete only the hot rows
+    whose copy is confirmed there.
+    """
+    ids = [row['id'] for row in batch]
+    archive_model.objects.bulk_create(
+        [archive_model(**row) for row in batch],
+        update_conflicts=True,
+        unique_fields=['id'],
+        update_fields=fields,
+    )
+    copied = list(archive_model.objects.filter(id__in=ids).values_list('id', flat=True))
+    if len(copied) != len(ids):
+        raise RuntimeError(f"{len(ids) - len(copied)} {model.__name__} rows were not archived")
+    # Archived rows keep their ids and stay in the search index.
+    with search.suppress_sync():
+        model.objects.filter(id__in=copied).delete()
+    return len(copied)
+
+
+def archive_objectives(cutoff, batch_size=2000):
+    """Move objectives dated before cutoff into ArchivedObjective, one batch per transaction."""
+    moved = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                Objective.objects.filter(date__lt=cutoff)
+                .order_by('id')
+                .values('id', 'user_id', 'project_id', 'description', 'date', 'is_completed',
+                        'completed_at', 'created_at', 'updated_at')
+                [:batch_size]
+            )
+            if not batch:
+                return moved
+            moved += _move(Objective, ArchivedObjective, OBJECTIVE_ARCHIVE_FIELDS, batch)
+
+
+def archive_checkins(cutoff, batch_size=2000):
+    moved = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                DailyCheckIn.objects.filter(date__lt=cutoff)
+                .order_by('id')
+                .values('id', 'user_id', 'date', 'mood', 'notes', 'created_at')
+                [:batch_size]
+            )
+            if not batch:
+                return moved
+            # A check-in re-posted for an archived day is the newer answer:
+            # it replaces the archived row for that (user, date).
+            days = {(row['user_id'], row['date']) for row in batch}
+            superseded = [
+                checkin_id for checkin_id, user_id, day in
+                ArchivedCheckIn.objects.filter(
+                    user_id__in={user_id for user_id, _ in days},
+                    date__in={day for _, day in days},
+                ).exclude(id__in=[row['id'] for row in batch]).values_list('id', 'user_id', 'date')
+                if (user_id, day) in days
+            ]
+            if superseded:
+                ArchivedCheckIn.objects.filter(id__in=superseded).delete()
+                search.remove('checkin', superseded)
+            moved += _move(DailyCheckIn, ArchivedCheckIn, CHECKIN_ARCHIVE_FIELDS, batch)
@@ -0,0 +1,151 @@
+import tempfile
+from datetime import timedelta
+from functools import partial, wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyRecord
+
+
+HEADER = 'Idempotency-Key'
+REPLAY_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+# Larger bodies (bulk imports) are spooled to disk while they are hashed so
+# they can still be read as a stream.
+MAX_FINGERPRINT_BODY = 1024 * 1024
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def _scope(request, fingerprint):
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    # Anonymous keys only match a retry of the same body (username and
+    # password included), so one client can never replay another's response.
+    return f'anon:{fingerprint[:27]}'
+
+
+def _fingerprint(request):
+    # Keyed with SECRET_KEY: bodies may contain passwords.
+    digest = salted_hmac('api.idempotency.fingerprint', f'{request.method} {request.path}\n', algorithm='sha256')
+    http_request = getattr(request, '_request', request)
+    length = int(request.META.get('CONTENT_LENGTH') or 0)
+    if length <= MAX_FINGERPRINT_BODY:
+        digest.update(http_request.body)
+        return digest.hexdigest()
+
+    spool = tempfile.SpooledTemporaryFile(max_size=MAX_FINGERPRINT_BODY)
+    for chunk in iter(lambda: http_request.read(READ_CHUNK_SIZE), b''):
+        digest.update(chunk)
+        spool.write(chunk)
+    spool.seek(0)
+    # Both the Django request and DRF's Request.stream now read the spool.
+    http_request._stream = spool
+    if request is not http_request:
+        request._stream = spool
+    return digest.hexdigest()
+
+
+def _error(message, status_code):
+    return Response({'error': message}, status=status_code)
+
+
+def _claim(request, key, fingerprint):
+    """Returns (record, replay): the pending record to fill in, or a stored record to replay."""
+    scope = _scope(request, fingerprint)
+    ttl = timedelta(seconds=getattr(settings, 'IDEMPOTENCY_TTL_SECONDS', 86400))
+    lock_timeout = timedelta(seconds=getattr(settings, 'IDEMPOTENCY_LOCK_SECONDS', 300))
+    now = timezone.now()
+
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                record = IdempotencyRecord.objects.create(
+                    scope=scope,
+                    key=key,
+                    user=request.user if request.user.is_authenticated else None,
+                    method=request.method,
+                    path=request.path[:500],
+                    fingerprint=fingerprint,
+                )
+            return record, False
+        except IntegrityError:
+            pass
+
+        existing = IdempotencyRecord.objects.filter(scope=scope, key=key).first()
+        if existing is None:
+            continue
+        expired = existing.created_at < now - ttl
+        abandoned = existing.status_code is None and existing.created_at < now - lock_timeout
+        if expired or abandoned:
+            existing.delete()
+            continue
+        return existing, True
+    return None, False
+
+
+def execute(request, handler):
+    """Run handler() once per Idempotency-Key and replay its stored response afterwards."""
+    key = request.headers.get(HEADER, '').strip()
+    if not key:
+        return handler()
+    if len(key) > MAX_KEY_LENGTH:
+        return _error(f'{HEADER} must be at most {MAX_KEY_LENGTH} characters', status.HTTP_400_BAD_REQUEST)
+
+    fingerprint = _fingerprint(request)
+    record, replay = _claim(request, key, fingerprint)
+    if record is None:
+        return _error(f'{HEADER} is busy, retry shortly', status.HTTP_409_CONFLICT)
+    if replay:
+        if record.fingerprint != fingerprint:
+            return _error(
+                f'{HEADER} was already used for a different request',
+                status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        if record.status_code is None:
+            return _error('A request with this Idempotency-Key is still in progress', status.HTTP_409_CONFLICT)
+        response = Response(record.response_body, status=record.status_code)
+        response[REPLAY_HEADER] = 'true'
+        return response
+
+    try:
+        response = handler()
+    except BaseException:
+        record.delete()
+        raise
+    # Server errors are not stored so that a retry can succeed.
+    if not isinstance(response, Response) or response.status_code >= 500:
+        record.delete()
+        return response
+    record.status_code = response.status_code
+    record.response_body = response.data
+    record.save(update_fields=['status_code', 'response_body'])
+    return response
+
+
+def idempotent(view):
+    """For function views; apply beneath @api_view and outside @transaction.atomic."""
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        return execute(request, partial(view, request, *args, **kwargs))
+    return wrapped
+
+
+class IdempotentMixin:
+    """Honours Idempotency-Key on create and update for generic views."""
+
+    def create(self, request, *args, **kwargs):
+        return execute(request, partial(super().create, request, *args, **kwargs))
+
+    def update(self, request, *args, **kwargs):
+        return execute(request, partial(super().update, request, *args, **kwargs))
+
+
+def purge_expired():
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, 'IDEMPOTENCY_TTL_SECONDS', 86400))
+    deleted, _ = IdempotencyRecord.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
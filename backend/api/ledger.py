@@ -0,0 +1,107 @@
+import atexit
+import logging
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.db import close_old_connections
+
+
+logger = logging.getLogger(__name__)
+
+
+class LedgerWriter:
+    """
+    Buffers ledger rows in memory and writes them with bulk_create off the request path.
+    Cache hits are counted per (endpoint, user) and written as one row per flush.
+    """
+
+    def __init__(self):
+        self._entries = []
+        self._hits = Counter()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def record(self, **fields):
+        from .models import LLMLedgerEntry
+
+        entry = LLMLedgerEntry(**fields)
+        with self._lock:
+            self._entries.append(entry)
+            pending = len(self._entries) + len(self._hits)
+        self._recorded(pending)
+
+    def record_hit(self, endpoint, user_id):
+        with self._lock:
+            self._hits[(endpoint, user_id)] += 1
+            pending = len(self._entries) + len(self._hits)
+        self._recorded(pending)
+
+    def _recorded(self, pending):
+        if not getattr(settings, 'LLM_LEDGER_ASYNC', True):
+            self.flush()
+            return
+
+        self._ensure_thread()
+        if pending >= getattr(settings, 'LLM_LEDGER_BATCH_SIZE', 50):
+            self._wakeup.set()
+
+    def flush(self):
+        from .models import LLMLedgerEntry
+
+        with self._lock:
+            entries, self._entries = self._entries, []
+            hits, self._hits = self._hits, Counter()
+        entries += [
+            LLMLedgerEntry(user_id=user_id, endpoint=endpoint, cache_hit=True, latency_ms=0, calls=calls)
+            for (endpoint, user_id), calls in hits.items()
+        ]
+        if not entries:
+            return 0
+        try:
+            LLMLedgerEntry.objects.bulk_create(entries, batch_size=500)
+        except Exception:
+            logger.exception("Dropping %d LLM ledger entries", len(entries))
+            return 0
+        return len(entries)
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name='llm-ledger-writer', daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        interval = getattr(settings, 'LLM_LEDGER_FLUSH_INTERVAL', 5.0)
+        while True:
+            self._wakeup.wait(interval)
+            self._wakeup.clear()
+            close_old_connections()
+            self.flush()
+
+
+writer = LedgerWriter()
+atexit.register(writer.flush)
+
+
+def record_llm_call(call):
+    writer.record(
+        user_id=call.user.pk if call.user is not None else None,
+        endpoint=call.endpoint,
+        model=call.model,
+        prompt_tokens=call.prompt_tokens,
+        output_tokens=call.output_tokens,
+        latency_ms=call.latency * 1000 if call.latency is not None else None,
+        cache_hit=False,
+        fallback=call.fallback,
+    )
+
+
+def record_cache_hit(endpoint, user):
+    writer.record_hit(endpoint, user.pk if user is not None else None)
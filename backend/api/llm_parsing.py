@@ -0,0 +1,174 @@
+import json
+
+
+class LLMOutputError(ValueError):
+    pass
+
+
+def strip_fences(text):
+    text = (text or "").strip()
+    if text.startswith("```json"):
+        text = text[7:]
+    elif text.startswith("```"):
+        text = text[3:]
+    if text.endswith("```"):
+        text = text[:-3]
+    return text.strip()
+
+
+def _scan(text):
+    """
+    Returns (string_start, item_starts): where an unterminated string at the end
+    of text opens (None if text does not end inside one), and for each open
+    array, outermost first, where its current item begins.
+    """
+    stack = []
+    string_start = None
+    escaped = False
+    for i, char in enumerate(text):
+        if string_start is not None:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                string_start = None
+        elif char == '"':
+            string_start = i
+        elif char == "[":
+            stack.append(i + 1)
+        elif char == "{":
+            stack.append(None)
+        elif char in "]}" and stack:
+            stack.pop()
+        elif char == "," and stack and stack[-1] is not None:
+            stack[-1] = i
+    return string_start, [start for start in stack if start is not None]
+
+
+def _close_json(text):
+    """Close any open brackets, dropping a dangling comma or key; text must not end inside a string."""
+    stack = []
+    in_string = False
+    escaped = False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "[{":
+            stack.append("]" if char == "[" else "}")
+        elif char in "]}" and stack:
+            stack.pop()
+
+    text = text.rstrip()
+    if text.endswith(","):
+        text = text[:-1]
+    elif text.endswith(":"):
+        text += " null"
+    return text + "".join(reversed(stack))
+
+
+def _cut_candidates(text):
+    """Yield progressively shorter prefixes, each ending just before a comma outside a string."""
+    in_string = False
+    escaped = False
+    cut_points = []
+    for i, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == ",":
+            cut_points.append(i)
+    for i in reversed(cut_points[-8:]):
+        yield text[:i]
+
+
+def repair_candidates(text):
+    """Yield parsed values for repairs of JSON cut off mid-generation, least destructive first."""
+    string_start, item_starts = _scan(text)
+    if string_start is not None:
+        # A string cut off mid-way is never kept: drop the array item it was
+        # part of, or the value itself when it is in no array.
+        text = text[:item_starts[0]] if item_starts else text[:string_start]
+    for candidate in (text, *_cut_candidates(text)):
+        try:
+            yield json.loads(_close_json(candidate))
+        except ValueError:
+            continue
+
+
+_TYPE_CHECKS = {
+    "STRING": lambda v: isinstance(v, str),
+    "INTEGER": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "NUMBER": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "BOOLEAN": lambda v: isinstance(v, bool),
+    "ARRAY": lambda v: isinstance(v, list),
+    "OBJECT": lambda v: isinstance(v, dict),
+}
+
+
+def validate(value, schema, path="$"):
+    expected = schema["type"]
+    if expected == "INTEGER" and isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if not _TYPE_CHECKS[expected](value):
+        raise LLMOutputError(f"{path}: expected {expected.lower()}")
+
+    if expected == "STRING":
+        if not value.strip():
+            raise LLMOutputError(f"{path}: empty string")
+        return value.strip()
+
+    if expected == "ARRAY":
+        items = [validate(item, schema["items"], f"{path}[{i}]") for i, item in enumerate(value)]
+        if len(items) < int(schema.get("min_items", 0)):
+            raise LLMOutputError(f"{path}: expected at least {schema['min_items']} items")
+        if "max_items" in schema:
+            items = items[:int(schema["max_items"])]
+        return items
+
+    if expected == "OBJECT":
+        result = {}
+        for key in schema.get("required", []):
+            if key not in value:
+                raise LLMOutputError(f"{path}: missing '{key}'")
+        for key, subschema in schema["properties"].items():
+            if key in value:
+                result[key] = validate(value[key], subschema, f"{path}.{key}")
+        return result
+
+    return value
+
+
+def parse_llm_json(text, schema):
+    """
+    Parse and validate a model response against a response schema. Returns
+    (value, repaired); raises LLMOutputError when the text cannot be salvaged.
+    """
+    text = strip_fences(text)
+    if not text:
+        raise LLMOutputError("Empty response")
+
+    try:
+        return validate(json.loads(text), schema), False
+    except ValueError as e:
+        error = e
+
+    for value in repair_candidates(text):
+        try:
+            return validate(value, schema), True
+        except LLMOutputError:
+            continue
+    raise LLMOutputError(f"Could not parse or repair LLM output: {error}")
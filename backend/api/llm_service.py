@@ -1,112 +1,67 @@
-import json
+import logging
 import os
+import time
 from datetime import datetime, timedelta
-from google import genai
-from google.genai import types
+from django.conf import settings
+from django.db.models import F
 
+from . import ledger, metrics, profiling
+from .db_router import replica_reads
+from .llm_parsing import LLMOutputError, parse_llm_json
+from .prompt_budget import PromptBudget, dedupe
 
-def get_gemini_client():
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if not api_key:
-        raise ValueError("GEMINI_API_KEY environment variable is not set")
-    return genai.Client(api_key=api_key)
 
+logger = logging.getLogger(__name__)
 
-def generate_daily_plan(user, user_profile, yesterday_date):
-    active_projects = user.projects.filter(is_active=True)
-    hobbies = user.hobbies.all()
-    
-    yesterday_objectives = user.objectives.filter(date=yesterday_date)
-    completed_yesterday = yesterday_objectives.filter(is_completed=True)
-    incomplete_yesterday = yesterday_objectives.filter(is_completed=False)
-    
-    latest_checkin = user.daily_checkins.order_by('-date').first()
-    
-    yesterday_mood = latest_checkin.mood if latest_checkin else "Unknown"
-    yesterday_notes = latest_checkin.notes if latest_checkin else ""
-    
-    prompt = f"""You are an expert productivity and wellness coach named 'Momentum'. Your tone is encouraging, empathetic, and concise.
+
+GEMINI_MODEL = "gemini-2.5-flash"
+
+
+# Context lists are capped before budgeting so a long history never loads in full.
+MAX_CONTEXT_ITEMS = 50
+
+DAILY_PLAN_PROMPT = """You are an expert productivity and wellness coach named 'Momentum'. Your tone is encouraging, empathetic, and concise.
 
 ## USER CONTEXT
-- Name: {user.first_name or user.username}
-- Primary Goal: {user_profile.goal}
-- Preferred Method: {user_profile.scheduling_method}
-- Active Projects: {', '.join([p.name for p in active_projects]) if active_projects.exists() else 'None'}
-- Known Hobbies: {', '.join([h.name for h in hobbies]) if hobbies.exists() else 'None'}
+- Name: {name}
+- Primary Goal: {goal}
+- Preferred Method: {scheduling_method}
+- Active Projects: {projects}
+- Known Hobbies: {hobbies}
 
 ## RECENT PERFORMANCE
-- Yesterday's completed tasks: {', '.join([obj.description for obj in completed_yesterday]) if completed_yesterday.exists() else 'None'}
-- Yesterday's incomplete tasks: {', '.join([obj.description for obj in incomplete_yesterday]) if incomplete_yesterday.exists() else 'None'}
+- Yesterday's completed tasks: {completed}
+- Yesterday's incomplete tasks: {incomplete}
 
 ## USER'S REPORTED STATE
-- Yesterday's Mood: {yesterday_mood}
-- Notes: {yesterday_notes if yesterday_notes else 'None'}
+- Yesterday's Mood: {mood}
+- Notes: {notes}
 
 ## YOUR TASK
 Based on all the context above, generate a list of 3-5 objectives for today.
 1. Re-prioritize and include any incomplete tasks from yesterday. If the user was 'Stressful' or 'Tired', break the incomplete task into a smaller, more manageable first step.
 2. Align new tasks with the user's primary goal and active projects.
-3. Use the principles of the '{user_profile.scheduling_method}' method to frame the tasks.
+3. Use the principles of the '{scheduling_method}' method to frame the tasks.
 4. Provide one short, encouraging sentence at the start, acknowledging their reported mood from yesterday.
 5. Format the output as a JSON array of strings ONLY. Do not include any other text or markdown. Example: ["Finish the intro to the report.", "Go for a 20-minute walk.", "Read 10 pages of 'Atomic Habits'."]"""
 
-    try:
-        client = get_gemini_client()
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=prompt
-        )
-        
-        response_text = response.text.strip()
-        
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]
-        if response_text.startswith("```"):
-            response_text = response_text[3:]
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]
-        
-        response_text = response_text.strip()
-        
-        objectives = json.loads(response_text)
-        
-        if not isinstance(objectives, list):
-            raise ValueError("Response is not a list")
-        
-        return objectives
-    
-    except Exception as e:
-        return [
-            "Review yesterday's incomplete tasks and prioritize one to complete today",
-            "Take a 15-minute break to stretch or walk",
-            f"Work on your goal: {user_profile.goal}"
-        ]
-
-
-def generate_hobby_suggestion(user, user_profile):
-    active_projects = user.projects.filter(is_active=True)
-    hobbies = user.hobbies.all()
-    latest_checkin = user.daily_checkins.order_by('-date').first()
-    
-    current_mood = latest_checkin.mood if latest_checkin else "Unknown"
-    
-    prompt = f"""You are an expert wellness coach named 'Momentum'. Your tone is encouraging and empathetic.
+HOBBY_SUGGESTION_PROMPT = """You are an expert wellness coach named 'Momentum'. Your tone is encouraging and empathetic.
 
 ## USER CONTEXT
-- Name: {user.first_name or user.username}
-- Primary Goal: {user_profile.goal}
-- Active Projects: {', '.join([p.name for p in active_projects]) if active_projects.exists() else 'None'}
-- Current Hobbies: {', '.join([h.name for h in hobbies]) if hobbies.exists() else 'None'}
-- Current Mood: {current_mood}
+- Primary Goal: {goal}
+- Active Projects: {projects}
+- Current Hobbies: {hobbies}
+- Current Mood: {mood}
 
 ## YOUR TASK
 Based on the user's current state and existing hobbies, suggest ONE new hobby that would complement their lifestyle and help them achieve balance.
 
 Consider:
-1. Their current stress level (mood: {current_mood})
+1. Their current stress level (mood: {mood})
 2. Their active projects and primary goal
 3. Hobbies they already enjoy
 4. Suggest something that provides balance or complements their existing activities
+5. The suggestion is shared with people in a similar situation: do not use names or invent personal details
 
 Provide your suggestion in the following JSON format ONLY:
 {{
@@ -117,62 +72,44 @@ Provide your suggestion in the following JSON format ONLY:
 
 Do not include any other text or markdown."""
 
-    try:
-        client = get_gemini_client()
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=prompt
-        )
-        
-        response_text = response.text.strip()
-        
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]
-        if response_text.startswith("```"):
-            response_text = response_text[3:]
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]
-        
-        response_text = response_text.strip()
-        
-        suggestion = json.loads(response_text)
-        
-        return suggestion
-    
-    except Exception as e:
-        return {
-            "hobby_name": "Mindful Walking",
-            "description": "A simple practice that combines physical activity with mental clarity. Perfect for balancing busy schedules with moments of peace.",
-            "getting_started": "Tomorrow, take a 10-minute walk without your phone and focus on your breathing and surroundings."
-        }
+WEEKLY_PLAN_PROMPT = """You are an expert productivity and wellness coach named 'Momentum'. Your tone is encouraging, empathetic, and concise.
 
+## USER CONTEXT
+- Name: {name}
+- Primary Goal: {goal}
+- Preferred Method: {scheduling_method}
+- Active Projects (with due dates): {projects}
+- Known Hobbies: {hobbies}
 
-def generate_workout_plan(user, user_profile):
-    latest_checkin = user.daily_checkins.order_by('-date').first()
-    current_mood = latest_checkin.mood if latest_checkin else "Unknown"
-    
-    height_cm = user_profile.height_cm or "Not specified"
-    weight_kg = user_profile.weight_kg or "Not specified"
-    body_fat = user_profile.body_fat_percentage or "Not specified"
-    
-    prompt = f"""You are an expert fitness coach named 'Momentum'. Your tone is encouraging, safe, and adaptive.
+## RECENT PERFORMANCE
+- Unfinished tasks from the past week: {incomplete}
+- Latest Mood: {mood}
+- Notes: {notes}
+
+## YOUR TASK
+Draft a plan for the next 7 days: {days}.
+1. Give each day 3-5 short objectives, spreading project work so every project due this week is finished by its due date.
+2. Schedule the unfinished tasks early in the week, broken into small steps if the user was 'Stressful' or 'Tired'.
+3. Align the remaining objectives with the user's primary goal and the '{scheduling_method}' method, and leave room for rest and hobbies.
+4. Format the output as a JSON array of 7 objects, one per day in order, each with "date" (YYYY-MM-DD) and "objectives" (array of strings). Do not include any other text or markdown."""
+
+
+WORKOUT_TEMPLATE_PROMPT = """You are an expert fitness coach named 'Momentum'. Your tone is encouraging, safe, and adaptive.
 
 ## USER CONTEXT
-- Name: {user.first_name or user.username}
-- Primary Goal: {user_profile.goal}
-- Height: {height_cm} cm
-- Weight: {weight_kg} kg
-- Body Fat: {body_fat}%
-- Current Mood: {current_mood}
+- Current Mood: {mood}
+- Body Composition: {body}
+- Fitness Goal: {goal}
 
 ## YOUR TASK
-Generate a personalized workout plan for today that adapts to their current mood and fitness level.
+Generate a workout plan for today that adapts to this mood and fitness level.
 
 Consider:
 1. If they're feeling 'Tired' or 'Overwhelmed', suggest a lighter, restorative workout
 2. If they're feeling 'Energetic' or 'Focused', suggest a more challenging routine
-3. Keep the workout realistic and achievable (20-45 minutes)
+3. Keep the workout realistic and achievable (20-45 minutes) and safe for the body composition above
 4. Include warm-up, main exercises, and cool-down
+5. The plan is shared by many people: do not use names or invent personal details
 
 Provide your workout in the following JSON format ONLY:
 {{
@@ -187,36 +124,424 @@ Provide your workout in the following JSON format ONLY:
 
 Do not include any other text or markdown."""
 
-    try:
+WORKOUT_BODY_DESCRIPTIONS = {
+    "unknown": "Not specified",
+    "lean": "Lean (BMI under 18.5 or low body fat)",
+    "healthy": "Healthy range (BMI 18.5-25)",
+    "overweight": "Overweight (BMI 25-30)",
+    "obese": "Obese (BMI 30+); favour low-impact movements",
+}
+
+WORKOUT_GOAL_DESCRIPTIONS = {
+    "weight_loss": "Losing weight",
+    "strength": "Building strength and muscle",
+    "endurance": "Improving endurance (running, cycling, swimming)",
+    "mobility": "Flexibility, mobility and posture",
+    "wellbeing": "Reducing stress and feeling balanced",
+    "general": "General fitness",
+}
+
+WORKOUT_PLAN_FALLBACK = {
+    "workout_type": "Light Activity",
+    "duration_minutes": 20,
+    "encouragement": "Start with something simple today. Movement is progress!",
+    "exercises": [
+        {"name": "Gentle stretching", "duration": "5 minutes", "notes": "Focus on areas that feel tight"},
+        {"name": "Brisk walking", "duration": "10 minutes", "notes": "Go at your own pace"},
+        {"name": "Cool down stretches", "duration": "5 minutes", "notes": "Deep breathing while stretching"}
+    ]
+}
+
+
+DAILY_PLAN_SCHEMA = {
+    "type": "ARRAY",
+    "items": {"type": "STRING"},
+    "min_items": 1,
+    "max_items": 8,
+}
+
+WEEKLY_PLAN_SCHEMA = {
+    "type": "ARRAY",
+    "min_items": 7,
+    "max_items": 7,
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "date": {"type": "STRING"},
+            "objectives": {
+                "type": "ARRAY",
+                "items": {"type": "STRING"},
+                "min_items": 1,
+                "max_items": 6,
+            },
+        },
+        "required": ["date", "objectives"],
+        "property_ordering": ["date", "objectives"],
+    },
+}
+
+HOBBY_SUGGESTION_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "hobby_name": {"type": "STRING"},
+        "description": {"type": "STRING"},
+        "getting_started": {"type": "STRING"},
+    },
+    "required": ["hobby_name", "description", "getting_started"],
+    "property_ordering": ["hobby_name", "description", "getting_started"],
+}
+
+WORKOUT_PLAN_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "workout_type": {"type": "STRING"},
+        "duration_minutes": {"type": "INTEGER"},
+        "encouragement": {"type": "STRING"},
+        "exercises": {
+            "type": "ARRAY",
+            "min_items": 1,
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "name": {"type": "STRING"},
+                    "duration": {"type": "STRING"},
+                    "notes": {"type": "STRING"},
+                },
+                "required": ["name", "duration"],
+                "property_ordering": ["name", "duration", "notes"],
+            },
+        },
+    },
+    "required": ["workout_type", "duration_minutes", "encouragement", "exercises"],
+    "property_ordering": ["workout_type", "duration_minutes", "encouragement", "exercises"],
+}
+
+# Retries only resend the broken output, never the full user context.
+JSON_REPAIR_MAX_CHARS = 4000
+JSON_REPAIR_MAX_TOKENS = 1024
+
+JSON_REPAIR_PROMPT = """The following text was meant to be JSON matching the response schema but is malformed or incomplete. Return the corrected JSON only, keeping the original content where possible.
+
+{output}"""
+
+
+# The Gemini SDK and NumPy (used by the hobby suggestion cache) are imported on
+# first use so that commands, tests and workers that never call the LLM do not
+# pay for them; preload() imports them up front instead.
+
+def preload():
+    """Import the LLM dependencies now, e.g. in a prefork server's master before it forks."""
+    from google import genai  # noqa: F401
+    from google.genai import types  # noqa: F401
+    from . import suggestion_cache  # noqa: F401
+
+
+def get_gemini_client():
+    from google import genai
+
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("GEMINI_API_KEY environment variable is not set")
+    return genai.Client(api_key=api_key)
+
+
+class LLMCall:
+    """Wraps one Gemini generation so latency, sizes and fallbacks are recorded."""
+
+    def __init__(self, endpoint, user=None):
+        self.endpoint = endpoint
+        self.user = user
+        self.model = GEMINI_MODEL
+        self.fallback = False
+        self.latency = None
+        self.prompt_chars = 0
+        self.response_chars = 0
+        self.prompt_tokens = None
+        self.output_tokens = None
+        self.attempts = 0
+
+    def generate(self, prompt, schema=None, max_output_tokens=None):
+        """Run one generation; repeated calls (retries) accumulate latency and tokens."""
+        config = None
+        if schema is not None:
+            from google.genai import types
+
+            config = types.GenerateContentConfig(
+                response_mime_type="application/json",
+                response_schema=schema,
+                max_output_tokens=max_output_tokens,
+            )
+
+        self.attempts += 1
+        self.prompt_chars += len(prompt)
         client = get_gemini_client()
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=prompt
+        start = time.perf_counter()
+        try:
+            response = client.models.generate_content(
+                model=self.model,
+                contents=prompt,
+                config=config
+            )
+        finally:
+            self.latency = (self.latency or 0) + time.perf_counter() - start
+
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None:
+            self.prompt_tokens = (self.prompt_tokens or 0) + (usage.prompt_token_count or 0)
+            self.output_tokens = (self.output_tokens or 0) + (usage.candidates_token_count or 0)
+
+        response_text = response.text or ""
+        self.response_chars += len(response_text)
+        return response_text
+
+    def finish(self):
+        outcome = "fallback" if self.fallback else "success"
+        metrics.LLM_CALLS.inc(endpoint=self.endpoint, outcome=outcome)
+        if self.latency is not None:
+            metrics.LLM_REQUEST_DURATION.observe(self.latency, endpoint=self.endpoint)
+            metrics.LLM_PROMPT_CHARS.observe(self.prompt_chars, endpoint=self.endpoint)
+            metrics.LLM_RESPONSE_CHARS.observe(self.response_chars, endpoint=self.endpoint)
+        profiling.record_llm_span(self)
+        ledger.record_llm_call(self)
+
+
+def generate_structured(call, prompt, schema):
+    """
+    Generate JSON constrained by a response schema. Malformed output is repaired
+    locally when possible; only if that fails is a short repair prompt sent, so a
+    bad response never costs a second full-context call.
+    """
+    response_text = call.generate(prompt, schema=schema)
+    try:
+        value, repaired = parse_llm_json(response_text, schema)
+        metrics.LLM_PARSE_RESULTS.inc(endpoint=call.endpoint, result="repaired" if repaired else "ok")
+        return value
+    except LLMOutputError as e:
+        if not response_text.strip():
+            metrics.LLM_PARSE_RESULTS.inc(endpoint=call.endpoint, result="failed")
+            raise
+        logger.warning("Unparseable %s response, retrying: %s", call.endpoint, e)
+
+    retry_prompt = JSON_REPAIR_PROMPT.format(output=response_text[:JSON_REPAIR_MAX_CHARS])
+    response_text = call.generate(retry_prompt, schema=schema, max_output_tokens=JSON_REPAIR_MAX_TOKENS)
+    try:
+        value, _ = parse_llm_json(response_text, schema)
+    except LLMOutputError:
+        metrics.LLM_PARSE_RESULTS.inc(endpoint=call.endpoint, result="failed")
+        raise
+    metrics.LLM_PARSE_RESULTS.inc(endpoint=call.endpoint, result="retried")
+    return value
+
+
+def record_prompt_budget(endpoint, report):
+    metrics.LLM_PROMPT_TOKENS.observe(report["pre_tokens"], endpoint=endpoint, stage="pre_budget")
+    metrics.LLM_PROMPT_TOKENS.observe(report["post_tokens"], endpoint=endpoint, stage="post_budget")
+    if report["post_tokens"] < report["pre_tokens"]:
+        logger.info("Trimmed %s prompt from %d to %d tokens: %s", endpoint,
+                    report["pre_tokens"], report["post_tokens"], report["dropped_items"])
+
+
+def record_cache_lookup(endpoint, user, hit):
+    metrics.record_llm_cache(endpoint, hit)
+    if hit:
+        ledger.record_cache_hit(endpoint, user)
+
+
+def build_daily_plan_prompt(user, user_profile, yesterday_date):
+    active_projects = list(
+        user.projects.filter(is_active=True)
+        .order_by(F('due_date').asc(nulls_last=True), '-updated_at')
+        .values_list('name', flat=True)[:MAX_CONTEXT_ITEMS]
+    )
+    hobbies = list(user.hobbies.values_list('name', flat=True)[:MAX_CONTEXT_ITEMS])
+
+    yesterday_objectives = list(
+        user.objectives.filter(date=yesterday_date)
+        .values_list('description', 'is_completed')[:MAX_CONTEXT_ITEMS]
+    )
+    seen = set()
+    incomplete_yesterday = dedupe([d for d, done in yesterday_objectives if not done], seen)
+    completed_yesterday = dedupe([d for d, done in yesterday_objectives if done], seen)
+
+    latest_checkin = user.daily_checkins.order_by('-date').first()
+
+    yesterday_mood = latest_checkin.mood if latest_checkin else "Unknown"
+    yesterday_notes = latest_checkin.notes if latest_checkin else ""
+
+    budget = PromptBudget(settings.LLM_PROMPT_TOKEN_BUDGETS["daily_plan"])
+    budget.add_items("incomplete", incomplete_yesterday, priority=1, min_items=1)
+    budget.add_items("projects", dedupe(active_projects), priority=2, min_items=1)
+    budget.add_text("notes", yesterday_notes, priority=3, max_chars=600)
+    budget.add_items("completed", completed_yesterday, priority=4)
+    budget.add_items("hobbies", dedupe(hobbies), priority=5)
+
+    prompt = budget.render(
+        DAILY_PLAN_PROMPT,
+        name=user.first_name or user.username,
+        goal=user_profile.goal,
+        scheduling_method=user_profile.scheduling_method,
+        mood=yesterday_mood,
+    )
+    record_prompt_budget("daily_plan", budget.report)
+    return prompt
+
+
+def generate_daily_plan(user, user_profile, yesterday_date):
+    with replica_reads(user):
+        prompt = build_daily_plan_prompt(user, user_profile, yesterday_date)
+
+    call = LLMCall("daily_plan", user)
+    try:
+        return generate_structured(call, prompt, DAILY_PLAN_SCHEMA)
+    
+    except Exception as e:
+        call.fallback = True
+        return daily_plan_fallback(user_profile)
+    finally:
+        call.finish()
+
+
+def daily_plan_fallback(user_profile):
+    return [
+        "Review yesterday's incomplete tasks and prioritize one to complete today",
+        "Take a 15-minute break to stretch or walk",
+        f"Work on your goal: {user_profile.goal}"
+    ]
+
+
+def build_weekly_plan_prompt(user, user_profile, week_start):
+    active_projects = [
+        f"{name} (due {due_date:%a %Y-%m-%d})" if due_date else name
+        for name, due_date in user.projects.filter(is_active=True)
+        .order_by(F('due_date').asc(nulls_last=True), '-updated_at')
+        .values_list('name', 'due_date')[:MAX_CONTEXT_ITEMS]
+    ]
+    hobbies = list(user.hobbies.values_list('name', flat=True)[:MAX_CONTEXT_ITEMS])
+    incomplete = list(
+        user.objectives.filter(
+            date__gte=week_start - timedelta(days=7), date__lt=week_start, is_completed=False
         )
-        
-        response_text = response.text.strip()
-        
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]
-        if response_text.startswith("```"):
-            response_text = response_text[3:]
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]
-        
-        response_text = response_text.strip()
-        
-        workout = json.loads(response_text)
-        
-        return workout
+        .order_by('-date')
+        .values_list('description', flat=True)[:MAX_CONTEXT_ITEMS]
+    )
+    latest_checkin = user.daily_checkins.order_by('-date').first()
+
+    budget = PromptBudget(settings.LLM_PROMPT_TOKEN_BUDGETS["weekly_plan"])
+    budget.add_items("projects", dedupe(active_projects), priority=1, min_items=1)
+    budget.add_items("incomplete", dedupe(incomplete), priority=2, min_items=1)
+    budget.add_text("notes", latest_checkin.notes if latest_checkin else "", priority=3, max_chars=600)
+    budget.add_items("hobbies", dedupe(hobbies), priority=4)
+
+    prompt = budget.render(
+        WEEKLY_PLAN_PROMPT,
+        name=user.first_name or user.username,
+        goal=user_profile.goal,
+        scheduling_method=user_profile.scheduling_method,
+        mood=latest_checkin.mood if latest_checkin else "Unknown",
+        days=", ".join(f"{week_start + timedelta(days=i):%a %Y-%m-%d}" for i in range(7)),
+    )
+    record_prompt_budget("weekly_plan", budget.report)
+    return prompt
+
+
+def generate_weekly_plan(user, user_profile, week_start):
+    """
+    One call drafting seven days of objectives, returned as a list of seven
+    lists. Returns None if generation fails, so no fallback week is stored.
+    """
+    with replica_reads(user):
+        prompt = build_weekly_plan_prompt(user, user_profile, week_start)
+
+    call = LLMCall("weekly_plan", user)
+    try:
+        days = generate_structured(call, prompt, WEEKLY_PLAN_SCHEMA)
+        return [day["objectives"] for day in days]
     
     except Exception as e:
+        call.fallback = True
+        return None
+    finally:
+        call.finish()
+
+
+def hobby_suggestion_context(user):
+    active_projects = list(
+        user.projects.filter(is_active=True)
+        .order_by(F('due_date').asc(nulls_last=True), '-updated_at')
+        .values_list('name', flat=True)[:MAX_CONTEXT_ITEMS]
+    )
+    hobbies = list(user.hobbies.values_list('name', flat=True)[:MAX_CONTEXT_ITEMS])
+    latest_checkin = user.daily_checkins.order_by('-date').first()
+    return {
+        "projects": dedupe(active_projects),
+        "hobbies": dedupe(hobbies),
+        "mood": latest_checkin.mood if latest_checkin else "Unknown",
+    }
+
+
+def build_hobby_suggestion_prompt(user, user_profile, context=None):
+    if context is None:
+        context = hobby_suggestion_context(user)
+
+    budget = PromptBudget(settings.LLM_PROMPT_TOKEN_BUDGETS["hobby_suggestion"])
+    budget.add_items("hobbies", context["hobbies"], priority=1, min_items=3)
+    budget.add_items("projects", context["projects"], priority=2)
+
+    prompt = budget.render(
+        HOBBY_SUGGESTION_PROMPT,
+        goal=user_profile.goal,
+        mood=context["mood"],
+    )
+    record_prompt_budget("hobby_suggestion", budget.report)
+    return prompt
+
+
+def generate_hobby_suggestion(user, user_profile):
+    from . import suggestion_cache
+
+    with replica_reads(user):
+        context = hobby_suggestion_context(user)
+        # Users with a near-identical context share one generated suggestion.
+        cached = suggestion_cache.lookup(user_profile.goal, context, user)
+    record_cache_lookup("hobby_suggestion", user, cached is not None)
+    if cached is not None:
+        return cached
+
+    prompt = build_hobby_suggestion_prompt(user, user_profile, context)
+    call = LLMCall("hobby_suggestion", user)
+    try:
+        suggestion = generate_structured(call, prompt, HOBBY_SUGGESTION_SCHEMA)
+    
+    except Exception as e:
+        call.fallback = True
         return {
-            "workout_type": "Light Activity",
-            "duration_minutes": 20,
-            "encouragement": "Start with something simple today. Movement is progress!",
-            "exercises": [
-                {"name": "Gentle stretching", "duration": "5 minutes", "notes": "Focus on areas that feel tight"},
-                {"name": "Brisk walking", "duration": "10 minutes", "notes": "Go at your own pace"},
-                {"name": "Cool down stretches", "duration": "5 minutes", "notes": "Deep breathing while stretching"}
-            ]
+            "hobby_name": "Mindful Walking",
+            "description": "A simple practice that combines physical activity with mental clarity. Perfect for balancing busy schedules with moments of peace.",
+            "getting_started": "Tomorrow, take a 10-minute walk without your phone and focus on your breathing and surroundings."
         }
+    finally:
+        call.finish()
+
+    suggestion_cache.store(user, user_profile.goal, context, suggestion)
+    return suggestion
+
+
+def generate_workout_template(mood, body_bucket, goal_category, user=None, endpoint="workout_plan"):
+    """
+    Generic workout for one library cell; it mentions no personal details so
+    it can be served to everyone in the cell. Returns None on failure.
+    """
+    prompt = WORKOUT_TEMPLATE_PROMPT.format(
+        mood=mood,
+        body=WORKOUT_BODY_DESCRIPTIONS[body_bucket],
+        goal=WORKOUT_GOAL_DESCRIPTIONS[goal_category],
+    )
+    call = LLMCall(endpoint, user)
+    try:
+        return generate_structured(call, prompt, WORKOUT_PLAN_SCHEMA)
+    
+    except Exception as e:
+        call.fallback = True
+        return None
+    finally:
+        call.finish()
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from api.history import archive_cutoff, archive_history
+from api.models import DailyCheckIn, Objective
+
+
+class Command(BaseCommand):
+    help = "Move objectives and check-ins older than the archive horizon into cold storage"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.ARCHIVE_HORIZON_DAYS,
+                            help="Keep this many days of history in the hot tables")
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--dry-run', action='store_true')
+        parser.add_argument('--vacuum', action='store_true',
+                            help="Reclaim space afterwards (SQLite VACUUM / PostgreSQL VACUUM ANALYZE)")
+
+    def handle(self, *args, **options):
+        cutoff = archive_cutoff(options['days'])
+        if options['dry_run']:
+            self.stdout.write(
+                f"Would archive {Objective.objects.filter(date__lt=cutoff).count()} objectives and "
+                f"{DailyCheckIn.objects.filter(date__lt=cutoff).count()} check-ins dated before {cutoff}"
+            )
+            return
+
+        run = archive_history(cutoff, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {run.objectives} objectives and {run.checkins} check-ins dated before {cutoff}"
+        ))
+
+        if options['vacuum'] and (run.objectives or run.checkins):
+            with connection.cursor() as cursor:
+                if connection.vendor == 'postgresql':
+                    for model in (Objective, DailyCheckIn):
+                        cursor.execute(f'VACUUM ANALYZE {model._meta.db_table}')
+                else:
+                    cursor.execute('VACUUM')
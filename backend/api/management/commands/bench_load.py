@@ -0,0 +1,325 @@
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from rest_framework.authtoken.models import Token
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from api import llm_service
+from api.management.commands.llm_report import percentile
+from api.middleware import QueryStats
+from api.models import Hobby, Objective, Project
+from api.urls import urlpatterns
+
+
+class StubResponse:
+    def __init__(self, text, prompt):
+        self.text = text
+        self.usage_metadata = mock.Mock(
+            prompt_token_count=len(prompt) // 4,
+            candidates_token_count=len(text) // 4,
+        )
+
+
+class StubGeminiClient:
+    """Answers generate_content with schema-valid JSON after a fixed delay."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.models = self
+
+    def generate_content(self, model, contents, config=None):
+        time.sleep(self.latency)
+        schema = getattr(config, 'response_schema', None)
+        value = self.sample(schema) if schema is not None else "Stubbed response"
+        return StubResponse(json.dumps(value), contents)
+
+    def sample(self, schema):
+        kind = _schema_field(schema, 'type')
+        kind = getattr(kind, 'value', kind)
+        if kind == 'ARRAY':
+            count = max(int(_schema_field(schema, 'min_items') or 0), 3)
+            return [self.sample(_schema_field(schema, 'items')) for _ in range(count)]
+        if kind == 'OBJECT':
+            properties = _schema_field(schema, 'properties') or {}
+            return {key: self.sample(subschema) for key, subschema in properties.items()}
+        if kind == 'INTEGER':
+            return 3
+        if kind == 'NUMBER':
+            return 1.5
+        if kind == 'BOOLEAN':
+            return True
+        return "Synthetic benchmark text"
+
+
+def _schema_field(schema, name):
+    if isinstance(schema, dict):
+        return schema.get(name)
+    return getattr(schema, name, None)
+
+
+def _ndjson(records):
+    return ''.join(json.dumps(record) + '\n' for record in records)
+
+
+def _bulk_users_csv(count):
+    # Blank passwords skip hashing, so this measures parsing and the bulk writes.
+    rows = [f'bench-{uuid.uuid4().hex[:12]},bench@example.com,Benchmark the API' for _ in range(count)]
+    return 'username,email,goal\n' + '\n'.join(rows) + '\n'
+
+
+# One request per route in api/urls.py; each builder returns (method, path, kwargs).
+SCENARIOS = {
+    'onboarding': lambda ctx: ('post', reverse('onboarding'), {'data': {
+        'username': f'bench-{uuid.uuid4().hex[:12]}',
+        'email': 'bench@example.com',
+        'password': 'bench-password',
+        'goal': 'Benchmark the API',
+    }, 'content_type': 'application/json'}),
+    'login': lambda ctx: ('post', reverse('login'), {'data': {
+        'username': ctx['username'], 'password': ctx['password'],
+    }, 'content_type': 'application/json'}),
+    'profile': lambda ctx: ('get', reverse('profile'), {}),
+    'update_profile': lambda ctx: ('patch', reverse('update_profile'), {
+        'data': {'goal': random.choice(['Run a marathon', 'Ship the release'])},
+        'content_type': 'application/json',
+    }),
+    'daily_plan': lambda ctx: ('get', reverse('daily_plan'), {}),
+    'weekly_plan': lambda ctx: ('get', reverse('weekly_plan'), {}),
+    'objectives_list': lambda ctx: ('get', reverse('objectives_list'), {}),
+    'objective_update': lambda ctx: ('patch', reverse('objective_update', args=[ctx['objective_id']]), {
+        'data': {'is_completed': random.random() < 0.5}, 'content_type': 'application/json',
+    }),
+    'history': lambda ctx: ('get', reverse('history'), {}),
+    'stats': lambda ctx: ('get', reverse('stats'), {}),
+    'daily_checkin': lambda ctx: ('post', reverse('daily_checkin'), {
+        'data': {'mood': random.choice(['Focused', 'Tired', 'Relaxed']), 'notes': 'Benchmark check-in'},
+        'content_type': 'application/json',
+    }),
+    'random_tip': lambda ctx: ('get', reverse('random_tip'), {}),
+    'hobby_suggestion': lambda ctx: ('get', reverse('hobby_suggestion'), {}),
+    'workout_plan': lambda ctx: ('get', reverse('workout_plan'), {}),
+    'search': lambda ctx: ('get', reverse('search'), {'data': {'q': random.choice(['review', 'draft', 'slides'])}}),
+    'export': lambda ctx: ('get', reverse('export'), {}),
+    'import': lambda ctx: ('post', reverse('import'), {
+        'data': _ndjson([{'type': 'hobby', 'name': 'Benchmark hobby', 'frequency': 'Weekly'}]),
+        'content_type': 'application/x-ndjson',
+    }),
+    'project_list': lambda ctx: ('get', reverse('project_list'), {}),
+    'project_detail': lambda ctx: ('get', reverse('project_detail', args=[ctx['project_id']]), {}),
+    'hobby_list': lambda ctx: ('get', reverse('hobby_list'), {}),
+    'hobby_detail': lambda ctx: ('get', reverse('hobby_detail', args=[ctx['hobby_id']]), {}),
+    'events_ticket': lambda ctx: ('post', reverse('events_ticket'), {}),
+    'cohort_analytics': lambda ctx: ('get', reverse('cohort_analytics'), {}),
+    'bulk_users': lambda ctx: ('post', reverse('bulk_users'), {
+        'data': _bulk_users_csv(20), 'content_type': 'text/csv',
+    }),
+}
+
+
+# Routes that cannot be measured as request/response pairs.
+UNBENCHED = {'events'}
+
+# Routes restricted to staff; they are driven by ADMIN_USERNAME instead of the synthetic users.
+ADMIN_ROUTES = {'cohort_analytics', 'bulk_users'}
+ADMIN_USERNAME = 'bench-admin'
+
+
+def user_context(user, password):
+    """Ids of rows owned by user for the detail routes, creating any that are missing."""
+    project = Project.objects.filter(user=user).first()
+    if project is None:
+        project = Project.objects.create(user=user, name="Benchmark project", start_date=timezone.now().date())
+    hobby = Hobby.objects.filter(user=user).first()
+    if hobby is None:
+        hobby = Hobby.objects.create(user=user, name="Benchmark hobby")
+    objective = Objective.objects.filter(user=user).order_by('-date').first()
+    if objective is None:
+        objective = Objective.objects.create(user=user, description="Benchmark objective", date=timezone.now().date())
+    return {
+        'username': user.username,
+        'password': password,
+        'token': user.auth_token.key,
+        'project_id': project.pk,
+        'hobby_id': hobby.pk,
+        'objective_id': objective.pk,
+    }
+
+
+def admin_context(password):
+    admin, _ = User.objects.get_or_create(
+        username=ADMIN_USERNAME, defaults={'email': 'bench@example.com', 'is_staff': True}
+    )
+    if not admin.is_staff or not admin.check_password(password):
+        admin.is_staff = True
+        admin.set_password(password)
+        admin.save(update_fields=['is_staff', 'password'])
+    Token.objects.get_or_create(user=admin)
+    return user_context(admin, password)
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+def summarize(route, samples, wall_time):
+    """Per-route results; the latency and query figures are None when no request was made."""
+    latencies = sorted(sample['latency'] for sample in samples)
+    queries = [sample['queries'] for sample in samples]
+    errors = sum(1 for sample in samples if sample['status'] >= 400)
+    return {
+        'route': route,
+        'requests': len(samples),
+        'errors': errors,
+        'throughput_rps': round(len(samples) / wall_time, 1) if samples and wall_time else None,
+        'p50_ms': _ms(percentile(latencies, 50)),
+        'p95_ms': _ms(percentile(latencies, 95)),
+        'p99_ms': _ms(percentile(latencies, 99)),
+        'queries_per_request': round(sum(queries) / len(queries), 1) if queries else None,
+        'max_queries': max(queries, default=None),
+    }
+
+
+def _show(value):
+    return '-' if value is None else value
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive every API route concurrently against a stubbed LLM and report throughput, "
+        "latency percentiles and queries per request. Writes to the configured database; "
+        "run it against a disposable copy seeded with generate_synthetic_data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=100, help="Requests per route")
+        parser.add_argument('--routes', default='', help="Comma-separated route names (default: all)")
+        parser.add_argument('--prefix', default='synth', help="Username prefix of the synthetic users")
+        parser.add_argument('--password', default='momentum-synthetic')
+        parser.add_argument('--max-users', type=int, default=50)
+        parser.add_argument('--llm-latency-ms', type=float, default=0.0,
+                            help="Delay added by the stubbed Gemini client")
+        parser.add_argument('--output', help="Write results as JSON to this path")
+        parser.add_argument('--compare', help="Previous JSON results to diff p95 and throughput against")
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        if options['concurrency'] < 1 or options['requests'] < 0:
+            raise CommandError("--concurrency must be at least 1 and --requests must not be negative")
+        url_names = [pattern.name for pattern in urlpatterns if pattern.name not in UNBENCHED]
+        routes = [name for name in options['routes'].split(',') if name] or url_names
+        unknown = [name for name in routes if name not in url_names]
+        if unknown:
+            raise CommandError(f"Unknown routes: {', '.join(unknown)}")
+        missing = [name for name in routes if name not in SCENARIOS]
+        if missing:
+            raise CommandError(f"No benchmark scenario for routes: {', '.join(missing)}")
+
+        users = list(
+            User.objects.filter(username__startswith=f"{options['prefix']}-", auth_token__isnull=False)
+            .select_related('auth_token')[:options['max_users']]
+        )
+        if not users:
+            raise CommandError(
+                f"No users named {options['prefix']}-*; run generate_synthetic_data first"
+            )
+        contexts = [user_context(user, options['password']) for user in users]
+        admin_contexts = None
+        if ADMIN_ROUTES.intersection(routes):
+            admin_contexts = [admin_context(options['password'])]
+
+        # Expected 4xx responses would otherwise flood the output with warnings.
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+        stub = StubGeminiClient(options['llm_latency_ms'] / 1000)
+        results = []
+        with mock.patch.object(llm_service, 'get_gemini_client', return_value=stub):
+            for route in routes:
+                route_contexts = admin_contexts if route in ADMIN_ROUTES else contexts
+                result = self.run_route(route, route_contexts, options['requests'], options['concurrency'])
+                results.append(result)
+                self.stdout.write(
+                    f"  {route:<18} {_show(result['throughput_rps']):>8} rps  "
+                    f"p50 {_show(result['p50_ms']):>7} ms  p95 {_show(result['p95_ms']):>7} ms  "
+                    f"p99 {_show(result['p99_ms']):>7} ms  {_show(result['queries_per_request']):>5} q/req  "
+                    f"{result['errors']} errors"
+                )
+
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'database': connections['default'].vendor,
+            'concurrency': options['concurrency'],
+            'requests_per_route': options['requests'],
+            'users': len(contexts),
+            'llm_latency_ms': options['llm_latency_ms'],
+            'routes': results,
+        }
+        if options['compare']:
+            self.compare(report, options['compare'])
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+
+    def run_route(self, route, contexts, requests, concurrency):
+        local = threading.local()
+
+        def one_request(ctx):
+            if not hasattr(local, 'client'):
+                local.client = Client(raise_request_exception=False)
+            method, path, kwargs = SCENARIOS[route](ctx)
+            query_stats = QueryStats()
+            start = time.perf_counter()
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(query_stats))
+                response = getattr(local.client, method)(
+                    path, HTTP_AUTHORIZATION=f"Token {ctx['token']}", **kwargs
+                )
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            return {
+                'latency': time.perf_counter() - start,
+                'queries': query_stats.count,
+                'status': response.status_code,
+            }
+
+        def worker(batch):
+            try:
+                return [one_request(ctx) for ctx in batch]
+            finally:
+                connections.close_all()
+
+        work = [contexts[i % len(contexts)] for i in range(requests)]
+        batches = [work[i::concurrency] for i in range(concurrency)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            samples = [sample for batch in pool.map(worker, batches) for sample in batch]
+        return summarize(route, samples, time.perf_counter() - start)
+
+    def compare(self, report, path):
+        with open(path) as fh:
+            previous = {row['route']: row for row in json.load(fh)['routes']}
+        self.stdout.write(f"\nChange against {path}:")
+        for row in report['routes']:
+            before = previous.get(row['route'])
+            if before is None or None in (row['p95_ms'], before['p95_ms']):
+                continue
+            p95_delta = row['p95_ms'] - before['p95_ms']
+            rps_delta = (row['throughput_rps'] or 0) - (before['throughput_rps'] or 0)
+            self.stdout.write(
+                f"  {row['route']:<18} p95 {p95_delta:+8.1f} ms  throughput {rps_delta:+8.1f} rps  "
+                f"queries {(row['queries_per_request'] or 0) - (before['queries_per_request'] or 0):+6.1f}"
+            )
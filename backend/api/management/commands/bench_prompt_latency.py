@@ -0,0 +1,132 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.ledger import writer
+from api.llm_service import DAILY_PLAN_PROMPT
+from api.models import LLMLedgerEntry
+from api.prompt_budget import PromptBudget, estimate_tokens
+
+
+# Stand-in latency model used when the ledger has too few samples to fit one.
+STAND_IN_BASE_MS = 900.0
+STAND_IN_MS_PER_1K_TOKENS = 350.0
+MIN_LEDGER_SAMPLES = 20
+TOKEN_BUCKET_SIZE = 250
+
+
+def fit_latency_model(samples):
+    """Least-squares fit of latency_ms = base + slope * prompt_tokens / 1000."""
+    n = len(samples)
+    mean_x = sum(x for x, _ in samples) / n
+    mean_y = sum(y for _, y in samples) / n
+    var_x = sum((x - mean_x) ** 2 for x, _ in samples)
+    if var_x == 0:
+        return mean_y, 0.0
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in samples) / var_x
+    return mean_y - slope * mean_x, slope * 1000
+
+
+def synthetic_context(scale):
+    return {
+        'projects': [f"Project {i}: quarterly deliverable" for i in range(2 * scale)],
+        'hobbies': [f"Hobby {i}" for i in range(scale)],
+        'incomplete': [f"Draft section {i} of the design document for review" for i in range(3 * scale)],
+        'completed': [f"Reply to stakeholder thread number {i} about the launch" for i in range(3 * scale)],
+        'notes': "Felt scattered after several meetings ran long. " * (4 * scale),
+    }
+
+
+def build_prompt(context, max_tokens):
+    budget = PromptBudget(max_tokens)
+    budget.add_items('incomplete', context['incomplete'], priority=1, min_items=1)
+    budget.add_items('projects', context['projects'], priority=2, min_items=1)
+    budget.add_text('notes', context['notes'], priority=3, max_chars=600)
+    budget.add_items('completed', context['completed'], priority=4)
+    budget.add_items('hobbies', context['hobbies'], priority=5)
+    budget.render(
+        DAILY_PLAN_PROMPT,
+        name='Benchmark',
+        goal='Ship the new release without burning out',
+        scheduling_method='Time Blocking',
+        mood='Stressful',
+    )
+    return budget.report
+
+
+class Command(BaseCommand):
+    help = "Show LLM latency as a function of prompt size and the effect of the prompt budget"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoint', default='daily_plan')
+        parser.add_argument('--scales', default='1,2,4,8,16,32',
+                            help="Comma-separated synthetic context sizes")
+        parser.add_argument('--json', action='store_true', help="Emit JSON instead of a table")
+
+    def handle(self, *args, **options):
+        writer.flush()
+        endpoint = options['endpoint']
+
+        samples = list(
+            LLMLedgerEntry.objects
+            .filter(endpoint=endpoint, cache_hit=False, prompt_tokens__isnull=False, latency_ms__isnull=False)
+            .order_by('-created_at')
+            .values_list('prompt_tokens', 'latency_ms')[:10000]
+        )
+        if len(samples) >= MIN_LEDGER_SAMPLES:
+            base_ms, ms_per_1k = fit_latency_model(samples)
+            source = f'ledger ({len(samples)} calls)'
+        else:
+            base_ms, ms_per_1k = STAND_IN_BASE_MS, STAND_IN_MS_PER_1K_TOKENS
+            source = 'stand-in model'
+
+        observed = {}
+        for tokens, latency in samples:
+            bucket = tokens // TOKEN_BUCKET_SIZE * TOKEN_BUCKET_SIZE
+            observed.setdefault(bucket, []).append(latency)
+
+        max_tokens = settings.LLM_PROMPT_TOKEN_BUDGETS.get(endpoint, settings.LLM_PROMPT_TOKEN_BUDGETS['daily_plan'])
+        predicted = []
+        for scale in [int(s) for s in options['scales'].split(',')]:
+            report = build_prompt(synthetic_context(scale), max_tokens)
+            predicted.append({
+                'scale': scale,
+                'pre_tokens': report['pre_tokens'],
+                'post_tokens': report['post_tokens'],
+                'pre_latency_ms': round(base_ms + ms_per_1k * report['pre_tokens'] / 1000),
+                'post_latency_ms': round(base_ms + ms_per_1k * report['post_tokens'] / 1000),
+            })
+
+        result = {
+            'endpoint': endpoint,
+            'source': source,
+            'base_ms': round(base_ms, 1),
+            'ms_per_1k_tokens': round(ms_per_1k, 1),
+            'budget_tokens': max_tokens,
+            'observed': [
+                {'tokens_from': bucket, 'calls': len(values), 'median_ms': sorted(values)[len(values) // 2]}
+                for bucket, values in sorted(observed.items())
+            ],
+            'predicted': predicted,
+        }
+
+        if options['json']:
+            self.stdout.write(json.dumps(result, indent=2))
+            return
+
+        self.stdout.write(
+            f"Latency model from {source}: {base_ms:.0f} ms + {ms_per_1k:.0f} ms per 1k prompt tokens"
+        )
+        if result['observed']:
+            self.stdout.write("\nObserved median latency by prompt size:")
+            for row in result['observed']:
+                self.stdout.write(f"  {row['tokens_from']:>6}+ tokens  {row['calls']:>6} calls  {row['median_ms']:>8.0f} ms")
+
+        self.stdout.write(f"\nSynthetic daily plan context (budget {max_tokens} tokens):")
+        self.stdout.write(f"  {'scale':>5}  {'raw tok':>8}  {'budgeted':>8}  {'raw ms':>7}  {'budgeted ms':>11}")
+        for row in predicted:
+            self.stdout.write(
+                f"  {row['scale']:>5}  {row['pre_tokens']:>8}  {row['post_tokens']:>8}  "
+                f"{row['pre_latency_ms']:>7}  {row['post_latency_ms']:>11}"
+            )
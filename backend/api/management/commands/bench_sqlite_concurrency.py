@@ -0,0 +1,134 @@
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+
+from api.write_coalescer import WriteCoalescer
+
+
+ROWS = 500
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(int(len(sorted_values) * pct / 100), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    help = "Compare lock errors and write latency for default SQLite vs. the high-concurrency mode"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--writes', type=int, default=200, help="Objective toggles per thread")
+        parser.add_argument('--timeout', type=float, default=5.0,
+                            help="SQLite busy timeout for the baseline run, in seconds")
+        parser.add_argument('--json', action='store_true', help="Emit JSON instead of a table")
+
+    def handle(self, *args, **options):
+        workdir = tempfile.mkdtemp(prefix='momentum-sqlite-bench-')
+        try:
+            results = [
+                self.run_mode('baseline', workdir, options, {'timeout': options['timeout']}, coalesce=False),
+                self.run_mode('high_concurrency', workdir, options, settings.SQLITE_CONCURRENCY_OPTIONS, coalesce=True),
+            ]
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(f"{options['threads']} threads x {options['writes']} objective toggles")
+        self.stdout.write(f"{'mode':<18} {'ok':>6} {'locked':>7} {'writes/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+        for row in results:
+            self.stdout.write(
+                f"{row['mode']:<18} {row['ok']:>6} {row['lock_errors']:>7} {row['writes_per_sec']:>9.0f} "
+                f"{row['p50_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['max_ms']:>8.1f}"
+            )
+
+    def run_mode(self, mode, workdir, options, db_options, coalesce):
+        alias = f'bench_{mode}'
+        connections.databases[alias] = {
+            **connections['default'].settings_dict,
+            'NAME': os.path.join(workdir, f'{mode}.sqlite3'),
+            'OPTIONS': dict(db_options),
+            'CONN_MAX_AGE': 0,
+        }
+        with connections[alias].cursor() as cursor:
+            cursor.execute(
+                'CREATE TABLE bench_objective ('
+                'id INTEGER PRIMARY KEY, description TEXT, is_completed BOOL, completed_at TEXT)'
+            )
+            cursor.executemany(
+                'INSERT INTO bench_objective (id, description, is_completed) VALUES (%s, %s, 0)',
+                [(i, f'Objective {i}') for i in range(ROWS)]
+            )
+
+        coalescer = WriteCoalescer(using=alias, enabled=coalesce)
+        latencies = []
+        lock_errors = [0]
+        lock = threading.Lock()
+
+        def toggle(pk):
+            # Mirrors objective_update_view: read the row, then write it back.
+            with connections[alias].cursor() as cursor:
+                cursor.execute('SELECT is_completed FROM bench_objective WHERE id = %s', [pk])
+                done = not cursor.fetchone()[0]
+                cursor.execute(
+                    'UPDATE bench_objective SET is_completed = %s, completed_at = %s WHERE id = %s',
+                    [done, time.time() if done else None, pk]
+                )
+
+        def worker():
+            local = []
+            errors = 0
+            for _ in range(options['writes']):
+                pk = random.randrange(ROWS)
+                start = time.perf_counter()
+                try:
+                    if coalesce:
+                        coalescer.submit(lambda: toggle(pk))
+                    else:
+                        with transaction.atomic(using=alias):
+                            toggle(pk)
+                except OperationalError as e:
+                    if 'locked' not in str(e):
+                        raise
+                    errors += 1
+                    continue
+                local.append(time.perf_counter() - start)
+            connections[alias].close()
+            with lock:
+                latencies.extend(local)
+                lock_errors[0] += errors
+
+        threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        connections[alias].close()
+        del connections.databases[alias]
+
+        latencies.sort()
+        return {
+            'mode': mode,
+            'ok': len(latencies),
+            'lock_errors': lock_errors[0],
+            'writes_per_sec': len(latencies) / elapsed if elapsed else 0,
+            'p50_ms': (percentile(latencies, 50) or 0) * 1000,
+            'p99_ms': (percentile(latencies, 99) or 0) * 1000,
+            'max_ms': (latencies[-1] if latencies else 0) * 1000,
+        }
@@ -0,0 +1,103 @@
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+# Each scenario runs in a fresh interpreter after django.setup().
+SCENARIOS = {
+    'setup': "",
+    'urls': "import {urlconf}",
+    'preload': "import {urlconf}; from api.llm_service import preload; preload()",
+}
+WATCHED_MODULES = ['google.genai', 'numpy']
+_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$')
+
+
+class ImportProfile:
+    """Parsed `python -X importtime` output for one interpreter start."""
+
+    def __init__(self, stderr, wall_ms):
+        self.wall_ms = wall_ms
+        self.modules = {}
+        self.top_level = []
+        for line in stderr.splitlines():
+            match = _LINE.match(line)
+            if not match:
+                continue
+            self_us, cumulative_us, indent, module = match.groups()
+            self.modules[module] = (int(self_us), int(cumulative_us))
+            if not indent:
+                self.top_level.append(module)
+
+    @property
+    def import_ms(self):
+        return sum(self.modules[module][1] for module in self.top_level) / 1000
+
+    def slowest(self, count):
+        """Top-level packages by cumulative import time, merged by their first name component."""
+        packages = {}
+        for module in self.top_level:
+            package = module.split('.')[0]
+            packages[package] = packages.get(package, 0) + self.modules[module][1]
+        return sorted(packages.items(), key=lambda item: -item[1])[:count]
+
+
+def import_profile(scenario, env=None):
+    code = (
+        "import django; django.setup(); "
+        + SCENARIOS[scenario].format(urlconf=settings.ROOT_URLCONF)
+    )
+    environ = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'momentum_backend.settings')}
+    environ.update(env or {})
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=settings.BASE_DIR, env=environ, capture_output=True, text=True, check=True,
+    )
+    return ImportProfile(result.stderr, (time.perf_counter() - start) * 1000)
+
+
+class Command(BaseCommand):
+    help = "Measure interpreter startup and import cost with and without preloading the LLM dependencies"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help="Interpreter starts per scenario; medians are reported")
+        parser.add_argument('--top', type=int, default=8, help="Slowest packages to list")
+        parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS))
+        parser.add_argument('--json', action='store_true', help="Emit JSON instead of a table")
+
+    def handle(self, *args, **options):
+        report = {}
+        for scenario in options['scenario'] or list(SCENARIOS):
+            profiles = [import_profile(scenario) for _ in range(options['runs'])]
+            last = profiles[-1]
+            report[scenario] = {
+                'wall_ms': round(statistics.median(p.wall_ms for p in profiles), 1),
+                'import_ms': round(statistics.median(p.import_ms for p in profiles), 1),
+                'modules': len(last.modules),
+                'loaded': {module: module in last.modules for module in WATCHED_MODULES},
+                'slowest': [
+                    {'package': package, 'ms': round(us / 1000, 1)}
+                    for package, us in last.slowest(options['top'])
+                ],
+            }
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        for scenario, row in report.items():
+            loaded = ', '.join(f"{module} {'yes' if flag else 'no'}" for module, flag in row['loaded'].items())
+            self.stdout.write(
+                f"{scenario:<8} wall {row['wall_ms']:>7.1f} ms  imports {row['import_ms']:>7.1f} ms  "
+                f"{row['modules']:>5} modules  ({loaded})"
+            )
+            for entry in row['slowest']:
+                self.stdout.write(f"    {entry['package']:<24} {entry['ms']:>7.1f} ms")
@@ -0,0 +1,82 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from api.ledger import writer
+from api.llm_service import generate_workout_template
+from api.models import WorkoutTemplate
+from api.workout_library import all_cells, library
+
+
+class Command(BaseCommand):
+    help = "Generate workout templates for every (mood, body bucket, goal category) cell of the library"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--variants', type=int, default=settings.WORKOUT_LIBRARY_VARIANTS,
+                            help="Templates to keep per cell")
+        parser.add_argument('--only-missing', action='store_true',
+                            help="Only fill cells with fewer templates than --variants")
+        parser.add_argument('--refresh-older-than', type=int, metavar='DAYS',
+                            help="Also replace templates older than this many days")
+        parser.add_argument('--workers', type=int, default=4, help="Concurrent LLM calls")
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        variants = options['variants']
+        stale_before = timezone.now() - timedelta(days=options['refresh_older_than'] or 0)
+        existing = {
+            (row['mood'], row['body_bucket'], row['goal_category']): row
+            for row in WorkoutTemplate.objects.values('mood', 'body_bucket', 'goal_category').annotate(
+                count=Count('id'), stale=Count('id', filter=Q(created_at__lt=stale_before))
+            )
+        }
+
+        # Storing into a cell holding `variants` templates replaces its oldest,
+        # so a full rebuild is simply `variants` generations per cell.
+        jobs = []
+        for cell in all_cells():
+            row = existing.get(cell, {'count': 0, 'stale': 0})
+            if options['only_missing'] or options['refresh_older_than'] is not None:
+                needed = max(variants - row['count'], 0)
+                if options['refresh_older_than'] is not None:
+                    needed += row['stale']
+            else:
+                needed = variants
+            jobs.extend([cell] * min(needed, variants))
+
+        self.stdout.write(f"{len(all_cells())} cells, {len(jobs)} templates to generate")
+        if options['dry_run'] or not jobs:
+            return
+
+        def build(cell):
+            close_old_connections()
+            try:
+                plan = generate_workout_template(*cell, endpoint='workout_library')
+                if plan is not None:
+                    library.store(cell, plan, max_variants=variants)
+                return plan is not None
+            finally:
+                close_old_connections()
+
+        generated = failed = 0
+        if options['workers'] > 1:
+            pool = ThreadPoolExecutor(max_workers=options['workers'])
+            results = pool.map(build, jobs)
+        else:
+            pool, results = None, map(build, jobs)
+        for done, ok in enumerate(results, 1):
+            generated += ok
+            failed += not ok
+            if done % 25 == 0:
+                self.stdout.write(f"  {done}/{len(jobs)}")
+        if pool is not None:
+            pool.shutdown()
+        writer.flush()
+
+        style = self.style.SUCCESS if not failed else self.style.WARNING
+        self.stdout.write(style(f"Generated {generated} templates, {failed} failed"))
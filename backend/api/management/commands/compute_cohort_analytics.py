@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from api.cohort_analytics import compute
+from api.models import CohortSnapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute mood to next-day completion matrices, rolling completion rates and streaks "
+        "across all users, and store them for /api/analytics/cohort/"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help="Only analyse this many days of history (default: all)")
+        parser.add_argument('--chunk-size', type=int, default=50000, help="Rows fetched per query")
+        parser.add_argument('--keep', type=int, default=30, help="Snapshots to keep")
+
+    def handle(self, *args, **options):
+        snapshot = compute(days=options['days'], chunk_size=options['chunk_size'])
+        stale = list(CohortSnapshot.objects.values_list('id', flat=True)[options['keep']:])
+        if stale:
+            CohortSnapshot.objects.filter(id__in=stale).delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Analysed {snapshot.objectives} objectives and {snapshot.checkins} check-ins "
+            f"for {snapshot.users} users in {snapshot.duration_ms / 1000:.1f}s"
+        ))
+        results = snapshot.results
+        self.stdout.write("\nNext-day completion rate by mood:")
+        for mood, rate, samples in zip(results['moods'], results['next_day_completion_rate'],
+                                       results['next_day_samples']):
+            shown = '-' if rate is None else f'{rate:.1%}'
+            self.stdout.write(f"  {mood:<12} {shown:>6}  ({samples} days)")
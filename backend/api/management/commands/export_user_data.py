@@ -0,0 +1,31 @@
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from api.data_transfer import iter_ndjson
+
+
+class Command(BaseCommand):
+    help = "Stream a user's projects, hobbies, objectives and check-ins as NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--output', '-o', help="File to write (default: stdout)")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['username']!r} does not exist")
+
+        out = open(options['output'], 'w') if options['output'] else sys.stdout
+        try:
+            count = 0
+            for line in iter_ndjson(user):
+                out.write(line)
+                count += 1
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        self.stderr.write(f"Exported {count} records")
@@ -0,0 +1,144 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from api import search
+from api.models import DailyCheckIn, Hobby, Objective, Project, Tip, UserProfile
+
+
+GOALS = [
+    "Run a half marathon", "Ship my side project", "Read 30 books this year",
+    "Get promoted to senior engineer", "Learn Spanish", "Lose 5 kg",
+    "Finish my thesis", "Build a consistent meditation habit",
+]
+PROJECT_NAMES = [
+    "Quarterly report", "Website redesign", "Thesis chapter", "Garden makeover",
+    "Mobile app MVP", "Conference talk", "Kitchen renovation", "Job applications",
+]
+HOBBY_NAMES = ["Chess", "Yoga", "Guitar", "Cycling", "Painting", "Baking", "Hiking", "Photography"]
+TASK_VERBS = ["Draft", "Review", "Outline", "Finish", "Plan", "Research", "Email about", "Practice"]
+TASK_OBJECTS = [
+    "the introduction", "slides", "budget", "next sprint", "chapter notes",
+    "interview questions", "workout routine", "weekly review",
+]
+NOTES = [
+    "", "", "Long meetings drained me.", "Great focus block in the morning.",
+    "Slept badly, struggled after lunch.", "Felt on top of things today.",
+]
+MOODS = [choice for choice, _ in DailyCheckIn.MOOD_CHOICES]
+COMPLETION_BY_MOOD = {
+    'Productive': 0.85, 'Focused': 0.8, 'Energetic': 0.75, 'Relaxed': 0.6,
+    'Tired': 0.45, 'Stressful': 0.4, 'Overwhelmed': 0.3,
+}
+
+
+class Command(BaseCommand):
+    help = "Generate synthetic users with profiles, projects, hobbies, objectives and check-ins"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--days', type=int, default=90, help="Days of history per user")
+        parser.add_argument('--prefix', default='synth', help="Username prefix")
+        parser.add_argument('--password', default='momentum-synthetic',
+                            help="Password shared by every generated user")
+        parser.add_argument('--users-per-batch', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--skip-search-index', action='store_true',
+                            help="Do not rebuild the full-text index afterwards")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        # Hash once: PBKDF2 per user would dominate the run time.
+        password_hash = make_password(options['password'])
+        existing = User.objects.filter(username__startswith=f"{options['prefix']}-").count()
+
+        started = time.perf_counter()
+        created = 0
+        total = options['users']
+        while created < total:
+            batch = min(options['users_per_batch'], total - created)
+            self.create_batch(rng, options, password_hash, existing + created, batch)
+            created += batch
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"  {created}/{total} users ({created / elapsed:.0f} users/s)")
+
+        if not Tip.objects.exists():
+            Tip.objects.bulk_create([
+                Tip(category=category, source="Synthetic data", content=f"A {category.lower()} tip.")
+                for category, _ in Tip.CATEGORY_CHOICES
+            ])
+
+        if not options['skip_search_index']:
+            with transaction.atomic():
+                search.rebuild()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {total} users with {options['days']} days of history "
+            f"in {time.perf_counter() - started:.1f}s"
+        ))
+
+    @transaction.atomic
+    def create_batch(self, rng, options, password_hash, offset, count):
+        prefix = options['prefix']
+        users = User.objects.bulk_create([
+            User(
+                username=f"{prefix}-{offset + i}",
+                email=f"{prefix}-{offset + i}@example.com",
+                first_name=f"User{offset + i}",
+                password=password_hash,
+            )
+            for i in range(count)
+        ])
+
+        today = timezone.now().date()
+        profiles, tokens, projects, hobbies, objectives, checkins = [], [], [], [], [], []
+        for user in users:
+            profiles.append(UserProfile(
+                user=user,
+                goal=rng.choice(GOALS),
+                scheduling_method=rng.choice(UserProfile.SCHEDULING_CHOICES)[0],
+                height_cm=round(rng.uniform(150, 195), 1),
+                weight_kg=round(rng.uniform(48, 110), 1),
+                body_fat_percentage=round(rng.uniform(8, 38), 1) if rng.random() < 0.6 else None,
+            ))
+            tokens.append(Token(key=Token.generate_key(), user=user))
+            for name in rng.sample(PROJECT_NAMES, rng.randint(0, 4)):
+                projects.append(Project(
+                    user=user,
+                    name=name,
+                    description=f"{name} for {user.first_name}",
+                    start_date=today - timedelta(days=rng.randint(0, options['days'])),
+                    due_date=today + timedelta(days=rng.randint(1, 60)) if rng.random() < 0.7 else None,
+                    is_active=rng.random() < 0.8,
+                ))
+            for name in rng.sample(HOBBY_NAMES, rng.randint(0, 3)):
+                hobbies.append(Hobby(user=user, name=name, frequency=rng.choice(["Daily", "Weekly", ""])))
+
+            for day_offset in range(options['days']):
+                day = today - timedelta(days=day_offset)
+                mood = rng.choice(MOODS)
+                if rng.random() < 0.8:
+                    checkins.append(DailyCheckIn(user=user, date=day, mood=mood, notes=rng.choice(NOTES)))
+                for _ in range(rng.randint(3, 5)):
+                    done = rng.random() < COMPLETION_BY_MOOD[mood]
+                    objectives.append(Objective(
+                        user=user,
+                        date=day,
+                        description=f"{rng.choice(TASK_VERBS)} {rng.choice(TASK_OBJECTS)}",
+                        is_completed=done,
+                        completed_at=timezone.now() - timedelta(days=day_offset) if done else None,
+                    ))
+
+        UserProfile.objects.bulk_create(profiles)
+        Token.objects.bulk_create(tokens)
+        Project.objects.bulk_create(projects, batch_size=1000)
+        Hobby.objects.bulk_create(hobbies, batch_size=1000)
+        Objective.objects.bulk_create(objectives, batch_size=2000)
+        DailyCheckIn.objects.bulk_create(checkins, batch_size=2000)
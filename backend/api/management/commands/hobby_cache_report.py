@@ -0,0 +1,117 @@
+import json
+from collections import defaultdict
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import OuterRef, Subquery, Sum
+from django.utils import timezone
+
+from api.ledger import writer
+from api.models import DailyCheckIn, Hobby, LLMLedgerEntry, Project, UserProfile
+from api.suggestion_cache import feature_vector, index, normalize_name
+
+
+SIMILARITY_EDGES = [0.0, 0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.92, 0.94, 0.96, 0.98, 1.0001]
+THRESHOLDS = [0.85, 0.9, 0.92, 0.94, 0.96]
+
+
+class Command(BaseCommand):
+    help = (
+        "Report the hobby suggestion cache hit rate from the LLM ledger and how close each "
+        "user's current context is to a suggestion cached for someone else"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help="Ledger window for the hit rate")
+        parser.add_argument('--max-users', type=int, default=10000)
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--json', action='store_true', help="Emit JSON instead of a table")
+
+    def handle(self, *args, **options):
+        writer.flush()
+        since = timezone.now() - timedelta(days=options['days'])
+        entries = LLMLedgerEntry.objects.filter(endpoint='hobby_suggestion', created_at__gte=since)
+        hits = entries.filter(cache_hit=True).aggregate(total=Sum('calls'))['total'] or 0
+        lookups = entries.aggregate(total=Sum('calls'))['total'] or 0
+
+        index.refresh()
+        best = self.nearest_similarities(options['max_users'], options['chunk_size'])
+        counts, _ = np.histogram(best, bins=SIMILARITY_EDGES) if len(best) else (np.zeros(len(SIMILARITY_EDGES) - 1), None)
+
+        report = {
+            'days': options['days'],
+            'lookups': lookups,
+            'cache_hits': hits,
+            'hit_rate': round(hits / lookups, 4) if lookups else None,
+            'cached_suggestions': len(index.ids),
+            'threshold': settings.HOBBY_CACHE_SIMILARITY_THRESHOLD,
+            'users_compared': len(best),
+            'similarity_histogram': [
+                {'from': SIMILARITY_EDGES[i], 'to': min(SIMILARITY_EDGES[i + 1], 1.0), 'users': int(count)}
+                for i, count in enumerate(counts)
+            ],
+            'would_hit': {
+                str(threshold): round(float(np.mean(best >= threshold)), 4) if len(best) else None
+                for threshold in THRESHOLDS
+            },
+        }
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        rate = '-' if report['hit_rate'] is None else f"{report['hit_rate']:.1%}"
+        self.stdout.write(
+            f"Last {options['days']} days: {lookups} lookups, {hits} cache hits ({rate}); "
+            f"{report['cached_suggestions']} cached suggestions, threshold {report['threshold']}"
+        )
+        self.stdout.write(f"\nNearest cached suggestion from another user ({len(best)} users):")
+        for row in report['similarity_histogram']:
+            self.stdout.write(f"  {row['from']:.2f}-{row['to']:.2f}  {row['users']:>7}")
+        self.stdout.write("\nShare of users that would hit at each threshold:")
+        for threshold, share in report['would_hit'].items():
+            self.stdout.write(f"  >= {threshold:<5} {'-' if share is None else f'{share:.1%}'}")
+
+    def nearest_similarities(self, max_users, chunk_size):
+        """Best similarity per user, ignoring their own suggestions and hobbies they already have."""
+        if not len(index.ids):
+            return np.empty(0)
+        positions_by_name = defaultdict(list)
+        for position, name in enumerate(index.names):
+            positions_by_name[name].append(position)
+        positions_by_user = defaultdict(list)
+        for position, user_id in enumerate(index.source_users):
+            positions_by_user[int(user_id)].append(position)
+
+        latest_mood = DailyCheckIn.objects.filter(user=OuterRef('user')).order_by('-date').values('mood')[:1]
+        profiles = list(
+            UserProfile.objects.order_by('user_id')
+            .annotate(mood=Subquery(latest_mood))
+            .values_list('user_id', 'goal', 'mood')[:max_users]
+        )
+
+        best = []
+        for start in range(0, len(profiles), chunk_size):
+            chunk = profiles[start:start + chunk_size]
+            user_ids = [user_id for user_id, _, _ in chunk]
+            hobbies = defaultdict(list)
+            for user_id, name in Hobby.objects.filter(user_id__in=user_ids).values_list('user_id', 'name'):
+                hobbies[user_id].append(name)
+            projects = defaultdict(list)
+            for user_id, name in Project.objects.filter(user_id__in=user_ids, is_active=True).values_list('user_id', 'name'):
+                projects[user_id].append(name)
+
+            vectors = np.stack([
+                feature_vector(mood, goal, hobbies[user_id], projects[user_id])
+                for user_id, goal, mood in chunk
+            ])
+            sims = index.similarities(vectors)
+            for row, user_id in enumerate(user_ids):
+                excluded = list(positions_by_user.get(user_id, []))
+                for name in hobbies[user_id]:
+                    excluded.extend(positions_by_name.get(normalize_name(name), []))
+                sims[row, excluded] = -1.0
+            best.append(sims.max(axis=1))
+        return np.concatenate(best)
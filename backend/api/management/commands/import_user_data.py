@@ -0,0 +1,33 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from api.data_transfer import NDJSONImporter, TooManyImportErrors
+
+
+class Command(BaseCommand):
+    help = "Bulk-import an NDJSON export into a user's account"
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['username']!r} does not exist")
+
+        importer = NDJSONImporter(user, batch_size=options['batch_size'])
+        with open(options['path']) as fh:
+            try:
+                result = importer.run(fh)
+            except TooManyImportErrors as e:
+                raise CommandError(f"{e}; imported so far: {importer.counts}")
+
+        for error in result['errors']:
+            self.stderr.write(f"line {error['line']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            "Imported " + ", ".join(f"{kind}: {count}" for kind, count in result['imported'].items())
+            + f"; updated check-ins: {result['updated']['checkin']}"
+        ))
@@ -0,0 +1,97 @@
+import json
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from api.ledger import writer
+from api.models import LLMLedgerEntry
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(pct / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class Command(BaseCommand):
+    help = "Aggregate LLM latency percentiles and token spend per endpoint per day"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help="Number of days to include")
+        parser.add_argument('--endpoint', help="Only report this endpoint")
+        parser.add_argument('--json', action='store_true', help="Emit JSON instead of a table")
+
+    def handle(self, *args, **options):
+        writer.flush()
+
+        since = timezone.now() - timedelta(days=options['days'])
+        entries = LLMLedgerEntry.objects.filter(created_at__gte=since)
+        if options['endpoint']:
+            entries = entries.filter(endpoint=options['endpoint'])
+
+        rows = (
+            entries
+            .annotate(day=TruncDate('created_at'))
+            .values_list(
+                'day', 'endpoint', 'model', 'latency_ms', 'prompt_tokens',
+                'output_tokens', 'cache_hit', 'fallback', 'calls'
+            )
+            .order_by()
+        )
+
+        groups = defaultdict(lambda: {
+            'calls': 0, 'cache_hits': 0, 'fallbacks': 0,
+            'prompt_tokens': 0, 'output_tokens': 0, 'cost_usd': 0.0, 'latencies': [],
+        })
+        prices = getattr(settings, 'LLM_TOKEN_PRICES', {})
+        for day, endpoint, model, latency_ms, prompt_tokens, output_tokens, cache_hit, fallback, calls in rows.iterator(chunk_size=5000):
+            group = groups[(day, endpoint)]
+            group['calls'] += calls
+            if cache_hit:
+                group['cache_hits'] += calls
+                continue
+            if fallback:
+                group['fallbacks'] += 1
+            if latency_ms is not None:
+                group['latencies'].append(latency_ms)
+            group['prompt_tokens'] += prompt_tokens or 0
+            group['output_tokens'] += output_tokens or 0
+            input_price, output_price = prices.get(model, (0, 0))
+            group['cost_usd'] += ((prompt_tokens or 0) * input_price + (output_tokens or 0) * output_price) / 1_000_000
+
+        report = []
+        for (day, endpoint), group in sorted(groups.items()):
+            latencies = sorted(group.pop('latencies'))
+            report.append({
+                'day': day.isoformat(),
+                'endpoint': endpoint,
+                **group,
+                'cost_usd': round(group['cost_usd'], 6),
+                'p50_ms': percentile(latencies, 50),
+                'p95_ms': percentile(latencies, 95),
+                'p99_ms': percentile(latencies, 99),
+            })
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        header = f"{'day':<10}  {'endpoint':<18} {'calls':>6} {'hits':>5} {'fallbk':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'in tok':>9} {'out tok':>9} {'cost $':>9}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for row in report:
+            self.stdout.write(
+                f"{row['day']:<10}  {row['endpoint']:<18} {row['calls']:>6} {row['cache_hits']:>5} "
+                f"{row['fallbacks']:>6} {_ms(row['p50_ms']):>8} {_ms(row['p95_ms']):>8} {_ms(row['p99_ms']):>8} "
+                f"{row['prompt_tokens']:>9} {row['output_tokens']:>9} {row['cost_usd']:>9.4f}"
+            )
+
+
+def _ms(value):
+    return '-' if value is None else f'{value:.0f}'
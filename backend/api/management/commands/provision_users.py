@@ -0,0 +1,51 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.data_transfer import TooManyImportErrors
+from api.provisioning import FORMATS, UserProvisioner, format_for, iter_records
+
+
+class Command(BaseCommand):
+    help = (
+        "Create accounts in bulk from CSV (with a header row) or NDJSON with username, email and "
+        "optional password, first_name, goal and scheduling_method"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Input file, or - for standard input")
+        parser.add_argument('--format', choices=FORMATS, help="Default: from the file extension")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Users per transaction")
+        parser.add_argument('--workers', type=int, help="Password hashing processes (default: PROVISIONING_HASH_WORKERS)")
+        parser.add_argument('--max-errors', type=int, default=100)
+
+    def handle(self, *args, **options):
+        content_format = options['format'] or format_for(options['path'])
+        if content_format is None:
+            raise CommandError("Cannot tell the input format from the file name; pass --format")
+
+        provisioner = UserProvisioner(
+            batch_size=options['batch_size'],
+            max_errors=options['max_errors'],
+            workers=options['workers'],
+            progress=self.report_progress,
+        )
+        fh = sys.stdin if options['path'] == '-' else open(options['path'], newline='', encoding='utf-8-sig')
+        try:
+            result = provisioner.run(iter_records(fh, content_format))
+        except TooManyImportErrors as e:
+            raise CommandError(f"{e}; created so far: {provisioner.created}")
+        finally:
+            if fh is not sys.stdin:
+                fh.close()
+
+        for error in result['errors']:
+            self.stderr.write(f"line {error['line']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {result['created']} users in {result['duration_seconds']}s "
+            f"({result['users_per_second']} users/s), {len(result['errors'])} rows skipped"
+        ))
+
+    def report_progress(self, created, elapsed):
+        rate = created / elapsed if elapsed else 0
+        self.stdout.write(f"  {created} users  {elapsed:.1f}s  {rate:.1f} users/s")
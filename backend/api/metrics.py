@@ -0,0 +1,309 @@
+import atexit
+import glob
+import json
+import os
+import re
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LLM_LATENCY_BUCKETS = (0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 8.0, 13.0, 20.0, 30.0, 60.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+SIMILARITY_BUCKETS = (0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.92, 0.94, 0.96, 0.98, 1.0)
+SIZE_BUCKETS = (256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65536)
+
+# Live workers write metrics_<pid>_<id>.json; the id keeps a reused pid from
+# overwriting an earlier worker's totals. Exited workers are folded into
+# DEAD_WORKERS_FILE so counters never go backwards.
+WORKER_FILE = re.compile(r'^metrics_(\d+)_[0-9a-f]+\.json$')
+DEAD_WORKERS_FILE = 'metrics_dead.json'
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self):
+        with self._lock:
+            return {json.dumps(key): value if not isinstance(value, list) else list(value)
+                    for key, value in self._values.items()}
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(float(b) for b in buckets)
+        super().__init__(name, documentation, labelnames)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            # Layout: one non-cumulative count per bucket, then +Inf, sum and count.
+            values = self._values.get(key)
+            if values is None:
+                values = self._values[key] = [0] * (len(self.buckets) + 3)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    values[i] += 1
+                    break
+            else:
+                values[len(self.buckets)] += 1
+            values[-2] += value
+            values[-1] += 1
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._last_flush = 0.0
+        self._flush_lock = threading.Lock()
+        self._instance = uuid.uuid4().hex[:12]
+        self._exit_flush_registered = False
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+
+    def snapshot(self):
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def _multiproc_dir(self):
+        return getattr(settings, 'METRICS_MULTIPROC_DIR', None)
+
+    def _own_file(self):
+        return f'metrics_{os.getpid()}_{self._instance}.json'
+
+    def maybe_flush(self, force=False):
+        """Write this process's samples to the shared directory, at most once per interval."""
+        directory = self._multiproc_dir()
+        if not directory:
+            return
+        now = time.monotonic()
+        interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 5.0)
+        if not force and now - self._last_flush < interval:
+            return
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_flush = now
+            os.makedirs(directory, exist_ok=True)
+            _write_json(os.path.join(directory, self._own_file()), self.snapshot())
+            if not self._exit_flush_registered:
+                # Samples recorded since the last interval are kept when the worker exits.
+                atexit.register(self.maybe_flush, force=True)
+                self._exit_flush_registered = True
+        finally:
+            self._flush_lock.release()
+
+    def fold_dead_workers(self, directory):
+        """Add the files of exited workers to the persistent total and remove them."""
+        import fcntl
+
+        with open(os.path.join(directory, '.metrics.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            dead = []
+            for path in glob.glob(os.path.join(directory, 'metrics_*.json')):
+                match = WORKER_FILE.match(os.path.basename(path))
+                if match and not _pid_alive(int(match.group(1))):
+                    dead.append(path)
+            if not dead:
+                return
+            total_path = os.path.join(directory, DEAD_WORKERS_FILE)
+            total = _read_json(total_path) or {}
+            for path in dead:
+                _merge(total, _read_json(path) or {})
+            _write_json(total_path, total)
+            for path in dead:
+                os.remove(path)
+
+    def collect(self):
+        """Merge samples from every worker process that has flushed to the shared directory."""
+        merged = self.snapshot()
+        directory = self._multiproc_dir()
+        if not directory or not os.path.isdir(directory):
+            return merged
+
+        self.fold_dead_workers(directory)
+        own_file = self._own_file()
+        for path in glob.glob(os.path.join(directory, 'metrics_*.json')):
+            if os.path.basename(path) == own_file:
+                continue
+            data = _read_json(path)
+            if data is not None:
+                _merge(merged, data)
+        return merged
+
+    def render(self):
+        collected = self.collect()
+        lines = []
+        for name, metric in sorted(self._metrics.items()):
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for key, value in sorted(collected.get(name, {}).items()):
+                labels = dict(zip(metric.labelnames, json.loads(key)))
+                if metric.kind == 'counter':
+                    lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.buckets, value):
+                    cumulative += count
+                    bucket_labels = dict(labels, le=_format_value(bound))
+                    lines.append(f'{name}_bucket{_format_labels(bucket_labels)} {cumulative}')
+                cumulative += value[len(metric.buckets)]
+                lines.append(f'{name}_bucket{_format_labels(dict(labels, le="+Inf"))} {cumulative}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(value[-2])}')
+                lines.append(f'{name}_count{_format_labels(labels)} {_format_value(value[-1])}')
+        return '\n'.join(lines) + '\n'
+
+
+def _merge(target, data):
+    for name, samples in data.items():
+        merged = target.setdefault(name, {})
+        for key, value in samples.items():
+            if key not in merged:
+                merged[key] = value
+            elif isinstance(value, list):
+                merged[key] = [a + b for a, b in zip(merged[key], value)]
+            else:
+                merged[key] += value
+
+
+def _read_json(path):
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path, data):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as fh:
+        json.dump(data, fh)
+    os.replace(tmp_path, path)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    parts = []
+    for name, value in labels.items():
+        escaped = str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        parts.append(f'{name}="{escaped}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+registry = Registry()
+
+
+HTTP_REQUEST_DURATION = Histogram(
+    'momentum_http_request_duration_seconds',
+    'HTTP request latency by route.',
+    ['route', 'method', 'status'],
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    'momentum_db_queries_per_request',
+    'Number of database queries executed per request.',
+    ['route'],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+DB_TIME_PER_REQUEST = Histogram(
+    'momentum_db_time_per_request_seconds',
+    'Total time spent in database queries per request.',
+    ['route'],
+)
+LLM_REQUEST_DURATION = Histogram(
+    'momentum_llm_request_duration_seconds',
+    'Latency of Gemini generate_content calls.',
+    ['endpoint'],
+    buckets=LLM_LATENCY_BUCKETS,
+)
+LLM_PROMPT_CHARS = Histogram(
+    'momentum_llm_prompt_chars',
+    'Size of prompts sent to Gemini, in characters.',
+    ['endpoint'],
+    buckets=SIZE_BUCKETS,
+)
+LLM_RESPONSE_CHARS = Histogram(
+    'momentum_llm_response_chars',
+    'Size of Gemini responses, in characters.',
+    ['endpoint'],
+    buckets=SIZE_BUCKETS,
+)
+LLM_PROMPT_TOKENS = Histogram(
+    'momentum_llm_prompt_tokens_estimated',
+    'Estimated prompt tokens before and after the prompt budget is applied.',
+    ['endpoint', 'stage'],
+    buckets=TOKEN_BUCKETS,
+)
+LLM_CALLS = Counter(
+    'momentum_llm_calls_total',
+    'LLM generations by outcome; outcome="fallback" means the static fallback was served.',
+    ['endpoint', 'outcome'],
+)
+LLM_PARSE_RESULTS = Counter(
+    'momentum_llm_parse_results_total',
+    'Outcome of parsing LLM output: ok, repaired locally, retried, or failed.',
+    ['endpoint', 'result'],
+)
+LLM_CACHE_REQUESTS = Counter(
+    'momentum_llm_cache_requests_total',
+    'Lookups that could avoid an LLM call, by result (hit or miss).',
+    ['endpoint', 'result'],
+)
+HOBBY_CACHE_SIMILARITY = Histogram(
+    'momentum_hobby_cache_similarity',
+    'Cosine similarity of the nearest cached hobby suggestion at lookup.',
+    buckets=SIMILARITY_BUCKETS,
+)
+EVENTS_DELIVERED = Counter(
+    'momentum_events_delivered_total',
+    'Push events handed to open event streams in this process.',
+    ['type'],
+)
+
+
+def record_llm_cache(endpoint, hit):
+    LLM_CACHE_REQUESTS.inc(endpoint=endpoint, result='hit' if hit else 'miss')
@@ -0,0 +1,50 @@
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+
+from . import metrics
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+def route_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return '/' + match.route if match.route else match.view_name
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        query_stats = QueryStats()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(query_stats))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        route = route_name(request)
+        metrics.HTTP_REQUEST_DURATION.observe(
+            elapsed, route=route, method=request.method, status=response.status_code
+        )
+        metrics.DB_QUERIES_PER_REQUEST.observe(query_stats.count, route=route)
+        metrics.DB_TIME_PER_REQUEST.observe(query_stats.duration, route=route)
+        metrics.registry.maybe_flush()
+        return response
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_llm_ledger'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedCheckIn',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('mood', models.CharField(choices=[('Productive', 'Productive'), ('Tired', 'Tired'), ('Stressful', 'Stressful'), ('Energetic', 'Energetic'), ('Overwhelmed', 'Overwhelmed'), ('Focused', 'Focused'), ('Relaxed', 'Relaxed')], max_length=20)),
+                ('notes', models.TextField(blank=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_checkins', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-date'],
+                'unique_together': {('user', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedObjective',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('project_id', models.BigIntegerField(blank=True, null=True)),
+                ('description', models.TextField()),
+                ('date', models.DateField()),
+                ('is_completed', models.BooleanField(default=False)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_objectives', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['date', 'id'],
+                'indexes': [models.Index(fields=['user', 'date'], name='api_archive_user_id_8199a7_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,82 @@
+from django.db import migrations
+
+
+SQLITE_CREATE = """
+CREATE VIRTUAL TABLE api_search_index USING fts5(
+    owner,
+    kind UNINDEXED,
+    object_id UNINDEXED,
+    user_id UNINDEXED,
+    date UNINDEXED,
+    title,
+    body,
+    tokenize = 'porter unicode61'
+)
+"""
+
+POSTGRES_CREATE = [
+    """
+    CREATE TABLE api_search_index (
+        id bigserial PRIMARY KEY,
+        kind varchar(16) NOT NULL,
+        object_id bigint NOT NULL,
+        user_id integer NOT NULL,
+        date date,
+        title text NOT NULL DEFAULT '',
+        body text NOT NULL DEFAULT '',
+        document tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(body, '')), 'B')
+        ) STORED,
+        UNIQUE (kind, object_id)
+    )
+    """,
+    "CREATE INDEX api_search_index_document ON api_search_index USING GIN (document)",
+    "CREATE INDEX api_search_index_user ON api_search_index (user_id)",
+]
+
+SOURCES = [
+    ('objective', 'api_objective', "''", 'description', 'date'),
+    ('objective', 'api_archivedobjective', "''", 'description', 'date'),
+    ('project', 'api_project', 'name', 'description', 'start_date'),
+    ('checkin', 'api_dailycheckin', 'mood', 'notes', 'date'),
+    ('checkin', 'api_archivedcheckin', 'mood', 'notes', 'date'),
+]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for statement in POSTGRES_CREATE:
+            schema_editor.execute(statement)
+        insert = (
+            "INSERT INTO api_search_index (kind, object_id, user_id, date, title, body) "
+            "SELECT %s, id, user_id, {date}, {title}, {body} FROM {table}"
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(SQLITE_CREATE)
+        insert = (
+            "INSERT INTO api_search_index (owner, kind, object_id, user_id, date, title, body) "
+            "SELECT 'u' || user_id, %s, id, user_id, {date}, {title}, {body} FROM {table}"
+        )
+    else:
+        return
+
+    for kind, table, title, body, date in SOURCES:
+        schema_editor.execute(insert.format(table=table, title=title, body=body, date=date), [kind])
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('postgresql', 'sqlite'):
+        schema_editor.execute("DROP TABLE IF EXISTS api_search_index")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_archive_tables'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
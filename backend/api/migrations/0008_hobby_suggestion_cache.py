@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_weekly_plans'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HobbySuggestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mood', models.CharField(blank=True, max_length=20)),
+                ('goal', models.CharField(max_length=500)),
+                ('hobby_name', models.CharField(max_length=200)),
+                ('normalized_name', models.CharField(max_length=200)),
+                ('description', models.TextField()),
+                ('getting_started', models.TextField()),
+                ('features', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('source_user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:49
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_hobby_suggestion_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkoutTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mood', models.CharField(max_length=20)),
+                ('body_bucket', models.CharField(max_length=20)),
+                ('goal_category', models.CharField(max_length=20)),
+                ('plan', models.JSONField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['mood', 'body_bucket', 'goal_category', 'created_at'],
+                'indexes': [models.Index(fields=['mood', 'body_bucket', 'goal_category'], name='api_workout_mood_b7c44c_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_workout_library'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CohortSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window_start', models.DateField(blank=True, null=True)),
+                ('window_end', models.DateField()),
+                ('users', models.PositiveIntegerField(default=0)),
+                ('objectives', models.PositiveIntegerField(default=0)),
+                ('checkins', models.PositiveIntegerField(default=0)),
+                ('duration_ms', models.FloatField(default=0)),
+                ('results', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='UserTrend',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('computed_at', models.DateTimeField()),
+                ('active_days', models.PositiveIntegerField(default=0)),
+                ('objectives', models.PositiveIntegerField(default=0)),
+                ('completion_rate_7d', models.FloatField(blank=True, null=True)),
+                ('completion_rate_30d', models.FloatField(blank=True, null=True)),
+                ('completion_trend', models.FloatField(blank=True, help_text='30-day completion rate minus the rate over the 30 days before', null=True)),
+                ('current_streak', models.PositiveIntegerField(default=0)),
+                ('longest_streak', models.PositiveIntegerField(default=0)),
+                ('top_mood', models.CharField(blank=True, max_length=20)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='trend', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_cohort_analytics'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dailycheckin',
+            index=models.Index(fields=['date'], name='api_dailych_date_4291bb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='objective',
+            index=models.Index(fields=['date'], name='api_objecti_date_49e990_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='objective',
+            index=models.Index(fields=['user', 'date'], name='api_objecti_user_id_a8f740_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_objective_checkin_date_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='llmledgerentry',
+            name='calls',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:16
+
+from datetime import timedelta
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def seed_watermark(apps, schema_editor):
+    # Tables archived before runs were recorded: nothing newer than their latest row is cold.
+    latest = [
+        apps.get_model('api', name).objects.aggregate(latest=Max('date'))['latest']
+        for name in ('ArchivedObjective', 'ArchivedCheckIn')
+    ]
+    latest = [day for day in latest if day is not None]
+    if latest:
+        apps.get_model('api', 'ArchiveRun').objects.create(cutoff=max(latest) + timedelta(days=1))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_llm_ledger_calls'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cutoff', models.DateField()),
+                ('objectives', models.PositiveIntegerField(default=0)),
+                ('checkins', models.PositiveIntegerField(default=0)),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='archivedcheckin',
+            name='created_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedobjective',
+            name='created_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedobjective',
+            name='updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(seed_watermark, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
 
 
@@ -11,6 +12,10 @@ class UserProfile(models.Model):
         ('Pomodoro', 'Pomodoro'),
         ('GTD', 'Getting Things Done'),
     ]
+    PLANNING_MODE_CHOICES = [
+        ('daily', 'Daily'),
+        ('weekly', 'Weekly'),
+    ]
     
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     goal = models.CharField(max_length=500, help_text="User's primary goal")
@@ -22,6 +27,12 @@ class UserProfile(models.Model):
         choices=SCHEDULING_CHOICES,
         default='Atomic Habits'
     )
+    planning_mode = models.CharField(
+        max_length=10,
+        choices=PLANNING_MODE_CHOICES,
+        default='daily',
+        help_text="Weekly drafts seven days with one LLM call"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -67,6 +78,10 @@ class Objective(models.Model):
 
     class Meta:
         ordering = ['date', '-created_at']
+        indexes = [
+            models.Index(fields=['date']),
+            models.Index(fields=['user', 'date']),
+        ]
 
 
 class DailyCheckIn(models.Model):
@@ -92,6 +107,7 @@ class DailyCheckIn(models.Model):
     class Meta:
         ordering = ['-date']
         unique_together = ['user', 'date']
+        indexes = [models.Index(fields=['date'])]
 
 
 class Tip(models.Model):
@@ -132,3 +148,239 @@ class Hobby(models.Model):
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = "Hobbies"
+
+
+class WeeklyPlan(models.Model):
+    """Seven-day draft from one LLM call; days[i] holds the objectives for week_start + i days."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='weekly_plans')
+    week_start = models.DateField()
+    days = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.user.username} - week of {self.week_start}"
+
+    class Meta:
+        ordering = ['-week_start']
+        unique_together = ['user', 'week_start']
+
+
+class HobbySuggestion(models.Model):
+    """A generated hobby suggestion, reused for users whose context vector is close to it."""
+    source_user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    mood = models.CharField(max_length=20, blank=True)
+    goal = models.CharField(max_length=500)
+    hobby_name = models.CharField(max_length=200)
+    normalized_name = models.CharField(max_length=200)
+    description = models.TextField()
+    getting_started = models.TextField()
+    features = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.hobby_name} ({self.mood or 'any mood'})"
+
+    class Meta:
+        ordering = ['-created_at']
+
+
+class WorkoutTemplate(models.Model):
+    """Pre-generated workout for one (mood, body bucket, goal category) cell of the library."""
+    mood = models.CharField(max_length=20)
+    body_bucket = models.CharField(max_length=20)
+    goal_category = models.CharField(max_length=20)
+    plan = models.JSONField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.mood} / {self.body_bucket} / {self.goal_category}"
+
+    class Meta:
+        ordering = ['mood', 'body_bucket', 'goal_category', 'created_at']
+        indexes = [models.Index(fields=['mood', 'body_bucket', 'goal_category'])]
+
+
+class CohortSnapshot(models.Model):
+    """Output of one `manage.py compute_cohort_analytics` run across all users."""
+    window_start = models.DateField(null=True, blank=True)
+    window_end = models.DateField()
+    users = models.PositiveIntegerField(default=0)
+    objectives = models.PositiveIntegerField(default=0)
+    checkins = models.PositiveIntegerField(default=0)
+    duration_ms = models.FloatField(default=0)
+    results = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Cohort analytics to {self.window_end} ({self.users} users)"
+
+    class Meta:
+        ordering = ['-created_at']
+
+
+class UserTrend(models.Model):
+    """Per-user completion and streak figures from the latest cohort analytics run."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='trend')
+    computed_at = models.DateTimeField()
+    active_days = models.PositiveIntegerField(default=0)
+    objectives = models.PositiveIntegerField(default=0)
+    completion_rate_7d = models.FloatField(null=True, blank=True)
+    completion_rate_30d = models.FloatField(null=True, blank=True)
+    completion_trend = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="30-day completion rate minus the rate over the 30 days before"
+    )
+    current_streak = models.PositiveIntegerField(default=0)
+    longest_streak = models.PositiveIntegerField(default=0)
+    top_mood = models.CharField(max_length=20, blank=True)
+
+    def __str__(self):
+        return f"{self.user.username} trend"
+
+
+class RequestProfile(models.Model):
+    TRIGGER_CHOICES = [
+        ('header', 'Requested via header'),
+        ('sampled', 'Sampled'),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='request_profiles'
+    )
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    route = models.CharField(max_length=200, blank=True)
+    status_code = models.PositiveSmallIntegerField()
+    trigger = models.CharField(max_length=10, choices=TRIGGER_CHOICES)
+    duration_ms = models.FloatField()
+    query_count = models.PositiveIntegerField(default=0)
+    query_time_ms = models.FloatField(default=0)
+    llm_time_ms = models.FloatField(default=0)
+    sql_trace = models.JSONField(default=list, blank=True)
+    llm_spans = models.JSONField(default=list, blank=True)
+    profile_stats = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
+
+    class Meta:
+        ordering = ['-created_at']
+
+
+class LLMLedgerEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='llm_ledger_entries'
+    )
+    endpoint = models.CharField(max_length=32)
+    model = models.CharField(max_length=64, blank=True)
+    prompt_tokens = models.PositiveIntegerField(null=True, blank=True)
+    output_tokens = models.PositiveIntegerField(null=True, blank=True)
+    latency_ms = models.FloatField(null=True, blank=True)
+    cache_hit = models.BooleanField(default=False)
+    fallback = models.BooleanField(default=False)
+    # Cache hits are aggregated, so one row can stand for several calls.
+    calls = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.endpoint} - {self.created_at:%Y-%m-%d %H:%M}"
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name_plural = "LLM ledger entries"
+
+
+class ArchivedObjective(models.Model):
+    """Cold-storage copy of an Objective, keeping its original id."""
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_objectives')
+    project_id = models.BigIntegerField(null=True, blank=True)
+    description = models.TextField()
+    date = models.DateField()
+    is_completed = models.BooleanField(default=False)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.description[:50]} - {self.date}"
+
+    class Meta:
+        ordering = ['date', 'id']
+        indexes = [models.Index(fields=['user', 'date'])]
+
+
+class ArchivedCheckIn(models.Model):
+    """Cold-storage copy of a DailyCheckIn, keeping its original id."""
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_checkins')
+    date = models.DateField()
+    mood = models.CharField(max_length=20, choices=DailyCheckIn.MOOD_CHOICES)
+    notes = models.TextField(blank=True)
+    created_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.user.username} - {self.date} - {self.mood}"
+
+    class Meta:
+        ordering = ['-date']
+        unique_together = ['user', 'date']
+
+
+class ArchiveRun(models.Model):
+    """One archive_history run. No archived row is dated on or after the latest cutoff."""
+    cutoff = models.DateField()
+    objectives = models.PositiveIntegerField(default=0)
+    checkins = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Before {self.cutoff} - {self.started_at:%Y-%m-%d %H:%M}"
+
+    class Meta:
+        ordering = ['-started_at']
+
+
+class IdempotencyRecord(models.Model):
+    """Stored response for an Idempotency-Key; status_code stays null while the first request runs."""
+    scope = models.CharField(max_length=32)
+    key = models.CharField(max_length=255)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='idempotency_records'
+    )
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.scope} {self.key}"
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key'], name='unique_idempotency_key_per_scope'),
+        ]
@@ -0,0 +1,98 @@
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+
+from .llm_service import daily_plan_fallback, generate_weekly_plan, record_cache_lookup
+from .models import WeeklyPlan
+from .prompt_budget import dedupe
+
+
+PLAN_DAYS = 7
+MAX_DAILY_OBJECTIVES = 5
+LIGHT_DAY_OBJECTIVES = 3
+LOW_ENERGY_MOODS = {'Stressful', 'Tired', 'Overwhelmed'}
+
+
+def current_weekly_plan(user, day):
+    return (
+        WeeklyPlan.objects
+        .filter(user=user, week_start__lte=day, week_start__gt=day - timedelta(days=PLAN_DAYS))
+        .order_by('-week_start')
+        .first()
+    )
+
+
+def get_or_create_weekly_plan(user, user_profile, day):
+    """The plan covering day, drafting a new week starting on day if there is none."""
+    plan = current_weekly_plan(user, day)
+    record_cache_lookup('weekly_plan', user, plan is not None)
+    if plan is not None:
+        return plan
+
+    days = generate_weekly_plan(user, user_profile, day)
+    if days is None:
+        return None
+    try:
+        with transaction.atomic():
+            return WeeklyPlan.objects.create(user=user, week_start=day, days=days)
+    except IntegrityError:
+        # A concurrent request drafted the same week first.
+        return WeeklyPlan.objects.get(user=user, week_start=day)
+
+
+def adjust_day(planned, previous_objectives, mood):
+    """
+    Adapt a drafted day to how the previous day went, without an LLM call:
+    unfinished work is carried over first, and after a low-energy or
+    mostly-missed day the list is shortened and carried work is reduced to
+    one small step.
+    """
+    incomplete = [description for description, done in previous_objectives if not done]
+    completion_rate = (
+        1 - len(incomplete) / len(previous_objectives) if previous_objectives else None
+    )
+
+    limit = MAX_DAILY_OBJECTIVES
+    if mood in LOW_ENERGY_MOODS:
+        limit = LIGHT_DAY_OBJECTIVES
+        carried = [f"Take one small first step on: {incomplete[0]}"] if incomplete else []
+    else:
+        if completion_rate is not None and completion_rate < 0.5:
+            limit = LIGHT_DAY_OBJECTIVES
+        carried = incomplete[:2]
+
+    # Always keep at least one drafted objective so the week still progresses.
+    carried = carried[:limit - 1]
+    seen = set()
+    carried = dedupe(carried, seen)
+    return (carried + dedupe(planned, seen))[:limit]
+
+
+def objectives_for_day(user, user_profile, day):
+    """Objective descriptions for day in weekly planning mode."""
+    plan = get_or_create_weekly_plan(user, user_profile, day)
+    if plan is None:
+        return daily_plan_fallback(user_profile)
+
+    planned = plan.days[(day - plan.week_start).days]
+    if day == plan.week_start:
+        # The draft was written with yesterday's results in context.
+        return planned
+
+    yesterday = day - timedelta(days=1)
+    previous = list(
+        user.objectives.filter(date=yesterday).values_list('description', 'is_completed')
+    )
+    checkin = user.daily_checkins.filter(date=yesterday).first()
+    return adjust_day(planned, previous, checkin.mood if checkin else None)
+
+
+def week_view(plan):
+    return {
+        'week_start': plan.week_start,
+        'days': [
+            {'date': plan.week_start + timedelta(days=i), 'objectives': objectives}
+            for i, objectives in enumerate(plan.days)
+        ],
+        'created_at': plan.created_at,
+    }
@@ -0,0 +1,166 @@
+import contextvars
+import cProfile
+import io
+import pstats
+import random
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from .middleware import route_name
+
+
+PROFILE_HEADER = 'X-Momentum-Profile'
+
+_active_session = contextvars.ContextVar('momentum_profile_session', default=None)
+
+# Only one cProfile profiler can run per process (on 3.12+ it holds the single
+# sys.monitoring profiler slot); concurrent requests keep SQL and LLM spans only.
+_profiler_lock = threading.Lock()
+
+
+class ProfileSession:
+    def __init__(self):
+        self.sql = []
+        self.llm_spans = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql.append({
+                'alias': context['connection'].alias,
+                'sql': sql,
+                'many': many,
+                'ms': round((time.perf_counter() - start) * 1000, 3),
+            })
+
+
+def record_llm_span(call):
+    session = _active_session.get()
+    if session is None:
+        return
+    session.llm_spans.append({
+        'endpoint': call.endpoint,
+        'model': call.model,
+        'ms': round(call.latency * 1000, 3) if call.latency is not None else None,
+        'prompt_chars': call.prompt_chars,
+        'response_chars': call.response_chars,
+        'fallback': call.fallback,
+    })
+
+
+def _token_user(request):
+    try:
+        result = TokenAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+    return result[0] if result else None
+
+
+def _profile_trigger(request):
+    if request.headers.get(PROFILE_HEADER):
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            user = _token_user(request)
+        if user is not None and user.is_staff:
+            return 'header', user
+
+    sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0)
+    if sample_rate and random.random() < sample_rate:
+        return 'sampled', None
+    return None, None
+
+
+def _format_stats(profiler):
+    if profiler is None:
+        return ''
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats('cumulative').print_stats(getattr(settings, 'PROFILING_STATS_LIMIT', 40))
+    return stream.getvalue()
+
+
+class ProfilingMiddleware:
+    """Profiles opted-in or sampled requests and keeps the last few in a ring buffer."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        trigger, user = _profile_trigger(request)
+        if trigger is None:
+            return self.get_response(request)
+
+        session = ProfileSession()
+        token = _active_session.set(session)
+        profiler = self._start_profiler()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(session))
+                try:
+                    response = self.get_response(request)
+                finally:
+                    if profiler is not None:
+                        profiler.disable()
+                        _profiler_lock.release()
+        finally:
+            _active_session.reset(token)
+        elapsed = time.perf_counter() - start
+
+        if user is None:
+            request_user = getattr(request, 'user', None)
+            if request_user is not None and request_user.is_authenticated:
+                user = request_user
+
+        profile = save_profile(request, response, trigger, user, session, profiler, elapsed)
+        response[f'{PROFILE_HEADER}-Id'] = str(profile.pk)
+        return response
+
+    def _start_profiler(self):
+        """An enabled profiler, or None while another request holds it."""
+        if not _profiler_lock.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another tool (a debugger or coverage) owns the profiler hook.
+            _profiler_lock.release()
+            return None
+        return profiler
+
+
+def save_profile(request, response, trigger, user, session, profiler, elapsed):
+    from .models import RequestProfile
+
+    profile = RequestProfile.objects.create(
+        user=user,
+        method=request.method,
+        path=request.get_full_path()[:500],
+        route=route_name(request)[:200],
+        status_code=response.status_code,
+        trigger=trigger,
+        duration_ms=elapsed * 1000,
+        query_count=len(session.sql),
+        query_time_ms=sum(entry['ms'] for entry in session.sql),
+        llm_time_ms=sum(span['ms'] or 0 for span in session.llm_spans),
+        sql_trace=session.sql,
+        llm_spans=session.llm_spans,
+        profile_stats=_format_stats(profiler),
+    )
+
+    ring_size = getattr(settings, 'PROFILING_RING_SIZE', 200)
+    stale_ids = RequestProfile.objects.order_by('-created_at', '-id').values_list('id', flat=True)[ring_size:]
+    stale_ids = list(stale_ids)
+    if stale_ids:
+        RequestProfile.objects.filter(id__in=stale_ids).delete()
+    return profile
@@ -0,0 +1,149 @@
+import re
+
+
+CHARS_PER_TOKEN = 4
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+_NORMALIZE = re.compile(r'[^a-z0-9]+')
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token for English text)."""
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def summarize_text(text, max_chars):
+    """Keep whole leading sentences up to max_chars, falling back to a word-boundary cut."""
+    text = ' '.join((text or '').split())
+    if len(text) <= max_chars:
+        return text
+
+    summary = ''
+    for sentence in _SENTENCE_END.split(text):
+        candidate = f'{summary} {sentence}'.strip()
+        if len(candidate) > max_chars - 1:
+            break
+        summary = candidate
+    if summary:
+        return summary + ' …'
+
+    cut = text[:max_chars - 1].rsplit(' ', 1)[0]
+    return cut.rstrip(',;:') + '…'
+
+
+def dedupe(items, seen=None):
+    """Drop items that repeat an earlier one, ignoring case, spacing and punctuation."""
+    seen = set() if seen is None else seen
+    unique = []
+    for item in items:
+        key = _NORMALIZE.sub(' ', item.lower()).strip()
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        unique.append(item)
+    return unique
+
+
+class _Section:
+    def __init__(self, name, priority, empty):
+        self.name = name
+        self.priority = priority
+        self.empty = empty
+
+
+class _ItemSection(_Section):
+    def __init__(self, name, items, priority, min_items, item_max_chars, empty):
+        super().__init__(name, priority, empty)
+        self.original = list(items)
+        self.items = [summarize_text(item, item_max_chars) for item in items]
+        self.min_items = min_items
+
+    def raw(self):
+        return ', '.join(self.original) if self.original else self.empty
+
+    def render(self):
+        if not self.items:
+            return self.empty
+        text = ', '.join(self.items)
+        omitted = len(self.original) - len(self.items)
+        if omitted > 0:
+            text += f' (+{omitted} more)'
+        return text
+
+    def shrink(self):
+        if len(self.items) <= self.min_items:
+            return False
+        self.items.pop()
+        return True
+
+
+class _TextSection(_Section):
+    def __init__(self, name, text, priority, max_chars, min_chars, empty):
+        super().__init__(name, priority, empty)
+        self.original = text or ''
+        self.max_chars = max_chars
+        self.min_chars = min_chars
+        self.text = summarize_text(self.original, max_chars)
+
+    def raw(self):
+        return self.original or self.empty
+
+    def render(self):
+        return self.text or self.empty
+
+    def shrink(self):
+        if self.max_chars <= self.min_chars or not self.text:
+            return False
+        self.max_chars = max(self.max_chars // 2, self.min_chars)
+        self.text = summarize_text(self.original, self.max_chars)
+        return True
+
+
+class PromptBudget:
+    """
+    Fills a prompt template with context sections while keeping it under a
+    token budget. Sections with a higher priority number are trimmed first;
+    items should be passed most important first.
+    """
+
+    def __init__(self, max_tokens):
+        self.max_tokens = max_tokens
+        self.sections = []
+        self.report = {}
+
+    def add_items(self, name, items, priority, min_items=0, item_max_chars=200, empty='None'):
+        self.sections.append(_ItemSection(name, items, priority, min_items, item_max_chars, empty))
+
+    def add_text(self, name, text, priority, max_chars=500, min_chars=80, empty='None'):
+        self.sections.append(_TextSection(name, text, priority, max_chars, min_chars, empty))
+
+    def render(self, template, **fields):
+        raw_prompt = template.format(**fields, **{s.name: s.raw() for s in self.sections})
+        prompt = self._format(template, fields)
+
+        shrinkable = sorted(self.sections, key=lambda s: -s.priority)
+        while estimate_tokens(prompt) > self.max_tokens and shrinkable:
+            section = shrinkable[0]
+            if not section.shrink():
+                shrinkable.pop(0)
+                continue
+            prompt = self._format(template, fields)
+
+        self.report = {
+            'budget_tokens': self.max_tokens,
+            'pre_tokens': estimate_tokens(raw_prompt),
+            'post_tokens': estimate_tokens(prompt),
+            'pre_chars': len(raw_prompt),
+            'post_chars': len(prompt),
+            'dropped_items': {
+                s.name: len(s.original) - len(s.items)
+                for s in self.sections
+                if isinstance(s, _ItemSection) and len(s.original) != len(s.items)
+            },
+        }
+        return prompt
+
+    def _format(self, template, fields):
+        return template.format(**fields, **{s.name: s.render() for s in self.sections})
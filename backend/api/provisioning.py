@@ -0,0 +1,157 @@
+import csv
+import json
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from .data_transfer import TooManyImportErrors, validation_message
+from .hashing import PasswordHashPool
+from .models import UserProfile
+from .serializers import BulkUserSerializer
+
+
+FORMATS = ('csv', 'ndjson')
+
+
+def format_for(name):
+    """'csv' or 'ndjson' from a file name or content type, or None."""
+    name = (name or '').split(';')[0].strip().lower()
+    if name.endswith('.csv') or name == 'text/csv':
+        return 'csv'
+    if name.endswith(('.ndjson', '.jsonl')) or name in ('application/x-ndjson', 'application/jsonl'):
+        return 'ndjson'
+    return None
+
+
+def iter_records(lines, content_format):
+    """
+    Yield (line number, record) from CSV with a header row or from NDJSON.
+    NDJSON records are yielded unparsed so a bad line is reported, not fatal.
+    """
+    lines = (line.decode('utf-8-sig') if isinstance(line, bytes) else line for line in lines)
+    if content_format == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            # Empty cells mean "use the default", as an absent NDJSON key does.
+            yield reader.line_num, {key.strip(): value for key, value in row.items() if key and value not in ('', None)}
+    else:
+        for line_number, line in enumerate(lines, start=1):
+            if line.strip():
+                yield line_number, line
+
+
+class UserProvisioner:
+    """
+    Creates accounts in bulk. Rows are validated like onboarding, buffered into
+    chunks, hashed on a process pool, and each chunk's users, profiles and
+    tokens are written with bulk_create in one transaction.
+    """
+
+    def __init__(self, batch_size=1000, max_errors=100, workers=None, progress=None):
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.workers = settings.PROVISIONING_HASH_WORKERS if workers is None else workers
+        self.progress = progress
+        self.pending = []
+        self.usernames = set()
+        self.created = 0
+        self.errors = []
+        self.started = None
+
+    def run(self, records):
+        self.started = time.perf_counter()
+        with PasswordHashPool(self.workers) as self.pool:
+            for line_number, record in records:
+                try:
+                    self.add(line_number, json.loads(record) if isinstance(record, str) else record)
+                except (ValueError, TypeError) as e:
+                    self.error(line_number, str(e))
+            self.flush()
+        return self.summary()
+
+    def error(self, line_number, message):
+        self.errors.append({'line': line_number, 'error': message})
+        if len(self.errors) >= self.max_errors:
+            raise TooManyImportErrors(f"Stopped after {len(self.errors)} errors")
+
+    def add(self, line_number, record):
+        if not isinstance(record, dict):
+            raise TypeError("Each record must be an object")
+        serializer = BulkUserSerializer(data=record)
+        if not serializer.is_valid():
+            raise ValueError(validation_message(serializer.errors))
+        data = serializer.validated_data
+        if data['username'] in self.usernames:
+            raise ValueError(f"Duplicate username {data['username']!r}")
+        self.usernames.add(data['username'])
+        self.pending.append((line_number, data))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        batch, self.pending = self.pending, []
+        existing = set(
+            User.objects.filter(username__in=[data['username'] for _, data in batch])
+            .values_list('username', flat=True)
+        )
+        for line_number, data in batch:
+            if data['username'] in existing:
+                self.error(line_number, f"Username {data['username']!r} already exists")
+        batch = [(line_number, data) for line_number, data in batch if data['username'] not in existing]
+        if not batch:
+            return
+
+        hashes = self.pool.hash([data.get('password') for _, data in batch])
+        try:
+            self.write(batch, hashes)
+        except IntegrityError:
+            # Someone else created one of these usernames since the check above.
+            for row in zip(batch, hashes):
+                self.write_one(*row)
+        if self.progress:
+            self.progress(self.created, time.perf_counter() - self.started)
+
+    def write(self, batch, hashes):
+        now = timezone.now()
+        users = [
+            User(
+                username=data['username'],
+                email=data['email'],
+                first_name=data.get('first_name', ''),
+                password=password_hash,
+                date_joined=now,
+            )
+            for (_, data), password_hash in zip(batch, hashes)
+        ]
+        with transaction.atomic():
+            created = User.objects.bulk_create(users)
+            if not connection.features.can_return_rows_from_bulk_insert:
+                ids = dict(User.objects.filter(username__in=[u.username for u in users]).values_list('username', 'id'))
+                for user in created:
+                    user.pk = ids[user.username]
+            UserProfile.objects.bulk_create([
+                UserProfile(user=user, goal=data['goal'], scheduling_method=data['scheduling_method'])
+                for user, (_, data) in zip(created, batch)
+            ])
+            Token.objects.bulk_create([Token(key=Token.generate_key(), user=user) for user in created])
+        self.created += len(created)
+
+    def write_one(self, row, password_hash):
+        line_number, data = row
+        try:
+            self.write([row], [password_hash])
+        except IntegrityError:
+            self.error(line_number, f"Username {data['username']!r} already exists")
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        return {
+            'created': self.created,
+            'errors': self.errors,
+            'duration_seconds': round(elapsed, 2),
+            'users_per_second': round(self.created / elapsed, 1) if elapsed else None,
+        }
@@ -0,0 +1,241 @@
+import contextvars
+import re
+from contextlib import contextmanager
+from datetime import datetime
+
+from django.db import connection
+
+
+SEARCH_TABLE = 'api_search_index'
+KINDS = ('objective', 'project', 'checkin')
+# Saves that touch none of these leave the index entry as it is.
+INDEXED_FIELDS = {
+    'objective': {'description', 'date', 'user'},
+    'project': {'name', 'description', 'start_date', 'user'},
+    'checkin': {'mood', 'notes', 'date', 'user'},
+}
+
+_sync_suppressed = contextvars.ContextVar('momentum_search_sync_suppressed', default=False)
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+@contextmanager
+def suppress_sync():
+    """Skip index removal in the block, e.g. while archiving rows that must stay searchable."""
+    token = _sync_suppressed.set(True)
+    try:
+        yield
+    finally:
+        _sync_suppressed.reset(token)
+
+
+def sync_suppressed():
+    return _sync_suppressed.get()
+
+
+def document_for(instance):
+    """Returns (kind, title, body, date) for an indexed model instance."""
+    from .models import ArchivedCheckIn, ArchivedObjective, DailyCheckIn, Objective, Project
+
+    if isinstance(instance, (Objective, ArchivedObjective)):
+        return 'objective', '', instance.description, instance.date
+    if isinstance(instance, Project):
+        return 'project', instance.name, instance.description, instance.start_date
+    if isinstance(instance, (DailyCheckIn, ArchivedCheckIn)):
+        return 'checkin', instance.mood, instance.notes, instance.date
+    raise TypeError(f"{type(instance).__name__} is not searchable")
+
+
+def _owner_token(user_id):
+    return f'u{user_id}'
+
+
+def index_instances(instances):
+    """Insert or refresh index rows for saved instances of the indexed models or their archives."""
+    rows = []
+    for instance in instances:
+        kind, title, body, date = document_for(instance)
+        if isinstance(date, datetime):
+            date = date.date()
+        rows.append((kind, instance.pk, instance.user_id, date, title, body))
+    if not rows:
+        return
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.executemany(
+                f"INSERT INTO {SEARCH_TABLE} (kind, object_id, user_id, date, title, body) "
+                "VALUES (%s, %s, %s, %s, %s, %s) "
+                "ON CONFLICT (kind, object_id) DO UPDATE SET "
+                "date = EXCLUDED.date, title = EXCLUDED.title, body = EXCLUDED.body",
+                rows
+            )
+        else:
+            # FTS5 tables have no unique constraints, so replace by (kind, object_id).
+            cursor.executemany(
+                f"DELETE FROM {SEARCH_TABLE} WHERE kind = %s AND object_id = %s",
+                [(kind, object_id) for kind, object_id, *_ in rows]
+            )
+            cursor.executemany(
+                f"INSERT INTO {SEARCH_TABLE} (owner, kind, object_id, user_id, date, title, body) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                [(_owner_token(row[2]), *row) for row in rows]
+            )
+
+
+def remove(kind, object_ids):
+    if not object_ids:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"DELETE FROM {SEARCH_TABLE} WHERE kind = %s AND object_id = %s",
+            [(kind, object_id) for object_id in object_ids]
+        )
+
+
+def remove_user(user_id):
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE user_id = %s", [user_id])
+
+
+def _fts5_query(text):
+    tokens = _TOKEN.findall(text)
+    if not tokens:
+        return None
+    # Quote every token so user input can never be parsed as FTS5 syntax;
+    # the last token is a prefix match for search-as-you-type.
+    terms = [f'"{token}"' for token in tokens[:-1]] + [f'"{tokens[-1]}"*']
+    # Match the content only; the owner column exists to filter by user.
+    return f"{{title body}} : ({' '.join(terms)})"
+
+
+def search(query, user=None, kinds=KINDS, limit=20, offset=0, with_count=True):
+    """
+    Ranked full-text search. Returns (total, results) where each result is a
+    dict with kind, id, user_id, date, title, snippet and rank. Pass user=None
+    to search across all users (admin).
+    """
+    kinds = [kind for kind in kinds if kind in KINDS]
+    if not query.strip() or not kinds:
+        return 0, []
+    if connection.vendor == 'postgresql':
+        return _search_postgres(query, user, kinds, limit, offset, with_count)
+    return _search_sqlite(query, user, kinds, limit, offset, with_count)
+
+
+def _search_sqlite(query, user, kinds, limit, offset, with_count):
+    match = _fts5_query(query)
+    if match is None:
+        return 0, []
+    if user is not None:
+        match = f'owner:{_owner_token(user.pk)} AND ({match})'
+
+    kind_placeholders = ', '.join(['%s'] * len(kinds))
+    where = f"{SEARCH_TABLE} MATCH %s AND kind IN ({kind_placeholders})"
+    params = [match, *kinds]
+
+    with connection.cursor() as cursor:
+        total = None
+        if with_count:
+            cursor.execute(f"SELECT COUNT(*) FROM {SEARCH_TABLE} WHERE {where}", params)
+            total = cursor.fetchone()[0]
+        cursor.execute(
+            f"SELECT kind, object_id, user_id, date, title, "
+            f"snippet({SEARCH_TABLE}, 6, '[', ']', '…', 12), bm25({SEARCH_TABLE}, 0, 0, 0, 0, 0, 2.0, 1.0) AS rank "
+            f"FROM {SEARCH_TABLE} WHERE {where} ORDER BY rank LIMIT %s OFFSET %s",
+            [*params, limit, offset]
+        )
+        rows = cursor.fetchall()
+    return total, [_result(row, -row[6]) for row in rows]
+
+
+def _search_postgres(query, user, kinds, limit, offset, with_count):
+    where = "document @@ websearch_to_tsquery('english', %s) AND kind = ANY(%s)"
+    params = [query, list(kinds)]
+    if user is not None:
+        where += " AND user_id = %s"
+        params.append(user.pk)
+
+    with connection.cursor() as cursor:
+        total = None
+        if with_count:
+            cursor.execute(f"SELECT COUNT(*) FROM {SEARCH_TABLE} WHERE {where}", params)
+            total = cursor.fetchone()[0]
+        cursor.execute(
+            f"SELECT kind, object_id, user_id, date, title, "
+            f"ts_headline('english', body, websearch_to_tsquery('english', %s), "
+            f"'StartSel=[, StopSel=], MaxWords=12, MinWords=4'), "
+            f"ts_rank_cd(document, websearch_to_tsquery('english', %s)) AS rank "
+            f"FROM {SEARCH_TABLE} WHERE {where} ORDER BY rank DESC LIMIT %s OFFSET %s",
+            [query, query, *params, limit, offset]
+        )
+        rows = cursor.fetchall()
+    return total, [_result(row, row[6]) for row in rows]
+
+
+def _result(row, rank):
+    kind, object_id, user_id, date, title, snippet, _ = row
+    return {
+        'kind': kind,
+        'id': object_id,
+        'user_id': user_id,
+        'date': date,
+        'title': title,
+        'snippet': snippet,
+        'rank': round(rank, 6),
+    }
+
+
+def match_subquery(kind, query):
+    """
+    (sql, params) selecting the object ids of every indexed row of one kind
+    that matches query, for a RawSQL pk__in filter; None if nothing can match.
+    """
+    if connection.vendor == 'postgresql':
+        if not query.strip():
+            return None
+        return (
+            f"SELECT object_id FROM {SEARCH_TABLE} "
+            "WHERE document @@ websearch_to_tsquery('english', %s) AND kind = %s",
+            [query, kind]
+        )
+    match = _fts5_query(query)
+    if match is None:
+        return None
+    return f"SELECT object_id FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s AND kind = %s", [match, kind]
+
+
+def search_ids(kind, query, limit=1000):
+    """Object ids of one kind matching query across all users, best match first."""
+    _, results = search(query, kinds=[kind], limit=limit, with_count=False)
+    return [result['id'] for result in results]
+
+
+REBUILD_SOURCES = [
+    ('objective', 'api_objective', "''", 'description', 'date'),
+    ('objective', 'api_archivedobjective', "''", 'description', 'date'),
+    ('project', 'api_project', 'name', 'description', 'start_date'),
+    ('checkin', 'api_dailycheckin', 'mood', 'notes', 'date'),
+    ('checkin', 'api_archivedcheckin', 'mood', 'notes', 'date'),
+]
+
+
+def rebuild():
+    """Repopulate the whole index from the source tables with INSERT ... SELECT."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        for kind, table, title, body, date in REBUILD_SOURCES:
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    f"INSERT INTO {SEARCH_TABLE} (kind, object_id, user_id, date, title, body) "
+                    f"SELECT %s, id, user_id, {date}, {title}, {body} FROM {table} "
+                    "ON CONFLICT (kind, object_id) DO NOTHING",
+                    [kind]
+                )
+            else:
+                cursor.execute(
+                    f"INSERT INTO {SEARCH_TABLE} (owner, kind, object_id, user_id, date, title, body) "
+                    f"SELECT 'u' || user_id, %s, id, user_id, {date}, {title}, {body} FROM {table}",
+                    [kind]
+                )
@@ -1,6 +1,9 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import UserProfile, Project, Objective, DailyCheckIn, Tip, Hobby
+from .models import (
+    UserProfile, Project, Objective, DailyCheckIn, Tip, Hobby,
+    ArchivedObjective, ArchivedCheckIn
+)
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -21,7 +24,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
         model = UserProfile
         fields = [
             'id', 'user', 'goal', 'height_cm', 'weight_kg', 
-            'body_fat_percentage', 'scheduling_method', 
+            'body_fat_percentage', 'scheduling_method', 'planning_mode',
             'created_at', 'updated_at'
         ]
         read_only_fields = ['created_at', 'updated_at']
@@ -57,6 +60,28 @@ class DailyCheckInSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at']
 
 
+class ArchivedObjectiveSerializer(serializers.ModelSerializer):
+    """Same fields as ObjectiveSerializer; project_name is set by history.objectives_between."""
+    project = serializers.IntegerField(source='project_id', read_only=True)
+    project_name = serializers.CharField(read_only=True, default=None)
+
+    class Meta:
+        model = ArchivedObjective
+        fields = [
+            'id', 'description', 'date', 'is_completed',
+            'completed_at', 'project', 'project_name',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
+
+
+class ArchivedCheckInSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ArchivedCheckIn
+        fields = ['id', 'date', 'mood', 'notes', 'created_at']
+        read_only_fields = fields
+
+
 class TipSerializer(serializers.ModelSerializer):
     class Meta:
         model = Tip
@@ -82,6 +107,11 @@ class OnboardingSerializer(serializers.Serializer):
         default='Atomic Habits'
     )
 
+    def validate_username(self, value):
+        if User.objects.filter(username=value).exists():
+            raise serializers.ValidationError("A user with that username already exists.")
+        return value
+
     def create(self, validated_data):
         goal = validated_data.pop('goal')
         scheduling_method = validated_data.pop('scheduling_method', 'Atomic Habits')
@@ -95,3 +125,43 @@ class OnboardingSerializer(serializers.Serializer):
         )
         
         return user
+
+
+class BulkUserSerializer(OnboardingSerializer):
+    """One row of a bulk provisioning file; accounts without a password must reset it before logging in."""
+    password = serializers.CharField(write_only=True, required=False, allow_blank=True)
+    goal = serializers.CharField(max_length=500, required=False, allow_blank=True, default='')
+
+    def validate_username(self, value):
+        # UserProvisioner checks each chunk against existing usernames in one query.
+        return value
+
+
+class ProjectImportSerializer(serializers.Serializer):
+    """A project record of an NDJSON import; id is the exported id that objectives refer to."""
+    id = serializers.IntegerField()
+    name = serializers.CharField(max_length=200)
+    description = serializers.CharField(required=False, allow_blank=True, default='')
+    start_date = serializers.DateField(required=False, allow_null=True, default=None)
+    due_date = serializers.DateField(required=False, allow_null=True, default=None)
+    is_active = serializers.BooleanField(required=False, default=True)
+
+
+class HobbyImportSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=100)
+    description = serializers.CharField(required=False, allow_blank=True, default='')
+    frequency = serializers.CharField(max_length=50, required=False, allow_blank=True, default='')
+
+
+class ObjectiveImportSerializer(serializers.Serializer):
+    project_id = serializers.IntegerField(required=False, allow_null=True, default=None)
+    description = serializers.CharField()
+    date = serializers.DateField()
+    is_completed = serializers.BooleanField(required=False, default=False)
+    completed_at = serializers.DateTimeField(required=False, allow_null=True, default=None)
+
+
+class CheckInImportSerializer(serializers.Serializer):
+    date = serializers.DateField()
+    mood = serializers.ChoiceField(choices=DailyCheckIn.MOOD_CHOICES)
+    notes = serializers.CharField(required=False, allow_blank=True, default='')
@@ -0,0 +1,58 @@
+from functools import partial
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import search
+from .events import broker, event_for
+from .models import DailyCheckIn, Objective, Project
+
+
+@receiver(post_save, sender=Objective)
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=DailyCheckIn)
+def update_search_index(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    kind, *_ = search.document_for(instance)
+    if update_fields is not None and not search.INDEXED_FIELDS[kind] & set(update_fields):
+        return
+    search.index_instances([instance])
+
+
+@receiver(post_delete, sender=Objective)
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=DailyCheckIn)
+def remove_from_search_index(sender, instance, **kwargs):
+    if search.sync_suppressed():
+        return
+    kind, *_ = search.document_for(instance)
+    search.remove(kind, [instance.pk])
+
+
+@receiver(post_delete, sender=User)
+def remove_user_from_search_index(sender, instance, **kwargs):
+    search.remove_user(instance.pk)
+
+
+@receiver(post_save, sender=Objective)
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=DailyCheckIn)
+def push_saved(sender, instance, created=False, raw=False, using=None, **kwargs):
+    if raw or not broker.has_subscribers(instance.user_id):
+        return
+    event = event_for(instance, 'created' if created else 'updated')
+    transaction.on_commit(partial(broker.publish, instance.user_id, event), using=using)
+
+
+@receiver(post_delete, sender=Objective)
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=DailyCheckIn)
+def push_deleted(sender, instance, using=None, **kwargs):
+    # Archival moves rows out of the hot tables; clients still see them.
+    if search.sync_suppressed() or not broker.has_subscribers(instance.user_id):
+        return
+    event = event_for(instance, 'deleted')
+    transaction.on_commit(partial(broker.publish, instance.user_id, event), using=using)
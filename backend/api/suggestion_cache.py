@@ -0,0 +1,186 @@
+import re
+import threading
+import zlib
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Max
+
+from . import metrics
+from .models import DailyCheckIn, HobbySuggestion
+
+
+HASH_BUCKETS = 256
+MOODS = [mood for mood, _ in DailyCheckIn.MOOD_CHOICES]
+# Each block is unit-normalised, then weighted, so no block dominates by length.
+BLOCK_WEIGHTS = {'mood': 1.0, 'goal': 1.0, 'hobbies': 0.8, 'projects': 0.5}
+FEATURE_DIM = len(MOODS) + 1 + 3 * HASH_BUCKETS
+TRIM_EVERY = 100
+
+_WORD = re.compile(r'[a-z0-9]+')
+_STOPWORDS = frozenset(
+    'a an and are as at be by for from get i in is it me my of on or so the to up with'.split()
+)
+
+
+def normalize_name(name):
+    return ' '.join(_WORD.findall(name.lower()))
+
+
+def _bag_of_words(texts):
+    """Hashed bag of words; crc32 is used because hash() is salted per process."""
+    block = np.zeros(HASH_BUCKETS, dtype=np.float32)
+    for text in texts:
+        for word in _WORD.findall(text.lower()):
+            if word not in _STOPWORDS:
+                block[zlib.crc32(word.encode()) % HASH_BUCKETS] += 1
+    norm = np.linalg.norm(block)
+    return block / norm if norm else block
+
+
+def feature_vector(mood, goal, hobbies, projects):
+    mood_block = np.zeros(len(MOODS) + 1, dtype=np.float32)
+    mood_block[MOODS.index(mood) if mood in MOODS else len(MOODS)] = 1
+    vector = np.concatenate([
+        mood_block * BLOCK_WEIGHTS['mood'],
+        _bag_of_words([goal]) * BLOCK_WEIGHTS['goal'],
+        _bag_of_words(hobbies) * BLOCK_WEIGHTS['hobbies'],
+        _bag_of_words(projects) * BLOCK_WEIGHTS['projects'],
+    ])
+    return vector / np.linalg.norm(vector)
+
+
+class SuggestionIndex:
+    """
+    In-memory matrix of cached suggestion vectors. Each lookup checks the
+    table's row count and max id and loads only rows added since, or reloads
+    everything after deletions.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.matrix = np.empty((0, FEATURE_DIM), dtype=np.float32)
+        self.names = np.empty(0, dtype=object)
+        self.source_users = np.empty(0, dtype=np.int64)
+        self.last_id = 0
+
+    def refresh(self):
+        state = HobbySuggestion.objects.aggregate(count=Count('id'), last_id=Max('id'))
+        with self._lock:
+            if state['count'] == len(self.ids) and (state['last_id'] or 0) == self.last_id:
+                return
+            rows = list(
+                HobbySuggestion.objects.filter(id__gt=self.last_id).order_by('id')
+                .values_list('id', 'normalized_name', 'source_user_id', 'features')
+            )
+            if len(self.ids) + len(rows) != state['count']:
+                self._reset()
+                rows = list(
+                    HobbySuggestion.objects.order_by('id')
+                    .values_list('id', 'normalized_name', 'source_user_id', 'features')
+                )
+            if not rows:
+                return
+            ids, names, source_users, features = zip(*rows)
+            self.ids = np.concatenate([self.ids, np.array(ids, dtype=np.int64)])
+            self.matrix = np.vstack([
+                self.matrix,
+                np.stack([np.frombuffer(bytes(blob), dtype=np.float32) for blob in features]),
+            ])
+            self.names = np.concatenate([self.names, np.array(names, dtype=object)])
+            self.source_users = np.concatenate([
+                self.source_users, np.array([u or 0 for u in source_users], dtype=np.int64)
+            ])
+            self.last_id = self.ids[-1]
+
+    def similarities(self, vectors):
+        """Cosine similarity of each row of vectors against every cached suggestion."""
+        return np.atleast_2d(vectors) @ self.matrix.T
+
+    def nearest(self, vector, exclude_names=(), exclude_user=None):
+        """Returns (suggestion_id, similarity) of the best match, or (None, None) if empty."""
+        if not len(self.ids):
+            return None, None
+        sims = self.similarities(vector)[0]
+        if exclude_names:
+            sims[np.isin(self.names, list(exclude_names))] = -1.0
+        if exclude_user is not None:
+            sims[self.source_users == exclude_user] = -1.0
+        best = int(np.argmax(sims))
+        if sims[best] < 0:
+            return None, None
+        return int(self.ids[best]), float(sims[best])
+
+
+index = SuggestionIndex()
+
+
+def context_vector(goal, context):
+    return feature_vector(context['mood'], goal, context['hobbies'], context['projects'])
+
+
+def lookup(goal, context, user=None):
+    """
+    A cached suggestion close enough to this context, or None. Entries that
+    user generated are skipped, so asking again yields something new.
+    """
+    if not getattr(settings, 'HOBBY_CACHE_ENABLED', True):
+        return None
+    index.refresh()
+    exclude = {normalize_name(name) for name in context['hobbies']}
+    suggestion_id, similarity = index.nearest(
+        context_vector(goal, context), exclude, exclude_user=user.pk if user is not None else None
+    )
+    if suggestion_id is None:
+        return None
+    metrics.HOBBY_CACHE_SIMILARITY.observe(similarity)
+    if similarity < settings.HOBBY_CACHE_SIMILARITY_THRESHOLD:
+        return None
+    suggestion = HobbySuggestion.objects.filter(pk=suggestion_id).first()
+    if suggestion is None:
+        return None
+    return {
+        "hobby_name": suggestion.hobby_name,
+        "description": suggestion.description,
+        "getting_started": suggestion.getting_started,
+    }
+
+
+def mentions_user(user, suggestion):
+    """Whether the generated text names user; such suggestions are not shared."""
+    text = ' '.join(str(suggestion.get(field, '')) for field in ('hobby_name', 'description', 'getting_started'))
+    text = f' {normalize_name(text)} '
+    names = {normalize_name(user.first_name), normalize_name(user.username)} - {''}
+    return any(f' {name} ' in text for name in names)
+
+
+def store(user, goal, context, suggestion):
+    if not getattr(settings, 'HOBBY_CACHE_ENABLED', True) or mentions_user(user, suggestion):
+        return
+    entry = HobbySuggestion.objects.create(
+        source_user=user,
+        mood=context['mood'] if context['mood'] in MOODS else '',
+        goal=goal[:500],
+        hobby_name=suggestion["hobby_name"][:200],
+        normalized_name=normalize_name(suggestion["hobby_name"])[:200],
+        description=suggestion["description"],
+        getting_started=suggestion["getting_started"],
+        features=context_vector(goal, context).astype(np.float32).tobytes(),
+    )
+    if entry.pk % TRIM_EVERY == 0:
+        trim(settings.HOBBY_CACHE_MAX_ENTRIES)
+
+
+def trim(max_entries):
+    """Delete the oldest suggestions beyond max_entries."""
+    stale = list(
+        HobbySuggestion.objects.order_by('-created_at', '-id')
+        .values_list('id', flat=True)[max_entries:]
+    )
+    if stale:
+        HobbySuggestion.objects.filter(id__in=stale).delete()
+    return len(stale)
@@ -1,3 +1,890 @@
-from django.test import TestCase
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.admin.sites import site as admin_site
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connections
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from . import (
+    cohort_analytics, db_router, events, hashing, history, idempotency, ledger, llm_service, metrics, planning,
+    profiling, search, suggestion_cache, workout_library
+)
+from .data_transfer import NDJSONImporter, aiter_ndjson, iter_ndjson
+from .llm_parsing import LLMOutputError, parse_llm_json
+from .prompt_budget import PromptBudget, estimate_tokens
+from .models import (
+    ArchivedCheckIn, ArchivedObjective, CohortSnapshot, DailyCheckIn, HobbySuggestion, IdempotencyRecord,
+    LLMLedgerEntry, Objective, Project, RequestProfile, UserProfile, UserTrend, WeeklyPlan, WorkoutTemplate
+)
+from .write_coalescer import WriteCoalescer, WriteTimeout
+
+from .management.commands.bench_startup import WATCHED_MODULES, import_profile
+
+
+class StartupImportTests(SimpleTestCase):
+    """Loading the URLconf must not import the Gemini SDK or NumPy; preload() must."""
+
+    def test_urlconf_defers_llm_dependencies(self):
+        profile = import_profile('urls')
+        for module in WATCHED_MODULES:
+            self.assertNotIn(module, profile.modules)
+
+    def test_preload_imports_llm_dependencies(self):
+        profile = import_profile('preload')
+        for module in WATCHED_MODULES:
+            self.assertIn(module, profile.modules)
+
+
+class MetricsAuthTests(TestCase):
+
+    @override_settings(METRICS_AUTH_TOKEN='', DEBUG=False)
+    def test_denied_without_token_when_not_debug(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+    @override_settings(METRICS_AUTH_TOKEN='', DEBUG=True)
+    def test_open_without_token_in_debug(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    @override_settings(METRICS_AUTH_TOKEN='secret', DEBUG=False)
+    def test_bearer_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+
+
+class LedgerWriterTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('ledger', password='pw')
+        self.writer = ledger.LedgerWriter()
+
+    @override_settings(LLM_LEDGER_ASYNC=False, LLM_LEDGER_BATCH_SIZE=50)
+    def test_sync_mode_writes_each_entry_immediately(self):
+        self.writer.record(user_id=self.user.pk, endpoint='daily_plan', latency_ms=12)
+        self.assertEqual(LLMLedgerEntry.objects.count(), 1)
+
+    @override_settings(LLM_LEDGER_ASYNC=True, LLM_LEDGER_BATCH_SIZE=50)
+    def test_cache_hits_are_aggregated_per_user_and_endpoint(self):
+        with mock.patch.object(self.writer, '_ensure_thread'):
+            for _ in range(5):
+                self.writer.record_hit('daily_plan', self.user.pk)
+            self.writer.record_hit('workout_plan', self.user.pk)
+        self.assertEqual(LLMLedgerEntry.objects.count(), 0)
+
+        self.assertEqual(self.writer.flush(), 2)
+        calls = dict(LLMLedgerEntry.objects.filter(cache_hit=True).values_list('endpoint', 'calls'))
+        self.assertEqual(calls, {'daily_plan': 5, 'workout_plan': 1})
+
+
+class ReplicaRoutingTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('reader', password='pw')
+        self.router = db_router.PrimaryReplicaRouter()
+        self.addCleanup(cache.clear)
+
+    def test_reads_use_primary_without_a_replica(self):
+        with db_router.replica_reads(self.user):
+            self.assertEqual(self.router.db_for_read(User), 'default')
+
+    def test_replica_reads_until_the_user_writes(self):
+        with mock.patch.dict(connections.databases, {'replica': connections.databases['default']}):
+            with db_router.replica_reads(self.user):
+                self.assertEqual(self.router.db_for_read(User), 'replica')
+                self.assertEqual(self.router.db_for_write(User), 'default')
+            db_router.pin_to_primary(self.user)
+            with db_router.replica_reads(self.user):
+                self.assertEqual(self.router.db_for_read(User), 'default')
+        self.assertEqual(self.router.db_for_read(User), 'default')
+
+    def test_replica_requires_a_shared_cache(self):
+        env = {**os.environ, 'SQLITE_REPLICA_NAME': 'replica.sqlite3', 'REDIS_URL': ''}
+        result = subprocess.run(
+            [sys.executable, '-c', 'import django; django.setup()'],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn('REDIS_URL must be set', result.stderr)
+
+
+class WriteCoalescerTests(TransactionTestCase):
+
+    def test_timed_out_write_is_withdrawn(self):
+        coalescer = WriteCoalescer(enabled=True, timeout=0.05)
+        started, release = threading.Event(), threading.Event()
+        ran = []
+        blocker = threading.Thread(target=coalescer.submit, args=(lambda: started.set() or release.wait(5),))
+        blocker.start()
+        started.wait(5)
+
+        with self.assertRaises(WriteTimeout):
+            coalescer.submit(lambda: ran.append('late'))
+        release.set()
+        blocker.join()
+        self.assertEqual(coalescer.submit(lambda: 'next'), 'next')
+        self.assertEqual(ran, [])
+
+
+class ObjectiveUpdateTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('doer', password='pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.objective = Objective.objects.create(user=self.user, description='Run', date=timezone.now().date())
+
+    def test_queued_write_timeout_is_a_retryable_503(self):
+        with mock.patch('api.views.objective_writes.submit', side_effect=WriteTimeout):
+            response = self.client.patch(f'/api/objectives/{self.objective.pk}/', {'is_completed': True}, format='json')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        self.objective.refresh_from_db()
+        self.assertFalse(self.objective.is_completed)
+
+
+class ArchiveHistoryTests(TestCase):
+
+    def setUp(self):
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user('archivist', password='pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.today = timezone.now().date()
+        self.project = Project.objects.create(user=self.user, name='Marathon', start_date=self.today)
+        for age in range(10):
+            Objective.objects.create(
+                user=self.user, project=self.project, description=f'Run {age}',
+                date=self.today - timedelta(days=age),
+            )
+
+    def archive(self, days):
+        call_command('archive_history', days=days, stdout=open(os.devnull, 'w'))
+
+    def test_short_horizon_run_keeps_archived_rows_readable(self):
+        self.archive(3)
+        self.assertEqual(ArchivedObjective.objects.count(), 6)
+
+        start = (self.today - timedelta(days=9)).isoformat()
+        history = self.client.get('/api/history/', {'start': start}).json()
+        self.assertEqual(len(history['objectives']), 10)
+        stats = self.client.get('/api/stats/', {'start': start}).json()
+        self.assertEqual(stats['total_objectives'], 10)
+
+    def test_watermark_is_cached_until_an_archive_run(self):
+        old_day = self.today - timedelta(days=9)
+        with self.assertNumQueries(1):
+            self.assertFalse(history.touches_archive(old_day))
+            self.assertFalse(history.touches_archive(old_day))
+
+        self.archive(3)
+        with self.assertNumQueries(1):
+            self.assertTrue(history.touches_archive(old_day))
+            self.assertFalse(history.touches_archive(self.today))
+
+    def test_archived_and_hot_rows_share_a_shape(self):
+        DailyCheckIn.objects.create(user=self.user, date=self.today - timedelta(days=5), mood='Tired')
+        DailyCheckIn.objects.create(user=self.user, date=self.today, mood='Focused')
+        self.archive(3)
+
+        start = (self.today - timedelta(days=9)).isoformat()
+        history = self.client.get('/api/history/', {'start': start}).json()
+        oldest, newest = history['objectives'][0], history['objectives'][-1]
+        self.assertEqual(set(oldest), set(newest))
+        self.assertEqual(oldest['project_name'], 'Marathon')
+        self.assertEqual(set(history['checkins'][0]), set(history['checkins'][1]))
+
+    def test_reposted_checkin_replaces_the_archived_one(self):
+        day = self.today - timedelta(days=5)
+        DailyCheckIn.objects.create(user=self.user, date=day, mood='Tired', notes='first')
+        self.archive(3)
+        DailyCheckIn.objects.create(user=self.user, date=day, mood='Focused', notes='second')
+        self.archive(3)
+
+        self.assertFalse(DailyCheckIn.objects.filter(date=day).exists())
+        archived = ArchivedCheckIn.objects.get(user=self.user, date=day)
+        self.assertEqual((archived.mood, archived.notes), ('Focused', 'second'))
+
+
+class DataTransferTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('mover', password='pw')
+        self.today = timezone.now().date()
+        for age in range(3):
+            Objective.objects.create(user=self.user, description=f'Task {age}', date=self.today - timedelta(days=age))
+        DailyCheckIn.objects.create(user=self.user, date=self.today, mood='Focused')
+
+    def test_async_export_matches_sync_export(self):
+        async def collect():
+            return [chunk async for chunk in aiter_ndjson(self.user)]
+
+        self.assertEqual(''.join(async_to_sync(collect)()), ''.join(iter_ndjson(self.user)))
+
+    def test_export_streams_asynchronously_under_asgi(self):
+        token = Token.objects.create(user=self.user)
+        client = AsyncClient()
+        response = async_to_sync(client.get)('/api/export/', headers={'Authorization': f'Token {token.key}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+
+    def test_import_counts_inserted_rows_and_respects_archive(self):
+        archived_day = self.today - timedelta(days=400)
+        ArchivedCheckIn.objects.create(id=10_000, user=self.user, date=archived_day, mood='Tired')
+        lines = [
+            json.dumps({'type': 'checkin', 'date': str(archived_day), 'mood': 'Relaxed', 'notes': 'restored'}),
+            json.dumps({'type': 'checkin', 'date': str(self.today), 'mood': 'Tired'}),
+            json.dumps({'type': 'checkin', 'date': str(self.today - timedelta(days=1)), 'mood': 'Tired'}),
+            json.dumps({'type': 'checkin', 'date': str(self.today - timedelta(days=1)), 'mood': 'Energetic'}),
+        ]
+        result = NDJSONImporter(self.user).run(lines)
+
+        self.assertEqual(result['imported']['checkin'], 1)
+        self.assertEqual(result['updated']['checkin'], 2)
+        self.assertFalse(DailyCheckIn.objects.filter(date=archived_day).exists())
+        archived = ArchivedCheckIn.objects.get(user=self.user, date=archived_day)
+        self.assertEqual((archived.mood, archived.notes), ('Relaxed', 'restored'))
+        self.assertEqual(DailyCheckIn.objects.get(date=self.today - timedelta(days=1)).mood, 'Energetic')
+
+    def test_import_reports_badly_typed_fields_per_line(self):
+        lines = [
+            json.dumps({'type': 'objective', 'description': 'Ok', 'date': str(self.today)}),
+            json.dumps({'type': 'objective', 'description': 'Bad flag', 'date': str(self.today), 'is_completed': 'maybe'}),
+            json.dumps({'type': 'objective', 'description': 'Bad date', 'date': '2024-13-45'}),
+            json.dumps({'type': 'checkin', 'date': str(self.today), 'mood': 'Sleepy'}),
+            json.dumps(['not', 'a', 'record']),
+        ]
+        result = NDJSONImporter(self.user).run(lines)
+
+        self.assertEqual(result['imported']['objective'], 1)
+        self.assertEqual([error['line'] for error in result['errors']], [2, 3, 4, 5])
+        self.assertIn('is_completed', result['errors'][0]['error'])
+        self.assertIn('date', result['errors'][1]['error'])
+        self.assertIn('mood', result['errors'][2]['error'])
+        self.assertFalse(Objective.objects.filter(description__startswith='Bad').exists())
+
+
+class SearchTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('searcher', password='pw')
+        self.today = timezone.now().date()
+        for number in range(3):
+            Objective.objects.create(user=self.user, description=f'Stretch hamstrings {number}', date=self.today)
+
+    def test_unqualified_terms_ignore_the_owner_column(self):
+        total, _ = search.search(f'u{self.user.pk}')
+        self.assertEqual(total, 0)
+        total, _ = search.search('hamstrings', user=self.user)
+        self.assertEqual(total, 3)
+
+    def test_saves_without_indexed_fields_skip_reindexing(self):
+        objective = Objective.objects.first()
+        with mock.patch.object(search, 'index_instances') as index_instances:
+            objective.is_completed = True
+            objective.save(update_fields=['is_completed'])
+            index_instances.assert_not_called()
+            objective.description = 'Stretch calves'
+            objective.save(update_fields=['description'])
+            index_instances.assert_called_once()
+
+    def test_admin_search_is_not_capped_by_the_ranking_limit(self):
+        model_admin = admin_site._registry[Objective]
+        request = RequestFactory().get('/admin/api/objective/', {'q': 'hamstrings'})
+        with mock.patch.object(model_admin, 'search_limit', 1):
+            matches, _ = model_admin.get_search_results(request, Objective.objects.all(), 'hamstrings')
+        self.assertEqual(matches.count(), 3)
+
+
+class EventTicketTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('listener', password='pw')
+        self.token = Token.objects.create(user=self.user)
+
+    def stream(self, **params):
+        return async_to_sync(AsyncClient().get)('/api/events/', params)
+
+    def test_ticket_opens_the_stream(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        ticket = client.post('/api/events/ticket/').json()['ticket']
+        response = self.stream(ticket=ticket)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+    def test_api_token_in_the_url_is_refused(self):
+        self.assertEqual(self.stream(token=self.token.key).status_code, 401)
+
+    def test_expired_or_forged_tickets_are_refused(self):
+        ticket = events.issue_ticket(self.user)
+        self.assertEqual(events.ticket_user_id(ticket), self.user.pk)
+        self.assertIsNone(events.ticket_user_id(ticket + 'x'))
+        with override_settings(EVENTS_TICKET_MAX_AGE=-1):
+            self.assertIsNone(events.ticket_user_id(ticket))
+
+
+class IdempotencyTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('retrier', password='pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def checkin(self, key, mood='Focused'):
+        return self.client.post(
+            '/api/daily-checkin/', {'mood': mood}, format='json', HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_retry_replays_the_stored_response(self):
+        first = self.checkin('abc')
+        with mock.patch('api.views.DailyCheckIn.objects.update_or_create') as update_or_create:
+            second = self.checkin('abc')
+            update_or_create.assert_not_called()
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(self.checkin('abc', mood='Tired').status_code, 422)
+
+    def test_keys_are_not_shared_between_users(self):
+        self.checkin('shared')
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user('other', password='pw'))
+        response = other.post('/api/daily-checkin/', {'mood': 'Tired'}, format='json', HTTP_IDEMPOTENCY_KEY='shared')
+        self.assertFalse(response.has_header('Idempotent-Replayed'))
+        self.assertEqual(response.json()['mood'], 'Tired')
+
+    def test_login_is_never_replayed(self):
+        credentials = {'username': 'retrier', 'password': 'pw'}
+        APIClient().post('/api/login/', credentials, format='json', HTTP_IDEMPOTENCY_KEY='login')
+        response = APIClient().post('/api/login/', credentials, format='json', HTTP_IDEMPOTENCY_KEY='login')
+        self.assertFalse(response.has_header('Idempotent-Replayed'))
+        self.assertFalse(IdempotencyRecord.objects.exists())
+
+    def test_retried_onboarding_replays_the_created_account(self):
+        body = {'username': 'newcomer', 'email': 'new@example.com', 'password': 'long-enough-pw', 'goal': 'Settle in'}
+
+        def onboard(data):
+            return APIClient().post('/api/onboarding/', data, format='json', HTTP_IDEMPOTENCY_KEY='signup')
+
+        first = onboard(body)
+        self.assertEqual(first.status_code, 201)
+        retry = onboard(body)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.json(), first.json())
+        # The same key with someone else's details is not their response to replay.
+        other = onboard({**body, 'password': 'another-password'})
+        self.assertEqual(other.status_code, 400)
+        self.assertFalse(other.has_header('Idempotent-Replayed'))
+
+    def test_large_bodies_are_fingerprinted_in_full(self):
+        line = json.dumps({'type': 'hobby', 'name': 'Chess', 'frequency': 'Weekly'}) + '\n'
+        other = line.replace('Chess', 'Darts')
+
+        def upload(body):
+            return self.client.post(
+                '/api/import/', body, content_type='application/x-ndjson', HTTP_IDEMPOTENCY_KEY='bulk'
+            )
+
+        with mock.patch.object(idempotency, 'MAX_FINGERPRINT_BODY', 64):
+            self.assertEqual(upload(line * 4).status_code, 201)
+            self.assertEqual(upload(other * 4).status_code, 422)
+        self.assertEqual(self.user.hobbies.count(), 4)
+
+
+@override_settings(HOBBY_CACHE_ENABLED=True, HOBBY_CACHE_SIMILARITY_THRESHOLD=0.9)
+class SuggestionCacheTests(TestCase):
+
+    def setUp(self):
+        suggestion_cache.index._reset()
+        self.addCleanup(suggestion_cache.index._reset)
+        self.context = {'mood': 'Focused', 'hobbies': ['Running'], 'projects': ['Launch site']}
+        self.suggestion = {
+            'hobby_name': 'Bouldering', 'description': 'Climb short walls.', 'getting_started': 'Book a session.',
+        }
+
+    def test_similar_users_share_suggestions_but_not_their_own(self):
+        author = User.objects.create_user('author')
+        suggestion_cache.store(author, 'Get fit', self.context, self.suggestion)
+
+        self.assertIsNone(suggestion_cache.lookup('Get fit', self.context, author))
+        neighbour = User.objects.create_user('neighbour')
+        self.assertEqual(suggestion_cache.lookup('Get fit', self.context, neighbour), self.suggestion)
+
+    def test_suggestions_that_name_their_user_are_not_shared(self):
+        author = User.objects.create_user('jdoe', first_name='Jane')
+        personal = {**self.suggestion, 'description': 'Jane, you will love the problem solving.'}
+        suggestion_cache.store(author, 'Get fit', self.context, personal)
+        self.assertFalse(HobbySuggestion.objects.exists())
+
+    def test_prompt_does_not_name_the_user(self):
+        author = User.objects.create_user('jdoe', first_name='Jane')
+        profile = UserProfile.objects.create(user=author, goal='Get fit')
+        prompt = llm_service.build_hobby_suggestion_prompt(author, profile, self.context)
+        self.assertNotIn('Jane', prompt)
+        self.assertNotIn('jdoe', prompt)
+
+
+@override_settings(WORKOUT_LIBRARY_BACKGROUND_REFRESH=True, WORKOUT_LIBRARY_REFRESH_INTERVAL_SECONDS=600)
+class WorkoutLibraryTests(TestCase):
+
+    def test_refresh_is_requested_once_per_interval(self):
+        refresher = workout_library.LibraryRefresher()
+        cell = ('Focused', 'healthy', 'strength')
+        with mock.patch.object(refresher, '_run'):
+            refresher.request(cell)
+            refresher._pending.clear()
+            refresher.request(cell)
+            self.assertEqual(refresher._queue.qsize(), 1)
+            with override_settings(WORKOUT_LIBRARY_REFRESH_INTERVAL_SECONDS=0):
+                refresher.request(cell)
+            self.assertEqual(refresher._queue.qsize(), 2)
+
+    @override_settings(WORKOUT_LIBRARY_VARIANTS=2)
+    def test_build_keeps_every_requested_variant(self):
+        cell = ('Focused', 'healthy', 'strength')
+        plan = {'encouragement': 'Go.', 'exercises': []}
+        self.addCleanup(workout_library.library.invalidate)
+        with mock.patch('api.management.commands.build_workout_library.all_cells', return_value=[cell]), \
+                mock.patch('api.management.commands.build_workout_library.generate_workout_template',
+                           return_value=plan) as generate:
+            call_command('build_workout_library', variants=4, workers=1, stdout=open(os.devnull, 'w'))
+        self.assertEqual(generate.call_count, 4)
+        self.assertEqual(WorkoutTemplate.objects.filter(mood='Focused').count(), 4)
+
+    def test_fallback_plan_is_personalised(self):
+        user = User.objects.create_user('lifter', first_name='Sam')
+        profile = UserProfile.objects.create(user=user, goal='Build strength')
+        workout_library.library.invalidate()
+        self.addCleanup(workout_library.library.invalidate)
+        with mock.patch.object(workout_library, 'generate_workout_template', return_value=None):
+            plan = workout_library.workout_plan_for(user, profile)
+        self.assertTrue(plan['encouragement'].startswith('Sam, '))
+
+
+class BenchLoadTests(TransactionTestCase):
+
+    def setUp(self):
+        user = User.objects.create_user('synth-1', password='momentum-synthetic')
+        UserProfile.objects.create(user=user, goal='Benchmark the API')
+        Token.objects.create(user=user)
+
+    def bench(self, routes, **options):
+        output = tempfile.TemporaryDirectory()
+        self.addCleanup(output.cleanup)
+        path = self.last_output = os.path.join(output.name, 'bench.json')
+        options = {'requests': 2, 'concurrency': 1, **options}
+        call_command('bench_load', routes=routes, output=path, stdout=open(os.devnull, 'w'), **options)
+        with open(path) as fh:
+            return {row['route']: row for row in json.load(fh)['routes']}
+
+    def test_selected_routes_run_without_scenarios_for_the_rest(self):
+        from .management.commands import bench_load
+
+        with mock.patch.dict(bench_load.SCENARIOS):
+            del bench_load.SCENARIOS['hobby_list']
+            self.assertEqual(self.bench('profile')['profile']['errors'], 0)
+            with self.assertRaisesMessage(CommandError, 'No benchmark scenario for routes: hobby_list'):
+                self.bench('hobby_list')
+
+    def test_runs_without_samples_are_reported_not_crashed(self):
+        self.bench('profile', requests=0)
+        result = self.bench('profile', requests=0, compare=self.last_output)['profile']
+        self.assertEqual(result['requests'], 0)
+        self.assertIsNone(result['p95_ms'])
+        self.assertIsNone(result['queries_per_request'])
+
+    def test_staff_routes_run_as_the_bench_admin(self):
+        CohortSnapshot.objects.create(window_end=timezone.now().date())
+        results = self.bench('cohort_analytics,bulk_users')
+        self.assertEqual(results['cohort_analytics']['errors'], 0)
+        self.assertEqual(results['bulk_users']['errors'], 0)
+        self.assertTrue(User.objects.get(username='bench-admin').is_staff)
+
+
+class BulkProvisioningTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('admin', is_staff=True))
+
+    def upload(self, body):
+        return self.client.post('/api/users/bulk/', body, content_type='text/csv')
+
+    def test_csv_creates_users_profiles_and_tokens_in_process(self):
+        body = (
+            'username,email,goal,password\n'
+            'ada,ada@example.com,Write programs,\n'
+            'grace,grace@example.com,Ship compilers,s3cret-pass\n'
+        )
+        with mock.patch.object(hashing, 'ProcessPoolExecutor') as pool:
+            response = self.upload(body)
+        pool.assert_not_called()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 2)
+        ada = User.objects.get(username='ada')
+        self.assertFalse(ada.has_usable_password())
+        self.assertEqual(ada.profile.goal, 'Write programs')
+        self.assertTrue(Token.objects.filter(user=ada).exists())
+        self.assertTrue(User.objects.get(username='grace').check_password('s3cret-pass'))
+
+    def test_duplicates_are_reported_per_line(self):
+        User.objects.create_user('taken')
+        body = (
+            'username,email\n'
+            'taken,taken@example.com\n'
+            'fresh,fresh@example.com\n'
+            'fresh,again@example.com\n'
+        )
+        response = self.upload(body)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 1)
+        self.assertEqual([error['line'] for error in response.json()['errors']], [4, 2])
+
+    def test_requires_staff(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('member'))
+        response = client.post('/api/users/bulk/', 'username,email\n', content_type='text/csv')
+        self.assertEqual(response.status_code, 403)
+
+
+class KeysetPaginationTests(TestCase):
+
+    def setUp(self):
+        admin = User.objects.create_superuser('root', 'root@example.com', 'pw')
+        self.client.force_login(admin)
+        today = timezone.now().date()
+        for i in range(7):
+            Objective.objects.create(
+                user=admin, description=f'Task {i}',
+                date=today - timedelta(days=i // 3),
+            )
+        model_admin = admin_site._registry[Objective]
+        patcher = mock.patch.object(model_admin, 'list_per_page', 3)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def changelist(self, **params):
+        return self.client.get('/admin/api/objective/', params)
+
+    def test_cursor_pages_cover_every_row_once(self):
+        expected = list(Objective.objects.order_by('-date', '-id').values_list('pk', flat=True))
+        seen, params = [], {}
+        while True:
+            cl = self.changelist(**params).context['cl']
+            self.assertTrue(cl.keyset)
+            seen += [obj.pk for obj in cl.result_list]
+            if cl.next_cursor is None:
+                break
+            params = {'after': cl.next_cursor}
+        self.assertEqual(seen, expected)
+
+    def test_numbered_pages_and_bad_cursors(self):
+        self.assertFalse(self.changelist(p='2').context['cl'].keyset)
+        response = self.changelist(after='not-a-date,1')
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('e=1', response['Location'])
+
+    @override_settings(ADMIN_COUNT_LIMIT=4)
+    def test_filtered_counts_are_capped(self):
+        cl = self.changelist(is_completed__exact='0').context['cl']
+        self.assertEqual(cl.result_count, 4)
+        self.assertTrue(cl.paginator.estimated)
+
+
+@override_settings(PROFILING_SAMPLE_RATE=0.0, PROFILING_RING_SIZE=200)
+class ProfilingTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('profiled', password='pw')
+        UserProfile.objects.create(user=self.user, goal='Go faster')
+        self.auth = f'Token {Token.objects.create(user=self.user).key}'
+
+    def get(self, **headers):
+        return self.client.get('/api/profile/', HTTP_AUTHORIZATION=self.auth, **headers)
+
+    def test_unsampled_requests_are_not_profiled(self):
+        response = self.get(HTTP_X_MOMENTUM_PROFILE='1')
+        self.assertFalse(response.has_header('X-Momentum-Profile-Id'))
+        self.assertFalse(RequestProfile.objects.exists())
+
+    def test_staff_header_profiles_the_request(self):
+        self.user.is_staff = True
+        self.user.save(update_fields=['is_staff'])
+        response = self.get(HTTP_X_MOMENTUM_PROFILE='1')
+        profile = RequestProfile.objects.get(pk=response['X-Momentum-Profile-Id'])
+        self.assertEqual((profile.trigger, profile.user, profile.status_code), ('header', self.user, 200))
+        self.assertEqual(profile.route, '/api/profile/')
+        self.assertEqual(profile.query_count, len(profile.sql_trace))
+        self.assertGreater(profile.query_count, 0)
+        self.assertIn('cumulative', profile.profile_stats)
+
+    @override_settings(PROFILING_SAMPLE_RATE=1.0, PROFILING_RING_SIZE=2)
+    def test_sampled_profiles_are_kept_in_a_ring(self):
+        ids = [int(self.get()['X-Momentum-Profile-Id']) for _ in range(3)]
+        self.assertEqual(sorted(RequestProfile.objects.values_list('pk', flat=True)), ids[1:])
+        self.assertEqual(RequestProfile.objects.get(pk=ids[-1]).trigger, 'sampled')
+
+    @override_settings(PROFILING_SAMPLE_RATE=1.0)
+    def test_concurrent_profiles_keep_sql_without_cprofile(self):
+        with profiling._profiler_lock:
+            response = self.get()
+        profile = RequestProfile.objects.get(pk=response['X-Momentum-Profile-Id'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(profile.profile_stats, '')
+        self.assertGreater(profile.query_count, 0)
+        self.assertFalse(profiling._profiler_lock.locked())
+
+
+class LLMParsingTests(SimpleTestCase):
+
+    def test_fenced_output_with_a_trailing_comma(self):
+        text = '```json\n["Write the report", "Call the client",]\n```'
+        self.assertEqual(
+            parse_llm_json(text, llm_service.DAILY_PLAN_SCHEMA), (['Write the report', 'Call the client'], True)
+        )
+
+    def test_truncated_string_drops_the_unfinished_item(self):
+        text = '["Write the report", "Call the cli'
+        self.assertEqual(parse_llm_json(text, llm_service.DAILY_PLAN_SCHEMA), (['Write the report'], True))
+
+        text = (
+            '{"workout_type": "Walk", "duration_minutes": 20, "encouragement": "Go!", "exercises": ['
+            '{"name": "Warm up", "duration": "5 min"}, {"name": "Brisk walk", "duration": "15 min", "notes": "Keep a stea'
+        )
+        plan, repaired = parse_llm_json(text, llm_service.WORKOUT_PLAN_SCHEMA)
+        self.assertTrue(repaired)
+        self.assertEqual(plan['exercises'], [{'name': 'Warm up', 'duration': '5 min'}])
+
+    def test_output_that_fails_the_schema_is_rejected(self):
+        with self.assertRaisesMessage(LLMOutputError, "missing 'description'"):
+            parse_llm_json('{"hobby_name": "Chess"}', llm_service.HOBBY_SUGGESTION_SCHEMA)
+        # Truncated inside the only value: nothing complete is left to keep.
+        with self.assertRaises(LLMOutputError):
+            parse_llm_json('["Write the rep', llm_service.DAILY_PLAN_SCHEMA)
+
+    def test_unrepairable_output_is_retried_with_the_repair_prompt(self):
+        call = mock.Mock(endpoint='hobby_suggestion')
+        call.generate.side_effect = [
+            '{"hobby_name": "Chess"}',
+            '{"hobby_name": "Chess", "description": "Strategy.", "getting_started": "Learn the moves."}',
+        ]
+        with self.assertLogs('api.llm_service', 'WARNING'):
+            value = llm_service.generate_structured(call, 'prompt', llm_service.HOBBY_SUGGESTION_SCHEMA)
+        self.assertEqual(value['getting_started'], 'Learn the moves.')
+        retry_prompt = call.generate.call_args.args[0]
+        self.assertEqual(
+            retry_prompt, llm_service.JSON_REPAIR_PROMPT.format(output='{"hobby_name": "Chess"}')
+        )
+        self.assertEqual(call.generate.call_args.kwargs['max_output_tokens'], llm_service.JSON_REPAIR_MAX_TOKENS)
+
+
+class MetricsRegistryTests(SimpleTestCase):
+
+    def setUp(self):
+        self.registry = metrics.Registry()
+        patcher = mock.patch.object(metrics, 'registry', self.registry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.calls = metrics.Counter('test_calls_total', 'Calls.', ['endpoint'])
+        self.latency = metrics.Histogram('test_latency_seconds', 'Latency.', ['route'], buckets=(0.1, 1))
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def test_histograms_render_cumulative_buckets(self):
+        for value in (0.05, 0.5, 0.7, 5):
+            self.latency.observe(value, route='/api/x/')
+        lines = self.registry.render().splitlines()
+        for line in (
+            'test_latency_seconds_bucket{route="/api/x/",le="0.1"} 1',
+            'test_latency_seconds_bucket{route="/api/x/",le="1"} 3',
+            'test_latency_seconds_bucket{route="/api/x/",le="+Inf"} 4',
+            'test_latency_seconds_sum{route="/api/x/"} 6.25',
+            'test_latency_seconds_count{route="/api/x/"} 4',
+        ):
+            self.assertIn(line, lines)
+
+    def worker_file(self, pid, calls):
+        snapshot = {'test_calls_total': {json.dumps(['plan']): calls}}
+        with open(os.path.join(self.directory, f'metrics_{pid}_abc123.json'), 'w') as fh:
+            json.dump(snapshot, fh)
+
+    def test_exited_workers_are_folded_into_a_persistent_total(self):
+        exited = subprocess.Popen([sys.executable, '-c', 'pass'])
+        exited.wait()
+        self.worker_file(exited.pid, 5)
+        self.worker_file(os.getppid(), 2)
+        self.calls.inc(endpoint='plan')
+
+        with override_settings(METRICS_MULTIPROC_DIR=self.directory):
+            for _ in range(2):
+                self.assertIn('test_calls_total{endpoint="plan"} 8', self.registry.render())
+            self.registry.maybe_flush(force=True)
+        files = sorted(os.listdir(self.directory))
+        self.assertIn('metrics_dead.json', files)
+        self.assertNotIn(f'metrics_{exited.pid}_abc123.json', files)
+        self.assertIn(f'metrics_{os.getpid()}_{self.registry._instance}.json', files)
+
+
+class PromptBudgetTests(SimpleTestCase):
+    TEMPLATE = 'Hobbies: {hobbies}\nProjects: {projects}\nNotes: {notes}'
+
+    def budget(self, max_tokens, hobby_min=0):
+        budget = PromptBudget(max_tokens)
+        budget.add_items('hobbies', [f'Hobby number {i}' for i in range(10)], priority=1, min_items=hobby_min)
+        budget.add_items('projects', [f'Project number {i}' for i in range(10)], priority=2)
+        budget.add_text('notes', 'Plenty of detail here. ' * 20, priority=3, max_chars=400, min_chars=40)
+        return budget
+
+    def test_generous_budget_leaves_the_prompt_untouched(self):
+        budget = self.budget(10000)
+        prompt = budget.render(self.TEMPLATE)
+        self.assertIn('Hobby number 9', prompt)
+        self.assertEqual(budget.report['dropped_items'], {})
+        self.assertLessEqual(budget.report['post_tokens'], budget.report['pre_tokens'])
+
+    def test_lowest_priority_sections_are_trimmed_first(self):
+        budget = self.budget(80)
+        prompt = budget.render(self.TEMPLATE)
+        self.assertLessEqual(estimate_tokens(prompt), 80)
+        self.assertEqual(budget.report['post_tokens'], estimate_tokens(prompt))
+        # Notes go down to min_chars, then projects lose items; hobbies are untouched.
+        self.assertTrue(prompt.endswith('Notes: Plenty of detail here. …'))
+        self.assertIn('Project number 4 (+5 more)', prompt)
+        self.assertIn('Hobby number 9', prompt)
+        self.assertEqual(budget.report['dropped_items'], {'projects': 5})
+
+    def test_min_items_are_kept_when_the_budget_cannot_be_met(self):
+        budget = self.budget(10, hobby_min=3)
+        prompt = budget.render(self.TEMPLATE)
+        self.assertIn('Hobbies: Hobby number 0, Hobby number 1, Hobby number 2 (+7 more)', prompt)
+        self.assertIn('Projects: None', prompt)
+        self.assertEqual(budget.report['dropped_items'], {'hobbies': 7, 'projects': 10})
+        self.assertGreater(budget.report['post_tokens'], budget.report['budget_tokens'])
+
+
+@override_settings(LLM_LEDGER_ASYNC=False)
+class WeeklyPlanningTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('planner')
+        self.profile = UserProfile.objects.create(user=self.user, goal='Ship the book', planning_mode='weekly')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.today = timezone.now().date()
+        self.days = [[f'Day {i} task A', f'Day {i} task B', f'Day {i} task C'] for i in range(7)]
+
+    def test_week_is_drafted_once_and_served_from_the_plan(self):
+        with mock.patch.object(planning, 'generate_weekly_plan', return_value=self.days) as generate:
+            first = self.client.get('/api/weekly-plan/').json()
+            second = self.client.get('/api/weekly-plan/').json()
+            today = self.client.get('/api/daily-plan/').json()
+        generate.assert_called_once()
+        self.assertEqual(first, second)
+        self.assertEqual(first['days'][0], {'date': self.today.isoformat(), 'objectives': self.days[0]})
+        self.assertEqual([o['description'] for o in today['objectives']], self.days[0])
+
+    def test_later_days_are_adjusted_without_an_llm_call(self):
+        yesterday = self.today - timedelta(days=1)
+        WeeklyPlan.objects.create(user=self.user, week_start=yesterday, days=self.days)
+        for description, done in [('Outline chapter', False), ('Edit intro', True), ('Email editor', True)]:
+            Objective.objects.create(user=self.user, description=description, date=yesterday, is_completed=done)
+        DailyCheckIn.objects.create(user=self.user, date=yesterday, mood='Tired')
+
+        with mock.patch.object(planning, 'generate_weekly_plan') as generate:
+            objectives = planning.objectives_for_day(self.user, self.profile, self.today)
+        generate.assert_not_called()
+        self.assertEqual(objectives, ['Take one small first step on: Outline chapter', 'Day 1 task A', 'Day 1 task B'])
+
+    def test_adjust_day(self):
+        planned = ['Draft slides', 'Review PR', 'Plan sprint', 'Write tests', 'Update docs']
+        # A good day carries at most two unfinished objectives ahead of the draft.
+        self.assertEqual(
+            planning.adjust_day(
+                planned, [('Fix bug', False), ('draft slides', False), ('Deploy', True), ('Call Sam', True)], 'Focused'
+            ),
+            ['Fix bug', 'draft slides', 'Review PR', 'Plan sprint', 'Write tests'],
+        )
+        # Mostly missed: a light day, still keeping one drafted objective.
+        self.assertEqual(
+            planning.adjust_day(planned, [('A', False), ('B', False), ('C', True), ('D', False)], None),
+            ['A', 'B', 'Draft slides'],
+        )
+        self.assertEqual(planning.adjust_day(planned, [], None), planned)
+
+
+class CohortAnalyticsTests(TestCase):
+
+    def setUp(self):
+        self.today = timezone.now().date()
+        self.steady = User.objects.create_user('steady')
+        self.stalled = User.objects.create_user('stalled')
+
+    def day(self, age):
+        return self.today - timedelta(days=age)
+
+    def objective(self, user, age, done, model=Objective, **extra):
+        return model.objects.create(user=user, description='Task', date=self.day(age), is_completed=done, **extra)
+
+    def test_completion_rates_streaks_and_mood_matrix(self):
+        # Two older days live in the archive and count the same as hot rows.
+        self.objective(self.steady, 5, True, ArchivedObjective, id=10_001)
+        self.objective(self.steady, 4, False, ArchivedObjective, id=10_002)
+        for age, done in [(2, True), (1, True), (1, False), (0, True)]:
+            self.objective(self.steady, age, done)
+        self.objective(self.stalled, 1, False)
+        for user, age, mood in [(self.steady, 2, 'Focused'), (self.steady, 1, 'Tired'), (self.stalled, 2, 'Focused')]:
+            DailyCheckIn.objects.create(user=user, date=self.day(age), mood=mood)
+
+        snapshot = cohort_analytics.compute(end=self.today)
+
+        self.assertEqual((snapshot.users, snapshot.objectives, snapshot.checkins), (2, 7, 3))
+        steady = UserTrend.objects.get(user=self.steady)
+        self.assertEqual((steady.active_days, steady.objectives), (5, 6))
+        self.assertEqual(steady.completion_rate_7d, 0.6667)
+        self.assertEqual((steady.longest_streak, steady.current_streak), (3, 3))
+        stalled = UserTrend.objects.get(user=self.stalled)
+        self.assertEqual((stalled.completion_rate_7d, stalled.longest_streak, stalled.current_streak), (0.0, 0, 0))
+
+        results = snapshot.results
+        focused, tired = results['moods'].index('Focused'), results['moods'].index('Tired')
+        # Next-day buckets are 0%, 1-49%, 50-99% and 100%.
+        self.assertEqual(results['next_day_completion'][focused], [1, 0, 1, 0])
+        self.assertEqual(results['next_day_completion'][tired], [0, 0, 0, 1])
+        self.assertEqual(results['next_day_completion_rate'][focused], 0.25)
+        self.assertEqual(results['mood_transitions'][focused][tired], 1)
+
+    def test_rows_archived_mid_run_are_counted_once(self):
+        self.addCleanup(cache.clear)
+        for age in range(10):
+            self.objective(self.steady, age, True)
+        load_columns = cohort_analytics.load_columns
+
+        def archive_between(querysets, fields, chunk_size):
+            def tables():
+                querysets_iter = iter(querysets)
+                yield next(querysets_iter)
+                call_command('archive_history', days=3, stdout=open(os.devnull, 'w'))
+                yield from querysets_iter
+            return load_columns(tables(), fields, chunk_size)
+
+        with mock.patch.object(cohort_analytics, 'load_columns', side_effect=archive_between):
+            snapshot = cohort_analytics.compute(end=self.today)
+        self.assertEqual(ArchivedObjective.objects.count(), 6)
+        self.assertEqual(snapshot.objectives, 10)
+        self.assertEqual(UserTrend.objects.get(user=self.steady).longest_streak, 10)
@@ -7,12 +7,22 @@ urlpatterns = [
     path('profile/', views.user_profile_view, name='profile'),
     path('profile/update/', views.update_profile_view, name='update_profile'),
     path('daily-plan/', views.daily_plan_view, name='daily_plan'),
+    path('weekly-plan/', views.weekly_plan_view, name='weekly_plan'),
     path('objectives/', views.objectives_list_view, name='objectives_list'),
     path('objectives/<int:pk>/', views.objective_update_view, name='objective_update'),
+    path('history/', views.history_view, name='history'),
+    path('stats/', views.stats_view, name='stats'),
+    path('analytics/cohort/', views.cohort_analytics_view, name='cohort_analytics'),
     path('daily-checkin/', views.daily_checkin_view, name='daily_checkin'),
     path('tips/random/', views.random_tip_view, name='random_tip'),
     path('suggestions/hobby/', views.hobby_suggestion_view, name='hobby_suggestion'),
     path('suggestions/workout/', views.workout_plan_view, name='workout_plan'),
+    path('search/', views.search_view, name='search'),
+    path('export/', views.export_view, name='export'),
+    path('import/', views.import_view, name='import'),
+    path('users/bulk/', views.bulk_users_view, name='bulk_users'),
+    path('events/', views.events_view, name='events'),
+    path('events/ticket/', views.events_ticket_view, name='events_ticket'),
     path('projects/', views.ProjectListCreateView.as_view(), name='project_list'),
     path('projects/<int:pk>/', views.ProjectDetailView.as_view(), name='project_detail'),
     path('hobbies/', views.HobbyListCreateView.as_view(), name='hobby_list'),
@@ -2,21 +2,47 @@ from datetime import datetime, timedelta
 from rest_framework import status, generics
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAdminUser, IsAuthenticated, AllowAny
 from rest_framework.authtoken.models import Token
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db import transaction
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.utils import timezone
-from .models import UserProfile, Project, Objective, DailyCheckIn, Tip, Hobby
+from django.views.decorators.http import require_GET
+from .models import (
+    UserProfile, Project, Objective, DailyCheckIn, Tip, Hobby,
+    ArchivedObjective, ArchivedCheckIn, CohortSnapshot, UserTrend
+)
 from .serializers import (
     UserSerializer, UserProfileSerializer, ProjectSerializer,
     ObjectiveSerializer, DailyCheckInSerializer, TipSerializer,
-    HobbySerializer, OnboardingSerializer
+    HobbySerializer, OnboardingSerializer,
+    ArchivedObjectiveSerializer, ArchivedCheckInSerializer
+)
+from . import events, search
+from .data_transfer import NDJSONImporter, TooManyImportErrors, aiter_ndjson, iter_ndjson
+from .history import checkins_between, completion_stats, objectives_between, touches_archive
+from .llm_service import (
+    generate_daily_plan, generate_hobby_suggestion, record_cache_lookup
 )
-from .llm_service import generate_daily_plan, generate_hobby_suggestion, generate_workout_plan
+from . import metrics
+from .db_router import ReadReplicaListMixin, pin_to_primary, use_read_replica
+from .idempotency import IdempotentMixin, idempotent
+from .planning import get_or_create_weekly_plan, objectives_for_day, week_view
+from .provisioning import UserProvisioner, format_for, iter_records
+from .workout_library import workout_plan_for
+from .write_coalescer import WriteTimeout, objective_writes
+
+
+MAX_HISTORY_DAYS = 366
 
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@idempotent
+@transaction.atomic
 def onboarding_view(request):
     serializer = OnboardingSerializer(data=request.data)
     if serializer.is_valid():
@@ -59,6 +85,7 @@ def login_view(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@use_read_replica
 def user_profile_view(request):
     try:
         profile = request.user.profile
@@ -73,6 +100,8 @@ def user_profile_view(request):
 
 @api_view(['PATCH'])
 @permission_classes([IsAuthenticated])
+@idempotent
+@transaction.atomic
 def update_profile_view(request):
     try:
         profile = request.user.profile
@@ -90,6 +119,7 @@ def update_profile_view(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def daily_plan_view(request):
     try:
         user = request.user
@@ -99,14 +129,19 @@ def daily_plan_view(request):
         yesterday = today - timedelta(days=1)
         
         existing_objectives = Objective.objects.filter(user=user, date=today)
-        if existing_objectives.exists():
+        has_existing = existing_objectives.exists()
+        record_cache_lookup('daily_plan', user, has_existing)
+        if has_existing:
             serializer = ObjectiveSerializer(existing_objectives, many=True)
             return Response({
                 'objectives': serializer.data,
                 'message': 'Retrieved existing objectives for today'
             })
         
-        objectives_list = generate_daily_plan(user, profile, yesterday)
+        if profile.planning_mode == 'weekly':
+            objectives_list = objectives_for_day(user, profile, today)
+        else:
+            objectives_list = generate_daily_plan(user, profile, yesterday)
         
         created_objectives = []
         for obj_description in objectives_list:
@@ -116,6 +151,7 @@ def daily_plan_view(request):
                 date=today
             )
             created_objectives.append(objective)
+        pin_to_primary(user)
         
         serializer = ObjectiveSerializer(created_objectives, many=True)
         return Response({
@@ -132,6 +168,27 @@ def daily_plan_view(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+def weekly_plan_view(request):
+    try:
+        profile = request.user.profile
+    except UserProfile.DoesNotExist:
+        return Response(
+            {'error': 'Profile not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    plan = get_or_create_weekly_plan(request.user, profile, timezone.now().date())
+    if plan is None:
+        return Response(
+            {'error': 'Could not draft a weekly plan right now, please try again later'},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    return Response(week_view(plan))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@use_read_replica
 def objectives_list_view(request):
     date_str = request.query_params.get('date')
     
@@ -146,13 +203,105 @@ def objectives_list_view(request):
     else:
         date_obj = timezone.now().date()
     
+    if touches_archive(date_obj):
+        objectives = objectives_between(request.user, date_obj, date_obj)
+        return Response(serialize_objectives(objectives))
+    
     objectives = Objective.objects.filter(user=request.user, date=date_obj)
     serializer = ObjectiveSerializer(objectives, many=True)
     return Response(serializer.data)
 
 
+def serialize_objectives(objectives):
+    return [
+        ArchivedObjectiveSerializer(obj).data if isinstance(obj, ArchivedObjective)
+        else ObjectiveSerializer(obj).data
+        for obj in objectives
+    ]
+
+
+def serialize_checkins(checkins):
+    return [
+        ArchivedCheckInSerializer(checkin).data if isinstance(checkin, ArchivedCheckIn)
+        else DailyCheckInSerializer(checkin).data
+        for checkin in checkins
+    ]
+
+
+def parse_date_range(request, default_days):
+    """Reads ?start= and ?end= (YYYY-MM-DD); returns (start, end) or raises ValueError."""
+    end_str = request.query_params.get('end')
+    start_str = request.query_params.get('start')
+    end = datetime.strptime(end_str, '%Y-%m-%d').date() if end_str else timezone.now().date()
+    start = datetime.strptime(start_str, '%Y-%m-%d').date() if start_str else end - timedelta(days=default_days - 1)
+    if start > end:
+        raise ValueError('start must not be after end')
+    if (end - start).days >= MAX_HISTORY_DAYS:
+        raise ValueError(f'Date range is limited to {MAX_HISTORY_DAYS} days')
+    return start, end
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@use_read_replica
+def history_view(request):
+    try:
+        start, end = parse_date_range(request, default_days=30)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({
+        'start_date': start,
+        'end_date': end,
+        'objectives': serialize_objectives(objectives_between(request.user, start, end)),
+        'checkins': serialize_checkins(checkins_between(request.user, start, end)),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@use_read_replica
+def stats_view(request):
+    try:
+        start, end = parse_date_range(request, default_days=30)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response(completion_stats(request.user, start, end))
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+@use_read_replica
+def cohort_analytics_view(request):
+    user_id = request.query_params.get('user')
+    if user_id:
+        trend = UserTrend.objects.filter(user_id=user_id).values().first()
+        if trend is None:
+            return Response({'error': 'No trend computed for this user'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(trend)
+
+    snapshot = CohortSnapshot.objects.first()
+    if snapshot is None:
+        return Response(
+            {'error': 'No analytics yet; run manage.py compute_cohort_analytics'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    return Response({
+        'created_at': snapshot.created_at,
+        'window_start': snapshot.window_start,
+        'window_end': snapshot.window_end,
+        'users': snapshot.users,
+        'objectives': snapshot.objectives,
+        'checkins': snapshot.checkins,
+        'duration_ms': snapshot.duration_ms,
+        **snapshot.results,
+    })
+
+
 @api_view(['PATCH'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def objective_update_view(request, pk):
     try:
         objective = Objective.objects.get(pk=pk, user=request.user)
@@ -169,7 +318,16 @@ def objective_update_view(request, pk):
             objective.completed_at = timezone.now()
         else:
             objective.completed_at = None
-        objective.save()
+        try:
+            objective_writes.submit(
+                lambda: objective.save(update_fields=['is_completed', 'completed_at', 'updated_at'])
+            )
+        except WriteTimeout:
+            return Response(
+                {'error': 'Too many updates in progress, please try again'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': '1'}
+            )
     
     serializer = ObjectiveSerializer(objective)
     return Response(serializer.data)
@@ -177,6 +335,8 @@ def objective_update_view(request, pk):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
+@transaction.atomic
 def daily_checkin_view(request):
     serializer = DailyCheckInSerializer(data=request.data)
     if serializer.is_valid():
@@ -199,6 +359,7 @@ def daily_checkin_view(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@use_read_replica
 def random_tip_view(request):
     tip = Tip.objects.order_by('?').first()
     
@@ -237,7 +398,7 @@ def workout_plan_view(request):
         user = request.user
         profile = user.profile
         
-        workout = generate_workout_plan(user, profile)
+        workout = workout_plan_for(user, profile)
         
         return Response(workout)
     
@@ -248,7 +409,148 @@ def workout_plan_view(request):
         )
 
 
-class ProjectListCreateView(generics.ListCreateAPIView):
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search_view(request):
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response(
+            {'error': 'Query parameter q is required'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        page = max(int(request.query_params.get('page', 1)), 1)
+        page_size = min(max(int(request.query_params.get('page_size', 20)), 1), 100)
+    except ValueError:
+        return Response(
+            {'error': 'page and page_size must be integers'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    kinds = request.query_params.get('type')
+    kinds = kinds.split(',') if kinds else search.KINDS
+    
+    total, results = search.search(
+        query, user=request.user, kinds=kinds,
+        limit=page_size, offset=(page - 1) * page_size
+    )
+    for result in results:
+        del result['user_id']
+    return Response({
+        'count': total,
+        'page': page,
+        'page_size': page_size,
+        'results': results,
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_view(request):
+    # Under ASGI a sync iterator is buffered whole, so stream asynchronously there.
+    stream = aiter_ndjson if isinstance(request._request, ASGIRequest) else iter_ndjson
+    response = StreamingHttpResponse(
+        stream(request.user),
+        content_type='application/x-ndjson'
+    )
+    filename = f"momentum-{request.user.username}-{timezone.now().date()}.ndjson"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@idempotent
+def import_view(request):
+    importer = NDJSONImporter(request.user)
+    try:
+        # Read the raw body line by line so large uploads never sit in memory.
+        result = importer.run(request.stream or [])
+    except TooManyImportErrors as e:
+        return Response(
+            {'error': str(e), 'imported': importer.counts, 'updated': importer.updated, 'errors': importer.errors},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    # bulk_create sends no post_save, so tell open streams to refetch instead.
+    if events.broker.has_subscribers(request.user.id):
+        events.broker.publish(request.user.id, {'type': 'import.completed', 'imported': result['imported']})
+    return Response(result, status=status.HTTP_201_CREATED)
+
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+@idempotent
+def bulk_users_view(request):
+    content_format = format_for(request.content_type)
+    if content_format is None:
+        return Response(
+            {'error': 'Send text/csv with a header row or application/x-ndjson'},
+            status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+        )
+    provisioner = UserProvisioner(workers=settings.PROVISIONING_API_HASH_WORKERS)
+    try:
+        result = provisioner.run(iter_records(request.stream or [], content_format))
+    except TooManyImportErrors as e:
+        return Response(
+            {'error': str(e), 'created': provisioner.created, 'errors': provisioner.errors},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return Response(result, status=status.HTTP_201_CREATED)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def events_ticket_view(request):
+    return Response({
+        'ticket': events.issue_ticket(request.user),
+        'expires_in': settings.EVENTS_TICKET_MAX_AGE,
+    }, status=status.HTTP_201_CREATED)
+
+
+@require_GET
+async def events_view(request):
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {'error': 'The event stream is only served by the ASGI application'},
+            status=status.HTTP_501_NOT_IMPLEMENTED
+        )
+    # EventSource cannot set headers, so browsers pass a ticket from
+    # /api/events/ticket/ as ?ticket= instead of their token.
+    authorization = request.headers.get('Authorization', '')
+    if authorization.startswith('Token '):
+        key = authorization[len('Token '):].strip()
+        user_id = await Token.objects.filter(key=key).values_list('user_id', flat=True).afirst()
+    else:
+        user_id = events.ticket_user_id(request.GET.get('ticket', ''))
+    if user_id is None or not await User.objects.filter(pk=user_id, is_active=True).aexists():
+        return JsonResponse(
+            {'error': 'Invalid token or ticket'},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+
+    response = StreamingHttpResponse(
+        events.stream(user_id),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def metrics_view(request):
+    token = getattr(settings, 'METRICS_AUTH_TOKEN', '')
+    # Without a token the endpoint is only open on a DEBUG server.
+    if token:
+        if request.headers.get('Authorization') != f'Bearer {token}':
+            return HttpResponse(status=status.HTTP_403_FORBIDDEN)
+    elif not settings.DEBUG:
+        return HttpResponse(status=status.HTTP_403_FORBIDDEN)
+    return HttpResponse(
+        metrics.registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+class ProjectListCreateView(IdempotentMixin, ReadReplicaListMixin, generics.ListCreateAPIView):
     serializer_class = ProjectSerializer
     permission_classes = [IsAuthenticated]
     
@@ -259,7 +561,7 @@ class ProjectListCreateView(generics.ListCreateAPIView):
         serializer.save(user=self.request.user)
 
 
-class ProjectDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ProjectDetailView(IdempotentMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ProjectSerializer
     permission_classes = [IsAuthenticated]
     
@@ -267,7 +569,7 @@ class ProjectDetailView(generics.RetrieveUpdateDestroyAPIView):
         return Project.objects.filter(user=self.request.user)
 
 
-class HobbyListCreateView(generics.ListCreateAPIView):
+class HobbyListCreateView(IdempotentMixin, ReadReplicaListMixin, generics.ListCreateAPIView):
     serializer_class = HobbySerializer
     permission_classes = [IsAuthenticated]
     
@@ -278,7 +580,7 @@ class HobbyListCreateView(generics.ListCreateAPIView):
         serializer.save(user=self.request.user)
 
 
-class HobbyDetailView(generics.RetrieveUpdateDestroyAPIView):
+class HobbyDetailView(IdempotentMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = HobbySerializer
     permission_classes = [IsAuthenticated]
     
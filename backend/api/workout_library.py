@@ -0,0 +1,221 @@
+import logging
+import queue
+import re
+import threading
+import time
+import zlib
+from copy import deepcopy
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .db_router import replica_reads
+from .llm_service import (
+    WORKOUT_BODY_DESCRIPTIONS, WORKOUT_GOAL_DESCRIPTIONS, WORKOUT_PLAN_FALLBACK,
+    generate_workout_template, record_cache_lookup
+)
+from .models import DailyCheckIn, WorkoutTemplate
+
+
+logger = logging.getLogger(__name__)
+
+MOODS = [mood for mood, _ in DailyCheckIn.MOOD_CHOICES] + ['Unknown']
+BODY_BUCKETS = list(WORKOUT_BODY_DESCRIPTIONS)
+GOAL_CATEGORIES = list(WORKOUT_GOAL_DESCRIPTIONS)
+
+# First matching category wins, so more specific goals come first.
+GOAL_KEYWORDS = [
+    ('weight_loss', r'\b(lose|losing|weight|fat|slim|lean|kg|lbs?)\b'),
+    ('strength', r'\b(strong|strength|muscle|lift|lifting|bulk|gym|squat|bench)'),
+    ('endurance', r'\b(run|running|marathon|5k|10k|cardio|cycl|swim|triathlon|race|endurance|stamina)'),
+    ('mobility', r'\b(yoga|flexib|mobility|stretch|posture|back pain|pilates)'),
+    ('wellbeing', r'\b(stress|calm|mental|anxiety|burnout|sleep|balance|relax|meditat|wellbeing|wellness)'),
+]
+
+
+def mood_bucket(mood):
+    return mood if mood in MOODS else 'Unknown'
+
+
+def body_bucket(user_profile):
+    """BMI band when height and weight are known, otherwise a body-fat band."""
+    height, weight, body_fat = user_profile.height_cm, user_profile.weight_kg, user_profile.body_fat_percentage
+    if height and weight:
+        bmi = weight / (height / 100) ** 2
+        if bmi < 18.5:
+            return 'lean'
+        if bmi < 25:
+            return 'healthy'
+        # A high BMI with low body fat is muscle, not excess weight.
+        if body_fat is not None and body_fat < 20:
+            return 'healthy'
+        return 'overweight' if bmi < 30 else 'obese'
+    if body_fat is not None:
+        if body_fat < 12:
+            return 'lean'
+        if body_fat < 25:
+            return 'healthy'
+        return 'overweight' if body_fat < 32 else 'obese'
+    return 'unknown'
+
+
+def goal_category(goal):
+    text = (goal or '').lower()
+    for category, pattern in GOAL_KEYWORDS:
+        if re.search(pattern, text):
+            return category
+    return 'general'
+
+
+def all_cells():
+    return [(m, b, g) for m in MOODS for b in BODY_BUCKETS for g in GOAL_CATEGORIES]
+
+
+class WorkoutLibrary:
+    """
+    Per-process copy of the WorkoutTemplate table keyed by cell, so a lookup
+    is a dict access. It is reloaded after WORKOUT_LIBRARY_RELOAD_SECONDS.
+    """
+
+    def __init__(self):
+        self._cells = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self):
+        reload_after = settings.WORKOUT_LIBRARY_RELOAD_SECONDS
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < reload_after:
+            return
+        cells = {}
+        for template in WorkoutTemplate.objects.order_by('created_at', 'id'):
+            cells.setdefault((template.mood, template.body_bucket, template.goal_category), []).append(template)
+        with self._lock:
+            self._cells = cells
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    def variants(self, cell):
+        self._ensure_loaded()
+        return self._cells.get(cell, [])
+
+    def choose(self, cell, user, day):
+        """One variant per user per day, so repeated requests agree and days differ."""
+        variants = self.variants(cell)
+        if not variants:
+            return None
+        return variants[zlib.crc32(f'{user.pk}:{day}'.encode()) % len(variants)]
+
+    def store(self, cell, plan, max_variants=None):
+        """Add a variant, replacing the oldest once the cell holds max_variants."""
+        mood, body, goal = cell
+        if max_variants is None:
+            max_variants = settings.WORKOUT_LIBRARY_VARIANTS
+        with transaction.atomic():
+            existing = list(
+                WorkoutTemplate.objects.select_for_update()
+                .filter(mood=mood, body_bucket=body, goal_category=goal)
+                .order_by('created_at', 'id')
+            )
+            if len(existing) >= max_variants:
+                template = existing[0]
+                template.plan = plan
+                template.created_at = timezone.now()
+                template.save(update_fields=['plan', 'created_at'])
+            else:
+                template = WorkoutTemplate.objects.create(
+                    mood=mood, body_bucket=body, goal_category=goal, plan=plan
+                )
+        with self._lock:
+            variants = [t for t in self._cells.get(cell, []) if t.pk != template.pk]
+            self._cells[cell] = variants + [template]
+        return template
+
+
+library = WorkoutLibrary()
+
+
+class LibraryRefresher:
+    """
+    Regenerates stale or under-filled cells on a background thread, one at a
+    time. A cell is queued at most once per WORKOUT_LIBRARY_REFRESH_INTERVAL_SECONDS,
+    so a cell the LLM keeps failing to fill does not cost a call per request.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._requested_at = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def request(self, cell):
+        if not settings.WORKOUT_LIBRARY_BACKGROUND_REFRESH:
+            return
+        now = time.monotonic()
+        interval = settings.WORKOUT_LIBRARY_REFRESH_INTERVAL_SECONDS
+        with self._lock:
+            if cell in self._pending or len(self._pending) >= 50:
+                return
+            requested_at = self._requested_at.get(cell)
+            if requested_at is not None and now - requested_at < interval:
+                return
+            self._requested_at[cell] = now
+            self._pending.add(cell)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='workout-library-refresh', daemon=True)
+                self._thread.start()
+        self._queue.put(cell)
+
+    def _run(self):
+        while True:
+            cell = self._queue.get()
+            try:
+                close_old_connections()
+                plan = generate_workout_template(*cell, endpoint='workout_library')
+                if plan is not None:
+                    library.store(cell, plan)
+            except Exception:
+                logger.exception("Refreshing workout library cell %s failed", cell)
+            finally:
+                with self._lock:
+                    self._pending.discard(cell)
+
+
+refresher = LibraryRefresher()
+
+
+def personalise(plan, user):
+    plan = deepcopy(plan)
+    name = user.first_name or user.username
+    plan['encouragement'] = f"{name}, {plan['encouragement'][:1].lower()}{plan['encouragement'][1:]}"
+    return plan
+
+
+def workout_plan_for(user, user_profile):
+    """Serve today's workout from the library, generating the cell only if it is empty."""
+    with replica_reads(user):
+        latest_checkin = user.daily_checkins.order_by('-date').first()
+    cell = (
+        mood_bucket(latest_checkin.mood if latest_checkin else None),
+        body_bucket(user_profile),
+        goal_category(user_profile.goal),
+    )
+
+    template = library.choose(cell, user, timezone.now().date())
+    record_cache_lookup('workout_plan', user, template is not None)
+    if template is None:
+        plan = generate_workout_template(*cell, user=user)
+        if plan is None:
+            return personalise(WORKOUT_PLAN_FALLBACK, user)
+        library.store(cell, plan)
+        return personalise(plan, user)
+
+    max_age = timedelta(days=settings.WORKOUT_LIBRARY_MAX_AGE_DAYS)
+    under_filled = len(library.variants(cell)) < settings.WORKOUT_LIBRARY_VARIANTS
+    if under_filled or template.created_at < timezone.now() - max_age:
+        refresher.request(cell)
+    return personalise(template.plan, user)
@@ -0,0 +1,102 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+
+class WriteTimeout(Exception):
+    """The write was still queued after the timeout and has been withdrawn."""
+
+
+class WriteCoalescer:
+    """
+    Funnels short writes through a single writer thread that commits them in
+    batches (group commit). With SQLite this removes lock contention between
+    writers and amortises one fsync over many writes. When disabled, writes run
+    inline in their own transaction.
+    """
+
+    def __init__(self, using='default', enabled=False, max_batch=64, max_wait=0.002, timeout=10.0):
+        self.using = using
+        self.enabled = enabled
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn):
+        """Run fn() inside a write transaction and return its result."""
+        if not self.enabled:
+            with transaction.atomic(using=self.using):
+                return fn()
+
+        future = Future()
+        self._queue.put((fn, future))
+        self._ensure_thread()
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            # Withdraw the write so the caller can report a failure that is
+            # true; once the writer has started it, wait for the outcome.
+            if future.cancel():
+                raise WriteTimeout(f"Write still queued after {self.timeout}s")
+            return future.result()
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name=f'write-coalescer-{self.using}', daemon=True
+                )
+                self._thread.start()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            close_old_connections()
+            results = []
+            try:
+                with transaction.atomic(using=self.using):
+                    for fn, future in batch:
+                        if not future.set_running_or_notify_cancel():
+                            continue
+                        try:
+                            # A savepoint per write keeps one failure from aborting the batch.
+                            with transaction.atomic(using=self.using):
+                                results.append((future, fn(), None))
+                        except Exception as e:
+                            results.append((future, None, e))
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for future, result, error in results:
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+
+objective_writes = WriteCoalescer(enabled=getattr(settings, 'SQLITE_WRITE_COALESCING', False))
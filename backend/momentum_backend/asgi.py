@@ -2,6 +2,8 @@
 ASGI config for momentum_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve the project through this application for the /api/events/ stream.
+LLM_PRELOAD imports the LLM dependencies here as in wsgi.py.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -9,8 +11,14 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'momentum_backend.settings')
 
 application = get_asgi_application()
+
+if settings.LLM_PRELOAD:
+    from api.llm_service import preload
+
+    preload()
@@ -12,7 +12,9 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+from corsheaders.defaults import default_headers
 from decouple import config
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -46,6 +48,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -54,6 +57,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.profiling.ProfilingMiddleware',
+    'api.db_router.ReplicaPinMiddleware',
 ]
 
 ROOT_URLCONF = 'momentum_backend.urls'
@@ -79,13 +84,113 @@ WSGI_APPLICATION = 'momentum_backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+# Set DB_ENGINE=postgresql and the POSTGRES_* variables in production. When a
+# replica is configured, read-only views are routed to it by
+# api.db_router.PrimaryReplicaRouter.
+
+DB_ENGINE = config('DB_ENGINE', default='sqlite')
+
+# Opt-in mode for single-box SQLite deployments with concurrent writers: WAL
+# journaling, tuned pragmas, BEGIN IMMEDIATE for transactions, and short writes
+# funnelled through one writer thread (api.write_coalescer).
+SQLITE_HIGH_CONCURRENCY = DB_ENGINE == 'sqlite' and config('SQLITE_HIGH_CONCURRENCY', default=False, cast=bool)
+SQLITE_WRITE_COALESCING = SQLITE_HIGH_CONCURRENCY
+SQLITE_CONCURRENCY_OPTIONS = {
+    'init_command': (
+        'PRAGMA journal_mode=WAL;'
+        'PRAGMA synchronous=NORMAL;'
+        'PRAGMA cache_size=-32000;'
+        'PRAGMA mmap_size=134217728;'
+        'PRAGMA temp_store=MEMORY;'
+        'PRAGMA busy_timeout=5000;'
+    ),
+    'transaction_mode': 'IMMEDIATE',
+    'timeout': 20,
 }
 
+if DB_ENGINE == 'postgresql':
+    DB_POOL_MAX_SIZE = config('DB_POOL_MAX_SIZE', default=0, cast=int)
+    _postgres = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': config('POSTGRES_DB', default='momentum'),
+        'USER': config('POSTGRES_USER', default='momentum'),
+        'PASSWORD': config('POSTGRES_PASSWORD', default=''),
+        'HOST': config('POSTGRES_HOST', default='localhost'),
+        'PORT': config('POSTGRES_PORT', default='5432'),
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'connect_timeout': config('DB_CONNECT_TIMEOUT', default=5, cast=int),
+        },
+    }
+    if DB_POOL_MAX_SIZE:
+        # psycopg's pool replaces persistent connections; Django requires CONN_MAX_AGE=0.
+        _postgres['CONN_MAX_AGE'] = 0
+        _postgres['OPTIONS']['pool'] = {
+            'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': config('DB_POOL_TIMEOUT', default=10, cast=int),
+        }
+
+    DATABASES = {'default': _postgres}
+    POSTGRES_REPLICA_HOST = config('POSTGRES_REPLICA_HOST', default='')
+    if POSTGRES_REPLICA_HOST:
+        DATABASES['replica'] = {
+            **_postgres,
+            'OPTIONS': dict(_postgres['OPTIONS']),
+            'HOST': POSTGRES_REPLICA_HOST,
+            'PORT': config('POSTGRES_REPLICA_PORT', default=_postgres['PORT']),
+            'TEST': {'MIRROR': 'default'},
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
+    }
+    if SQLITE_HIGH_CONCURRENCY:
+        DATABASES['default']['OPTIONS'] = SQLITE_CONCURRENCY_OPTIONS
+    # A second SQLite file can stand in for a replica locally; tests mirror it to default.
+    SQLITE_REPLICA_NAME = config('SQLITE_REPLICA_NAME', default='')
+    if SQLITE_REPLICA_NAME:
+        DATABASES['replica'] = {
+            **DATABASES['default'],
+            'NAME': BASE_DIR / SQLITE_REPLICA_NAME,
+            'TEST': {'MIRROR': 'default'},
+        }
+
+DATABASE_ROUTERS = ['api.db_router.PrimaryReplicaRouter']
+
+# After a write, a user's reads stay on the primary for this many seconds so
+# replica lag never hides their own changes.
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=10, cast=int)
+
+
+# Cache
+# Used for cross-request state such as replica pinning. Configure REDIS_URL when
+# running more than one worker so the state is shared; it is required with a
+# replica, since a per-process cache would only pin reads in the worker that
+# handled the write.
+
+REDIS_URL = config('REDIS_URL', default='')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+elif 'replica' in DATABASES:
+    raise ImproperlyConfigured("REDIS_URL must be set when a read replica is configured")
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -139,3 +244,120 @@ REST_FRAMEWORK = {
 
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+CORS_EXPOSE_HEADERS = ['Idempotent-Replayed']
+
+# Metrics
+# Point METRICS_MULTIPROC_DIR at a directory shared by all workers so /metrics
+# aggregates every process (POSIX only); leave it unset for a single-process
+# server. Totals of exited workers are kept in metrics_dead.json there.
+# /metrics refuses every request unless METRICS_AUTH_TOKEN is set or DEBUG is on.
+
+METRICS_MULTIPROC_DIR = config('METRICS_MULTIPROC_DIR', default='') or None
+METRICS_FLUSH_INTERVAL = config('METRICS_FLUSH_INTERVAL', default=5.0, cast=float)
+METRICS_AUTH_TOKEN = config('METRICS_AUTH_TOKEN', default='')
+
+# Request profiling
+# Staff users can profile a single request by sending the X-Momentum-Profile
+# header; PROFILING_SAMPLE_RATE additionally profiles a fraction of all traffic.
+
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', default=0.0, cast=float)
+PROFILING_RING_SIZE = config('PROFILING_RING_SIZE', default=200, cast=int)
+PROFILING_STATS_LIMIT = 40
+
+# LLM usage ledger
+# Ledger rows are buffered in memory and written in batches by a background
+# thread; repeat cache hits are folded into one row per user and endpoint per
+# batch. With LLM_LEDGER_ASYNC off every row is written as it is recorded.
+# LLM_TOKEN_PRICES holds (input, output) USD per million tokens.
+
+LLM_LEDGER_ASYNC = config('LLM_LEDGER_ASYNC', default=True, cast=bool)
+LLM_LEDGER_BATCH_SIZE = config('LLM_LEDGER_BATCH_SIZE', default=50, cast=int)
+LLM_LEDGER_FLUSH_INTERVAL = config('LLM_LEDGER_FLUSH_INTERVAL', default=5.0, cast=float)
+LLM_PROMPT_TOKEN_BUDGETS = {
+    'daily_plan': config('LLM_DAILY_PLAN_TOKEN_BUDGET', default=900, cast=int),
+    'hobby_suggestion': config('LLM_HOBBY_TOKEN_BUDGET', default=600, cast=int),
+    'weekly_plan': config('LLM_WEEKLY_PLAN_TOKEN_BUDGET', default=1200, cast=int),
+}
+LLM_TOKEN_PRICES = {
+    'gemini-2.5-flash': (0.30, 2.50),
+}
+
+# History archival
+# `manage.py archive_history` moves objectives and check-ins older than this
+# many days into cold-storage tables; history endpoints read across both.
+
+ARCHIVE_HORIZON_DAYS = config('ARCHIVE_HORIZON_DAYS', default=180, cast=int)
+
+# History reads check the latest archive cutoff on every call; it is cached this
+# long and cleared by archive_history. Across workers that needs REDIS_URL.
+ARCHIVE_WATERMARK_CACHE_SECONDS = config('ARCHIVE_WATERMARK_CACHE_SECONDS', default=30, cast=int)
+
+# Push events
+# /api/events/ streams objective, project and check-in changes as server-sent
+# events when served by the ASGI application. The local broker only reaches
+# streams in the same process; use EVENTS_BROKER=redis with several workers.
+# Browsers authenticate the stream with a ticket from /api/events/ticket/ that
+# expires after EVENTS_TICKET_MAX_AGE seconds.
+
+EVENTS_BROKER = config('EVENTS_BROKER', default='redis' if REDIS_URL else 'local')
+EVENTS_HEARTBEAT_SECONDS = config('EVENTS_HEARTBEAT_SECONDS', default=15, cast=int)
+EVENTS_QUEUE_SIZE = config('EVENTS_QUEUE_SIZE', default=100, cast=int)
+EVENTS_TICKET_MAX_AGE = config('EVENTS_TICKET_MAX_AGE', default=60, cast=int)
+
+# Idempotency keys
+# Responses to requests carrying an Idempotency-Key header are stored per user
+# and replayed for retries within the TTL. `manage.py purge_idempotency_keys`
+# deletes expired records.
+
+IDEMPOTENCY_TTL_SECONDS = config('IDEMPOTENCY_TTL_SECONDS', default=86400, cast=int)
+IDEMPOTENCY_LOCK_SECONDS = 300
+
+# Hobby suggestion cache
+# Suggestions are reused across users whose mood, goal, hobbies and projects
+# map to nearly the same feature vector (cosine similarity at or above the
+# threshold). `manage.py hobby_cache_report` shows hit rate and similarities.
+
+HOBBY_CACHE_ENABLED = config('HOBBY_CACHE_ENABLED', default=True, cast=bool)
+HOBBY_CACHE_SIMILARITY_THRESHOLD = config('HOBBY_CACHE_SIMILARITY_THRESHOLD', default=0.92, cast=float)
+HOBBY_CACHE_MAX_ENTRIES = config('HOBBY_CACHE_MAX_ENTRIES', default=5000, cast=int)
+
+# Workout library
+# Workouts are served from pre-generated templates, one set per (mood, body
+# composition bucket, goal category) cell; build them with
+# `manage.py build_workout_library`. Empty cells are generated on first use,
+# and cells with fewer than WORKOUT_LIBRARY_VARIANTS templates or older than
+# WORKOUT_LIBRARY_MAX_AGE_DAYS are topped up on a background thread, at most
+# once per cell every WORKOUT_LIBRARY_REFRESH_INTERVAL_SECONDS.
+
+WORKOUT_LIBRARY_VARIANTS = config('WORKOUT_LIBRARY_VARIANTS', default=3, cast=int)
+WORKOUT_LIBRARY_MAX_AGE_DAYS = config('WORKOUT_LIBRARY_MAX_AGE_DAYS', default=30, cast=int)
+WORKOUT_LIBRARY_BACKGROUND_REFRESH = config('WORKOUT_LIBRARY_BACKGROUND_REFRESH', default=True, cast=bool)
+WORKOUT_LIBRARY_RELOAD_SECONDS = 300
+WORKOUT_LIBRARY_REFRESH_INTERVAL_SECONDS = 600
+
+# LLM preload
+# The Gemini SDK and NumPy are imported on first use. Set LLM_PRELOAD with a
+# prefork server that loads the application in its master (gunicorn
+# --preload) so they are imported once there and shared by every forked
+# worker. `manage.py bench_startup` reports import times.
+
+LLM_PRELOAD = config('LLM_PRELOAD', default=False, cast=bool)
+
+# Admin
+# Changelists of the large tables page by cursor and avoid COUNT(*) scans:
+# unfiltered lists show the database's row estimate (run ANALYZE on SQLite)
+# once it passes the threshold, and filtered lists count at most
+# ADMIN_COUNT_LIMIT rows.
+
+ADMIN_ESTIMATED_COUNT_THRESHOLD = config('ADMIN_ESTIMATED_COUNT_THRESHOLD', default=100000, cast=int)
+ADMIN_COUNT_LIMIT = config('ADMIN_COUNT_LIMIT', default=10000, cast=int)
+
+# Bulk provisioning
+# `manage.py provision_users` and POST /api/users/bulk/ create accounts from
+# CSV or NDJSON, hashing passwords on worker processes (0: one per CPU) and
+# writing users, profiles and tokens in bulk. The API spawns its own pool per
+# request, so it defaults to hashing in the web process.
+
+PROVISIONING_HASH_WORKERS = config('PROVISIONING_HASH_WORKERS', default=0, cast=int)
+PROVISIONING_API_HASH_WORKERS = config('PROVISIONING_API_HASH_WORKERS', default=1, cast=int)
@@ -2,6 +2,9 @@
 WSGI config for momentum_backend project.
 
 It exposes the WSGI callable as a module-level variable named ``application``.
+With LLM_PRELOAD set, the LLM dependencies are imported here as well, so a
+server that loads the application before forking (gunicorn --preload) pays for
+them once in the master process.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
@@ -9,8 +12,14 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'momentum_backend.settings')
 
 application = get_wsgi_application()
+
+if settings.LLM_PRELOAD:
+    from api.llm_service import preload
+
+    preload()